@@ -0,0 +1,116 @@
+"""Đo thời gian nạp và truy vấn kho phân tích (analytics_store) so với đọc lại mọi partition Parquet.
+
+Dữ liệu giả lập gồm nhiều ngày, các ngày liền nhau dùng lại một phần job (như khi scrape hàng ngày).
+Kết quả top skill của kho được so với cách đọc lại toàn bộ file rồi bỏ job trùng (bản mới nhất thắng),
+và việc nạp lại một ngày phải không làm thay đổi số job.
+
+    python benchmarks/bench_analytics_store.py --days 30 --rows-per-day 5000 --max-query-ms 200
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "dags"))
+
+import pandas as pd  # noqa: E402
+from analytics_store import AnalyticsStore, analytics_db_path, load_partition  # noqa: E402
+from storage import TRANSFORMED_FILE, job_keys, jobs_to_frame, read_jobs, write_jobs  # noqa: E402
+from transform import transform_frame  # noqa: E402
+from synthetic import make_job_records  # noqa: E402
+
+
+def build_partitions(data_dir, days, rows_per_day, overlap):
+    """Ghi file transform giả lập cho từng ngày, trả về danh sách execution_date."""
+    step = max(1, int(rows_per_day * (1 - overlap)))
+    df = transform_frame(jobs_to_frame(make_job_records(step * (days - 1) + rows_per_day, description_paragraphs=1)))
+    first = date(2025, 1, 1)
+    dates = []
+    for day in range(days):
+        execution_date = (first + timedelta(days=day)).isoformat()
+        os.makedirs(f"{data_dir}/{execution_date}", exist_ok=True)
+        write_jobs(df.iloc[day * step:day * step + rows_per_day], f"{data_dir}/{execution_date}/{TRANSFORMED_FILE}")
+        dates.append(execution_date)
+    return dates
+
+
+def rescan_top_skills(data_dir, dates, limit):
+    """Cách cũ: đọc lại mọi partition, bỏ job trùng rồi đếm skill."""
+    frames = [read_jobs(f"{data_dir}/{d}/{TRANSFORMED_FILE}", columns=['job_id', 'job_url', 'skill_name'])
+              for d in dates]
+    df = pd.concat(frames, ignore_index=True)
+    df = df.assign(job_key=job_keys(df)).drop_duplicates('job_key', keep='last')
+    counts = df['skill_name'].explode().dropna().value_counts()
+    counts = counts.rename_axis('skill').reset_index(name='count')
+    return counts.sort_values(['count', 'skill'], ascending=[False, True], ignore_index=True).head(limit)
+
+
+def timed(fn, runs):
+    """Trung vị thời gian (ms) của fn qua nhiều lần chạy và kết quả lần cuối."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--rows-per-day", type=int, default=5000)
+    parser.add_argument("--overlap", type=float, default=0.8, help="Tỷ lệ job của ngày trước xuất hiện lại")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-query-ms", type=float, default=None,
+                        help="Thoát với mã 1 nếu truy vấn chậm nhất vượt ngưỡng này")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        dates = build_partitions(data_dir, args.days, args.rows_per_day, args.overlap)
+
+        start = time.perf_counter()
+        for execution_date in dates:
+            load_partition(execution_date, data_dir=data_dir)
+        load_s = time.perf_counter() - start
+
+        store = AnalyticsStore(analytics_db_path(data_dir))
+        jobs_before = store.query("SELECT COUNT(*) AS n FROM jobs")['n'].iloc[0]
+        load_partition(dates[len(dates) // 2], data_dir=data_dir)
+        jobs_after = store.query("SELECT COUNT(*) AS n FROM jobs")['n'].iloc[0]
+
+        middle = dates[len(dates) // 2]
+        queries = {
+            "top_skills": lambda: store.top_skills(limit=10),
+            "top_skills(keyword,city,range)": lambda: store.top_skills(
+                keyword="Data Engineer", city="Ho Chi Minh", start="2025-03-01", end="2025-06-30"),
+            "skill_counts": lambda: store.skill_counts(),
+            "job_counts(area)": lambda: store.job_counts(by='area', limit=10),
+            "job_counts(city,range)": lambda: store.job_counts(by='city_name', start="2025-03-01", end=middle),
+            "salary_distribution(USD)": lambda: store.salary_distribution(currency='USD', bin_width=500),
+        }
+        failed = jobs_before != jobs_after
+        slowest = 0.0
+        for name, fn in queries.items():
+            ms, _ = timed(fn, args.runs)
+            slowest = max(slowest, ms)
+            print(f"{name:<32s} {ms:9.2f}ms")
+
+        rescan_ms, expected = timed(lambda: rescan_top_skills(data_dir, dates, 10), max(1, args.runs // 2))
+        identical = store.top_skills(limit=10).equals(expected)
+        failed = failed or not identical
+        print(f"{'rescan parquet top_skills':<32s} {rescan_ms:9.2f}ms")
+        print(f"days={args.days} rows/day={args.rows_per_day} jobs={jobs_after} load={load_s:.2f}s "
+              f"({load_s / args.days * 1000:.0f}ms/ngày) db={os.path.getsize(store.db_path) / 2**20:.1f}MB "
+              f"reload_idempotent={jobs_before == jobs_after} identical={identical}")
+        store.close()
+
+    if args.max_query_ms is not None and slowest > args.max_query_ms:
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Đo backfill: dựng lại toàn bộ lịch sử, chạy lại khi không có gì đổi, và khi chỉ một partition đổi.
+
+Mỗi ngày có một file thô giả lập. Lần chạy lại không đổi phải bỏ qua mọi partition (kể cả khi
+file bị touch nhưng nội dung giữ nguyên); sửa file thô của một ngày chỉ làm chạy lại ngày đó.
+
+    python benchmarks/bench_backfill.py --days 30 --rows-per-day 2000 --workers 4
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "dags"))
+
+from backfill import backfill  # noqa: E402
+from storage import RAW_FILE, jobs_to_frame, read_jobs, write_jobs  # noqa: E402
+from synthetic import make_job_records  # noqa: E402
+
+
+def build_raw_partitions(data_dir, days, rows_per_day):
+    """Ghi file thô giả lập cho từng ngày, trả về danh sách execution_date."""
+    first = date(2025, 1, 1)
+    dates = []
+    for day in range(days):
+        execution_date = (first + timedelta(days=day)).isoformat()
+        os.makedirs(f"{data_dir}/{execution_date}", exist_ok=True)
+        records = make_job_records(rows_per_day, seed=day * rows_per_day, description_paragraphs=1)
+        write_jobs(jobs_to_frame(records), f"{data_dir}/{execution_date}/{RAW_FILE}")
+        dates.append(execution_date)
+    return dates
+
+
+def timed_backfill(label, data_dir, workers, stages):
+    start = time.perf_counter()
+    summary = backfill(data_dir=data_dir, stages=stages, max_workers=workers)
+    elapsed = time.perf_counter() - start
+    ran = {name: counts["ran"] for name, counts in summary.items()}
+    print(f"{label:<28s} {elapsed:8.2f}s ran={ran}")
+    return elapsed, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--rows-per-day", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=None, help="Số process, mặc định bằng số CPU")
+    parser.add_argument("--stages", nargs="+", default=None)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        dates = build_raw_partitions(data_dir, args.days, args.rows_per_day)
+        print(f"days={args.days} rows/day={args.rows_per_day} workers={args.workers or os.cpu_count()}")
+
+        full_s, _ = timed_backfill("full rebuild", data_dir, args.workers, args.stages)
+        noop_s, noop = timed_backfill("no-op rerun", data_dir, args.workers, args.stages)
+
+        # Ghi lại file thô của một ngày với cùng nội dung: mtime đổi nhưng hash giữ nguyên
+        touched = f"{data_dir}/{dates[0]}/{RAW_FILE}"
+        os.utime(touched, ns=(time.time_ns(), time.time_ns() + 10**9))
+        _, touch = timed_backfill("touched, same content", data_dir, args.workers, args.stages)
+
+        # Bỏ một dòng trong file thô của ngày giữa: chỉ partition đó chạy lại
+        changed = f"{data_dir}/{dates[len(dates) // 2]}/{RAW_FILE}"
+        write_jobs(read_jobs(changed).iloc[1:], changed)
+        _, change = timed_backfill("one partition changed", data_dir, args.workers, args.stages)
+
+    failed = (any(counts["ran"] for counts in noop.values()) or any(counts["ran"] for counts in touch.values())
+              or any(counts["ran"] != 1 for counts in change.values()))
+    print(f"noop_speedup={full_s / noop_s:.0f}x incremental_ok={not failed}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""So sánh bộ nhớ và thời gian đếm kỹ năng khi đọc file transform bằng read_jobs thường và read_jobs(compact=True).
+
+Mỗi cách đọc chạy trong một process riêng (peak RSS), in dung lượng từng cột và kiểm tra
+bảng đếm keyword × kỹ năng của hai cách giống hệt nhau.
+
+    python benchmarks/bench_compact_loader.py --rows 20000 100000
+"""
+import os
+import sys
+import time
+import argparse
+import resource
+import tempfile
+import multiprocessing as mp
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "dags"))
+
+from storage import JobsWriter, jobs_to_frame, read_jobs  # noqa: E402
+from transform import transform_frame  # noqa: E402
+from skill_visualize import count_skills  # noqa: E402
+from synthetic import make_job_records  # noqa: E402
+
+
+def make_input(path, rows, batch=20_000):
+    """Ghi file transform giả lập theo từng phần."""
+    with JobsWriter(path) as writer:
+        for start in range(0, rows, batch):
+            records = make_job_records(min(batch, rows - start), seed=start, description_paragraphs=1)
+            writer.write(transform_frame(jobs_to_frame(records)))
+
+
+def _worker(path, compact, queue):
+    start = time.perf_counter()
+    df = read_jobs(path, compact=compact)
+    read_s = time.perf_counter() - start
+    usage = df.memory_usage(index=False, deep=True) / 2**20
+    start = time.perf_counter()
+    counts = count_skills(df)
+    count_s = time.perf_counter() - start
+    queue.put({"read_s": read_s, "count_s": count_s, "usage": usage,
+               "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, "counts": counts})
+
+
+def run(path, compact):
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_worker, args=(path, compact, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[20_000, 100_000])
+    args = parser.parse_args()
+
+    failed = False
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, "transformed.parquet")
+            make_input(path, rows)
+            plain, compact = run(path, False), run(path, True)
+
+        identical = plain["counts"].equals(compact["counts"])
+        failed = failed or not identical
+        print(f"rows={rows:>9d}")
+        for name in plain["usage"].sort_values(ascending=False).index:
+            print(f"  {name:<18s} {plain['usage'][name]:8.2f}MB → {compact['usage'][name]:8.2f}MB")
+        for label, result in (("plain", plain), ("compact", compact)):
+            print(f"  {label:<8s} frame={result['usage'].sum():8.1f}MB peak_rss={result['peak_rss_mb']:8.1f}MB "
+                  f"read={result['read_s']:6.3f}s count_skills={result['count_s']:6.3f}s")
+        print(f"  identical_counts={identical}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
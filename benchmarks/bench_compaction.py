@@ -0,0 +1,107 @@
+"""So sánh đọc lịch sử từ partition ngày và từ file tháng đã gộp (compaction + skip index).
+
+Dữ liệu giả lập gồm một partition mỗi ngày; mỗi truy vấn đọc job theo khoảng created_on
+(và keyword/thành phố) bằng hai cách: mở mọi file transform của từng ngày, hoặc read_range
+trên file tháng. Kết quả hai cách phải giống nhau.
+
+    python benchmarks/bench_compaction.py --days 365 --rows-per-day 200
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "dags"))
+
+import pandas as pd  # noqa: E402
+import metrics  # noqa: E402
+from compaction import compact_partitions, read_range  # noqa: E402
+from storage import TRANSFORMED_FILE, jobs_to_frame, read_unique_jobs, write_jobs  # noqa: E402
+from transform import transform_frame  # noqa: E402
+from synthetic import make_job_records  # noqa: E402
+
+COLUMNS = ['job_id', 'job_title', 'created_on', 'city_name', 'keywords', 'skill_name']
+
+
+def build_partitions(data_dir, days, rows_per_day, seed=0):
+    """Ghi file transform cho từng ngày; created_on của job nằm trong 30 ngày trước ngày scrape."""
+    rng = random.Random(seed)
+    df = transform_frame(jobs_to_frame(make_job_records(days * rows_per_day, description_paragraphs=1)))
+    first = date(2025, 1, 1)
+    for day in range(days):
+        scraped = pd.Timestamp(first + timedelta(days=day))
+        part = df.iloc[day * rows_per_day:(day + 1) * rows_per_day].copy()
+        part['created_on'] = [scraped - pd.Timedelta(minutes=rng.randint(0, 30 * 24 * 60)) for _ in range(len(part))]
+        write_jobs(part, f"{data_dir}/{scraped.date().isoformat()}/{TRANSFORMED_FILE}")
+
+
+def scan_partitions(data_dir, start, end, keyword=None, city=None):
+    """Cách cũ: liệt kê thư mục, mở file transform của mọi ngày rồi lọc."""
+    frames, opened = [], 0
+    for name in sorted(os.listdir(data_dir)):
+        path = os.path.join(data_dir, name, TRANSFORMED_FILE)
+        if not os.path.exists(path):
+            continue
+        df = read_unique_jobs(path, columns=COLUMNS)
+        opened += 1
+        created = df['created_on']
+        mask = (created >= pd.Timestamp(start)) & (created < pd.Timestamp(end) + pd.Timedelta(days=1))
+        if keyword is not None:
+            mask &= df['keywords'].map(lambda values: keyword in values).astype(bool)
+        if city is not None:
+            mask &= df['city_name'].astype(object).str.lower().eq(city.lower()).fillna(False).astype(bool)
+        frames.append(df[mask])
+    return pd.concat(frames, ignore_index=True), opened
+
+
+def _key(df):
+    return df[['job_id', 'created_on']].astype(str).sort_values(['job_id', 'created_on']).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--rows-per-day", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir, tempfile.TemporaryDirectory() as workdir:
+        build_partitions(data_dir, args.days, args.rows_per_day)
+        start = time.perf_counter()
+        months = compact_partitions(data_dir)
+        compact_s = time.perf_counter() - start
+        start = time.perf_counter()
+        rerun = compact_partitions(data_dir)
+        rerun_s = time.perf_counter() - start
+        print(f"days={args.days} rows/day={args.rows_per_day} compact={compact_s:.2f}s ({len(months)} tháng) "
+              f"rerun={rerun_s * 1000:.1f}ms ({len(rerun)} tháng)")
+
+        last = (date(2025, 1, 1) + timedelta(days=args.days - 1)).isoformat()
+        queries = {
+            "whole year": ("2024-01-01", last, None, None),
+            "one month": ("2025-03-01", "2025-03-31", None, None),
+            "month+keyword+city": ("2025-03-01", "2025-03-31", "Data Engineer", "ha noi"),
+        }
+        failed = bool(rerun)
+        for label, (q_start, q_end, keyword, city) in queries.items():
+            t = time.perf_counter()
+            expected, opened = scan_partitions(data_dir, q_start, q_end, keyword, city)
+            scan_s = time.perf_counter() - t
+            with metrics.stage("bench_read_range", workdir) as stage:
+                t = time.perf_counter()
+                result = read_range(q_start, q_end, keyword=keyword, city=city, columns=COLUMNS, data_dir=data_dir)
+                range_s = time.perf_counter() - t
+            opened_range = stage.counters["files_opened"]
+            files = opened_range + stage.counters["files_skipped"]
+            identical = _key(expected).equals(_key(result))
+            failed = failed or not identical
+            print(f"{label:<20s} rows={len(result):>7d} daily={scan_s:7.3f}s/{opened:4d} files "
+                  f"compacted={range_s:7.3f}s/{opened_range:3d} of {files} files identical={identical}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Đo thời gian parse dags/etl_dag.py và lượng module/bộ nhớ nó kéo theo, thoát mã 1 nếu vượt ngân sách.
+
+Mỗi lần đo chạy trong một interpreter mới (như DAG processor). Thời gian import airflow được
+tính riêng vì scheduler đã nạp sẵn airflow; chỉ phần của file DAG được so với ngân sách.
+Cần cài apache-airflow.
+
+    python benchmarks/bench_dag_parse.py --runs 5 --max-parse-ms 300
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+DAGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "dags")
+DAG_FILE = os.path.join(DAGS_DIR, "etl_dag.py")
+
+# Module chỉ được import khi task chạy, không được import lúc parse DAG
+HEAVY_MODULES = ["selenium", "seleniumwire", "webdriver_manager", "pandas", "pyarrow",
+                 "matplotlib", "seaborn", "numpy", "requests"]
+
+PROBE = """
+import sys, time, json, resource, runpy
+sys.path.insert(0, {dags_dir!r})
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+start = time.perf_counter()
+from airflow import DAG
+from airflow.operators.python import PythonOperator
+airflow_s = time.perf_counter() - start
+
+before = set(sys.modules)
+rss_before = rss_mb()
+start = time.perf_counter()
+runpy.run_path({dag_file!r}, run_name="etl_dag")
+parse_s = time.perf_counter() - start
+new_modules = sorted(set(sys.modules) - before)
+
+print(json.dumps({{
+    "airflow_import_s": airflow_s,
+    "parse_s": parse_s,
+    "new_modules": new_modules,
+    "rss_delta_mb": rss_mb() - rss_before,
+}}))
+"""
+
+
+def measure_once():
+    """Parse file DAG trong một interpreter mới và trả về số đo."""
+    code = PROBE.format(dags_dir=DAGS_DIR, dag_file=DAG_FILE)
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-parse-ms", type=float, default=300.0,
+                        help="Ngân sách trung vị thời gian parse file DAG (không tính import airflow)")
+    parser.add_argument("--max-new-modules", type=int, default=50,
+                        help="Số module mới tối đa file DAG được kéo theo")
+    parser.add_argument("--max-rss-mb", type=float, default=20.0, help="Mức tăng peak RSS tối đa khi parse")
+    parser.add_argument("--json", action="store_true", help="In kết quả dạng JSON")
+    args = parser.parse_args()
+
+    try:
+        import airflow  # noqa: F401
+    except ImportError:
+        sys.exit("Cần cài apache-airflow để đo thời gian parse DAG.")
+
+    runs = [measure_once() for _ in range(args.runs)]
+    last = runs[-1]
+    heavy = sorted({name.split(".")[0] for name in last["new_modules"]} & set(HEAVY_MODULES))
+    result = {
+        "parse_ms_median": statistics.median(r["parse_s"] for r in runs) * 1000,
+        "parse_ms_max": max(r["parse_s"] for r in runs) * 1000,
+        "airflow_import_ms_median": statistics.median(r["airflow_import_s"] for r in runs) * 1000,
+        "new_modules": len(last["new_modules"]),
+        "rss_delta_mb": max(r["rss_delta_mb"] for r in runs),
+        "heavy_modules": heavy,
+    }
+
+    violations = []
+    if result["parse_ms_median"] > args.max_parse_ms:
+        violations.append(f"parse {result['parse_ms_median']:.1f}ms > {args.max_parse_ms}ms")
+    if result["new_modules"] > args.max_new_modules:
+        violations.append(f"{result['new_modules']} module mới > {args.max_new_modules}")
+    if result["rss_delta_mb"] > args.max_rss_mb:
+        violations.append(f"RSS tăng {result['rss_delta_mb']:.1f}MB > {args.max_rss_mb}MB")
+    if heavy:
+        violations.append("import nặng lúc parse: " + ", ".join(heavy))
+    result["violations"] = violations
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print("parse median={parse_ms_median:.1f}ms max={parse_ms_max:.1f}ms "
+              "(airflow import {airflow_import_ms_median:.1f}ms) new_modules={new_modules} "
+              "rss_delta={rss_delta_mb:.1f}MB heavy={heavy_modules}".format(**result))
+        for violation in violations:
+            print(f"VƯỢT NGÂN SÁCH: {violation}")
+
+    sys.exit(1 if violations else 0)
+
+
+if __name__ == "__main__":
+    main()
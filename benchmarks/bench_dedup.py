@@ -0,0 +1,107 @@
+"""Đo throughput và độ chính xác của bước dedup (MinHash/LSH) trên tin đăng giả lập có tin đăng lại.
+
+Một phần tin là bản sao của tin trước đó với URL mới và vài từ bị sửa; kết quả được so với
+nhãn đúng (precision/recall). Dữ liệu chia thành hai ngày: ngày thứ hai chỉ hash tin mới và
+tìm tin gốc trong cache của ngày đầu. --template-words cho các tin gốc dùng chung phần đầu mô tả
+từ vài mẫu (như tin cùng công ty/mẫu đăng), làm bucket LSH rất lớn.
+
+    python benchmarks/bench_dedup.py --rows 20000 100000 --repost-rate 0.2 --edits 3
+    python benchmarks/bench_dedup.py --rows 8000 --template-words 200
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import resource
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "dags"))
+
+import pandas as pd  # noqa: E402
+from dedup import MinHasher, SignatureStore, find_duplicates  # noqa: E402
+from storage import job_keys  # noqa: E402
+
+VOCABULARY = [f"w{i}" for i in range(5000)] + ["python", "sql", "spark", "airflow", "kỹ", "sư", "dữ", "liệu"]
+
+
+def make_postings(rows, repost_rate, edits, words, template_words=0, templates=5, seed=0):
+    """DataFrame tin đăng và Series job_key của tin gốc (None nếu là tin gốc).
+
+    Tin gốc lấy template_words từ đầu mô tả từ một trong templates mẫu chung, phần còn lại ngẫu nhiên.
+    """
+    rng = random.Random(seed)
+    shared = [[rng.choice(VOCABULARY) for _ in range(template_words)] for _ in range(templates)]
+    records, truth = [], []
+    for i in range(rows):
+        if records and rng.random() < repost_rate:
+            source = rng.randrange(len(records))
+            original = records[source]
+            text = original["job_description"].split()
+            for _ in range(edits):
+                text[rng.randrange(len(text))] = rng.choice(VOCABULARY)
+            record = dict(original, job_description=" ".join(text))
+            truth.append(truth[source] or f"id:{original['job_id']}")
+        else:
+            record = {
+                "job_title": f"senior data engineer {rng.randrange(50)}",
+                "company_name": f"company {rng.randrange(rows // 10 + 1)} jsc",
+                "job_description": " ".join((rng.choice(shared) if template_words else [])
+                                            + [rng.choice(VOCABULARY) for _ in range(words - template_words)]),
+            }
+            truth.append(None)
+        record.update(job_id=str(1_000_000 + i), job_url=f"https://www.vietnamworks.com/job-{i}-jv",
+                      created_on=pd.Timestamp("2025-01-01") + pd.Timedelta(minutes=i))
+        records.append(record)
+    return pd.DataFrame(records), pd.Series(truth, dtype=object)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[20_000])
+    parser.add_argument("--repost-rate", type=float, default=0.2)
+    parser.add_argument("--edits", type=int, default=3, help="Số từ bị sửa trong mỗi tin đăng lại")
+    parser.add_argument("--words", type=int, default=200, help="Số từ của mỗi mô tả")
+    parser.add_argument("--template-words", type=int, default=0, help="Số từ đầu mô tả lấy từ mẫu chung")
+    parser.add_argument("--templates", type=int, default=5, help="Số mẫu mô tả chung")
+    parser.add_argument("--min-recall", type=float, default=None, help="Thoát với mã 1 nếu recall thấp hơn")
+    args = parser.parse_args()
+
+    hasher = MinHasher()
+    print(f"num_perm={hasher.num_perm} bands={hasher.bands} rows={hasher.rows} "
+          f"threshold≈{hasher.threshold:.2f}")
+    failed = False
+    for rows in args.rows:
+        df, truth = make_postings(rows, args.repost_rate, args.edits, args.words, args.template_words, args.templates)
+        half = rows // 2
+        with tempfile.TemporaryDirectory() as workdir:
+            store = SignatureStore(os.path.join(workdir, "signatures.sqlite"), hasher.settings)
+            timings, found = [], []
+            for execution_date, part in (("2025-01-01", df.iloc[:half]), ("2025-01-02", df.iloc[half:])):
+                start = time.perf_counter()
+                found.append(find_duplicates(execution_date, part, store, hasher))
+                timings.append(time.perf_counter() - start)
+            # Chạy lại ngày thứ hai: mọi job đã có trong cache, không hash lại
+            start = time.perf_counter()
+            rerun = find_duplicates("2025-01-02", df.iloc[half:], store, hasher)
+            rerun_s = time.perf_counter() - start
+            store.close()
+
+        found = pd.concat(found)
+        predicted, actual = found.notna(), truth.notna()
+        true_positive = int((predicted & actual & (found == truth)).sum())
+        precision = true_positive / max(int(predicted.sum()), 1)
+        recall = true_positive / max(int(actual.sum()), 1)
+        stable = rerun.equals(found.iloc[half:])
+        print(f"rows={rows:>8d} reposts={int(actual.sum()):>7d} day1={timings[0]:6.2f}s day2={timings[1]:6.2f}s "
+              f"jobs/s={rows / sum(timings):8.0f} rerun={rerun_s:5.2f}s precision={precision:.3f} "
+              f"recall={recall:.3f} stable={stable} keys_unique={job_keys(df).is_unique} "
+              f"peak_rss={resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f}MB")
+        if not stable or (args.min_recall is not None and recall < args.min_recall):
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
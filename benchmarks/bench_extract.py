@@ -0,0 +1,146 @@
+"""Đo throughput/độ trễ của đường extract (WebScraper.extract_jobs) với API tìm kiếm giả lập.
+
+API giả lập chạy trong process chính, WebScraper chạy trong process riêng để đo peak RSS
+độc lập. Không cần mạng hay trình duyệt, nên chạy được trong CI.
+
+    python benchmarks/bench_extract.py --hits 2000 --latency-ms 40 --concurrency 1 4 8
+
+Với --max-inflight API giả lập trả 429 (kèm Retry-After) khi có quá nhiều request đồng thời;
+so sánh giới hạn thích ứng (AIMD, mặc định) với số request cố định bằng --fixed-concurrency.
+
+    python benchmarks/bench_extract.py --concurrency 16 --max-inflight 6 --retry-after 0.2
+"""
+import os
+import sys
+import time
+import json
+import argparse
+import resource
+import tempfile
+import threading
+import multiprocessing as mp
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "dags"))
+
+from api_client import AIMDLimiter  # noqa: E402
+from extract import KEYWORDS, WebScraper  # noqa: E402
+from stub_search_api import StubConfig, StubSearchServer  # noqa: E402
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def _worker(api_url, keywords, concurrency, hits_per_page, fixed, queue):
+    latencies = []
+    received = [0]
+    lock = threading.Lock()
+
+    def record(response, *args, **kwargs):
+        # Hook chạy trong các thread lấy trang song song
+        size = len(response.content)
+        with lock:
+            # elapsed: từ lúc gửi request đến khi nhận xong header
+            latencies.append(response.elapsed.total_seconds() * 1000)
+            received[0] += size
+
+    scraper = WebScraper(max_concurrency=concurrency, hits_per_page=hits_per_page, api_url=api_url)
+    scraper.keywords = keywords
+    if fixed:
+        scraper.api_client.limiter = AIMDLimiter(concurrency, concurrency, concurrency)
+    scraper.bootstrap_session(cookies={})
+    scraper.session.hooks["response"].append(record)
+
+    error = None
+    with tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        try:
+            scraper.extract_jobs(workdir, execution_date="2025-01-01", incremental=False, archive=False)
+        except Exception as e:
+            # Extract báo lỗi thay vì trả thiếu dữ liệu (hết lần retry hoặc circuit breaker mở)
+            error = f"{type(e).__name__}: {e}"
+        elapsed = time.perf_counter() - start
+
+    queue.put({
+        "elapsed_s": elapsed,
+        "jobs": scraper.index.raw_count,
+        "unique_jobs": len(scraper.index.jobs),
+        "requests": len(latencies),
+        "p50_ms": _percentile(latencies, 50),
+        "p99_ms": _percentile(latencies, 99),
+        "bytes_received": received[0],
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "final_limit": scraper.api_client.limiter.limit,
+        "error": error,
+    })
+
+
+def run_case(api_url, keywords, concurrency, hits_per_page, fixed=False):
+    """Chạy extract trong process con và trả về số đo."""
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_worker, args=(api_url, keywords, concurrency, hits_per_page, fixed, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    result["jobs_per_s"] = result["jobs"] / result["elapsed_s"]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--keywords", type=int, default=3, help="Số keyword (lấy từ extract.KEYWORDS)")
+    parser.add_argument("--hits", type=int, default=1000, help="Tổng số kết quả cho mỗi keyword")
+    parser.add_argument("--hits-per-page", type=int, default=50)
+    parser.add_argument("--description-bytes", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Tỉ lệ request trả về 429")
+    parser.add_argument("--max-inflight", type=int, default=None,
+                        help="API giả lập trả 429 khi số request đồng thời vượt ngưỡng này")
+    parser.add_argument("--retry-after", type=float, default=1, help="Retry-After (giây) của response 429")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4],
+                        help="Số request đồng thời tối đa (mức trần của giới hạn thích ứng)")
+    parser.add_argument("--fixed-concurrency", action="store_true",
+                        help="Tắt giới hạn thích ứng, luôn gửi đúng --concurrency request cùng lúc")
+    parser.add_argument("--min-jobs-per-s", type=float, default=None,
+                        help="Thoát với mã 1 nếu throughput thấp hơn ngưỡng này")
+    parser.add_argument("--json", action="store_true", help="In kết quả dạng JSON")
+    args = parser.parse_args()
+
+    config = StubConfig(args.hits, args.description_bytes, args.latency_ms, args.jitter_ms, args.error_rate,
+                        max_inflight=args.max_inflight, retry_after=args.retry_after)
+    keywords = KEYWORDS[:args.keywords]
+
+    results = []
+    failed = False
+    with StubSearchServer(config) as server:
+        for concurrency in args.concurrency:
+            result = {"concurrency": concurrency,
+                      **run_case(server.url, keywords, concurrency, args.hits_per_page, args.fixed_concurrency)}
+            result["complete"] = result["error"] is None and result["jobs"] == len(keywords) * args.hits
+            results.append(result)
+            if not result["complete"] or (args.min_jobs_per_s is not None and result["jobs_per_s"] < args.min_jobs_per_s):
+                failed = True
+            if not args.json:
+                print("concurrency={concurrency:>3d} jobs={jobs:>7d} unique={unique_jobs:>7d} "
+                      "time={elapsed_s:7.3f}s jobs/s={jobs_per_s:9.1f} requests={requests:>5d} "
+                      "p50={p50_ms:7.1f}ms p99={p99_ms:7.1f}ms received={mb:7.2f}MB "
+                      "peak_rss={peak_rss_mb:7.1f}MB limit={final_limit} complete={complete}".format(
+                          mb=result["bytes_received"] / 2**20, **result))
+                if result["error"]:
+                    print(f"  lỗi: {result['error']}")
+        status = dict(server.stats["status"])
+    if args.json:
+        print(json.dumps({"results": results, "server_status": status}, indent=2))
+    else:
+        print(f"server status codes: {status}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
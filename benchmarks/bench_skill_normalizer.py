@@ -0,0 +1,88 @@
+"""Đo throughput của SkillNormalizer (chuẩn hóa skill_name + tìm skill trong mô tả) theo số dòng.
+
+Văn bản giả lập khác nhau theo từng dòng (không được lợi từ việc bỏ văn bản trùng), kết quả
+được so với cách làm từng dòng bằng vòng lặp Python trên một mẫu.
+
+    python benchmarks/bench_skill_normalizer.py --rows 100000 1000000 --workers 8
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "dags"))
+
+import pandas as pd  # noqa: E402
+from skill_normalizer import SkillNormalizer, skill_key  # noqa: E402
+from synthetic import SKILLS  # noqa: E402
+
+FILLER = ("chúng tôi đang tìm kiếm kỹ sư dữ liệu có kinh nghiệm làm việc với hệ thống lớn, "
+          "the candidate will design build and maintain pipelines for the data team").split()
+TEXT_SKILLS = ["python", "sql", "apache spark", "airflow", "power bi", "aws", "docker", "sql server",
+               "machine learning", "etl/elt", "k8s", "c++", "postgres"]
+API_VARIANTS = SKILLS + ["python3", "Python (Programming)", " sql ", "PySpark", "Apache Kafka", "Rust"]
+
+
+def make_columns(rows, words, seed=0):
+    """Cột skill_name và hai cột văn bản (đã chữ thường) với nội dung khác nhau cho từng dòng."""
+    rng = random.Random(seed)
+    skills, descriptions, requirements = [], [], []
+    for i in range(rows):
+        skills.append(rng.sample(API_VARIANTS, rng.randint(0, 5)))
+        text = [rng.choice(FILLER) for _ in range(words)]
+        for _ in range(rng.randint(0, 4)):
+            text[rng.randrange(words)] = rng.choice(TEXT_SKILLS)
+        descriptions.append(" ".join(text) + f" #{i}")
+        requirements.append(" ".join(rng.choice(FILLER) for _ in range(words // 2)) + f" {rng.choice(TEXT_SKILLS)}")
+    return pd.Series(skills), pd.Series(descriptions), pd.Series(requirements)
+
+
+def reference(normalizer, skills, texts):
+    """Cách làm từng dòng dùng để kiểm tra kết quả."""
+    result = []
+    for i, skill_list in enumerate(skills):
+        out = []
+        names = [normalizer.lookup.get(skill_key(s), " ".join(s.split())) for s in skill_list if s.strip()]
+        names += [normalizer.lookup[m] for text in texts for m in normalizer.text_pattern.findall(text.iloc[i])]
+        for name in names:
+            if name not in out:
+                out.append(name)
+        result.append(out)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000])
+    parser.add_argument("--words", type=int, default=80, help="Số từ của mô tả giả lập")
+    parser.add_argument("--workers", type=int, default=None, help="Số process quét văn bản (mặc định số CPU)")
+    parser.add_argument("--check-rows", type=int, default=2000, help="Số dòng so với cách làm từng dòng")
+    parser.add_argument("--min-rows-per-s", type=float, default=None,
+                        help="Thoát với mã 1 nếu throughput thấp hơn ngưỡng này")
+    args = parser.parse_args()
+
+    normalizer = SkillNormalizer(max_workers=args.workers)
+    failed = False
+    for rows in args.rows:
+        skills, descriptions, requirements = make_columns(rows, args.words)
+        text_mb = (descriptions.str.len().sum() + requirements.str.len().sum()) / 2**20
+
+        start = time.perf_counter()
+        result = normalizer.normalize(skills, (descriptions, requirements))
+        elapsed = time.perf_counter() - start
+
+        check = min(rows, args.check_rows)
+        expected = reference(normalizer, skills.head(check), (descriptions, requirements))
+        identical = result.head(check).tolist() == expected
+        rows_per_s = rows / elapsed
+        print(f"rows={rows:>9d} text={text_mb:8.1f}MB time={elapsed:7.2f}s rows/s={rows_per_s:10.0f} "
+              f"MB/s={text_mb / elapsed:6.1f} workers={normalizer.max_workers} identical={identical}")
+        if not identical or (args.min_rows_per_s is not None and rows_per_s < args.min_rows_per_s):
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""So sánh định dạng lưu trữ: CSV (+ ast.literal_eval) và Parquet theo storage.JOB_SCHEMA.
+
+Mỗi trường hợp chạy trong một process riêng để đo peak RSS độc lập.
+
+    python benchmarks/bench_storage.py --rows 20000 50000
+"""
+import os
+import sys
+import ast
+import time
+import json
+import argparse
+import resource
+import tempfile
+import multiprocessing as mp
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "dags"))
+
+import pandas as pd  # noqa: E402
+from storage import jobs_to_frame, write_jobs, read_jobs  # noqa: E402
+from synthetic import make_job_records  # noqa: E402
+
+
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _run_csv(rows, workdir):
+    path = os.path.join(workdir, "jobs.csv")
+    records = make_job_records(rows)
+    start = time.perf_counter()
+    df = pd.DataFrame(records)
+    df.to_csv(path, index=False, encoding="utf-8-sig")
+    write_s = time.perf_counter() - start
+    del records, df
+
+    start = time.perf_counter()
+    df = pd.read_csv(path, encoding="utf-8-sig")
+    for col in ['skill_name', 'keywords']:
+        df[col] = df[col].apply(lambda x: ast.literal_eval(x) if pd.notna(x) else [])
+    read_s = time.perf_counter() - start
+    return {"size_mb": os.path.getsize(path) / 2**20, "write_s": write_s, "read_s": read_s}
+
+
+def _run_parquet(rows, workdir):
+    path = os.path.join(workdir, "jobs.parquet")
+    records = make_job_records(rows)
+    start = time.perf_counter()
+    write_jobs(jobs_to_frame(records), path)
+    write_s = time.perf_counter() - start
+    del records
+
+    start = time.perf_counter()
+    read_jobs(path)
+    read_s = time.perf_counter() - start
+    return {"size_mb": os.path.getsize(path) / 2**20, "write_s": write_s, "read_s": read_s}
+
+
+CASES = {"csv": _run_csv, "parquet": _run_parquet}
+
+
+def _worker(case, rows, queue):
+    with tempfile.TemporaryDirectory() as workdir:
+        result = CASES[case](rows, workdir)
+    result["peak_rss_mb"] = _peak_rss_mb()
+    queue.put(result)
+
+
+def run_case(case, rows):
+    """Chạy một trường hợp trong process con và trả về số đo."""
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_worker, args=(case, rows, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 50_000])
+    parser.add_argument("--json", action="store_true", help="In kết quả dạng JSON")
+    args = parser.parse_args()
+
+    results = []
+    for rows in args.rows:
+        for case in CASES:
+            result = {"format": case, "rows": rows, **run_case(case, rows)}
+            results.append(result)
+            if not args.json:
+                print("{format:8s} rows={rows:>8d} size={size_mb:8.2f}MB write={write_s:7.3f}s "
+                      "read={read_s:7.3f}s peak_rss={peak_rss_mb:8.1f}MB".format(**result))
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
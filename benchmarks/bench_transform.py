@@ -0,0 +1,127 @@
+"""Benchmark transform_frame (xử lý theo cột) so với bản cũ xử lý từng dòng.
+
+Mỗi kích thước chạy cả hai cách trên cùng một DataFrame, kiểm tra file Parquet đầu ra
+giống nhau từng byte rồi in thời gian và hệ số tăng tốc.
+
+    python benchmarks/bench_transform.py --rows 10000 100000 1000000 --legacy-max-rows 10000
+    python benchmarks/bench_transform.py --rows 100000 --min-speedup 5   # thoát với mã 1 nếu chậm hơn
+"""
+import io
+import os
+import re
+import sys
+import time
+import argparse
+from html import unescape
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "dags"))
+
+import pandas as pd  # noqa: E402
+import pyarrow.parquet as pq  # noqa: E402
+from storage import jobs_to_frame, to_table  # noqa: E402
+from transform import CITY_MAPPING, transform_frame  # noqa: E402
+from synthetic import make_job_records  # noqa: E402
+
+
+def legacy_transform_frame(df):
+    """Bản transform cũ (apply từng dòng/ô), giữ lại làm chuẩn so sánh."""
+    def normalize_date(date_str):
+        if pd.isna(date_str):
+            return pd.NaT
+        try:
+            return pd.to_datetime(date_str).tz_localize(None)
+        except Exception:
+            return pd.NaT
+
+    for col in ['created_on', 'approved_on', 'expired_on']:
+        if col in df.columns:
+            df[col] = df[col].apply(normalize_date)
+
+    def clean_html(text):
+        if pd.isna(text):
+            return text
+        text = unescape(str(text))
+        text = re.sub(r'<[^>]+>', '', text)
+        return ' '.join(text.split())
+
+    for col in ['job_description', 'job_requirement']:
+        if col in df.columns:
+            df[col] = df[col].apply(clean_html)
+
+    def fill_and_normalize(row):
+        city = row.get('city_name')
+        addr = row.get('address')
+        if pd.isna(city):
+            if pd.notna(addr) and addr.lower() in CITY_MAPPING:
+                city = CITY_MAPPING[addr.lower()]
+            else:
+                city = 'Unknown'
+        else:
+            city = CITY_MAPPING.get(city.lower(), city)
+        if pd.isna(addr):
+            addr = city
+        return pd.Series([city, addr], index=['city_name', 'address'])
+
+    if 'city_name' in df.columns and 'address' in df.columns:
+        df[['city_name', 'address']] = df.apply(fill_and_normalize, axis=1)
+
+    def normalize_case(text):
+        if pd.isna(text):
+            return text
+        return ' '.join(str(text).lower().split())
+
+    for col in ['job_title', 'company_name', 'city_name', 'job_description', 'job_requirement', 'address']:
+        if col in df.columns:
+            df[col] = df[col].apply(normalize_case)
+    return df
+
+
+def parquet_bytes(df):
+    """Ghi DataFrame theo schema của pipeline vào bộ nhớ, trả về bytes."""
+    buffer = io.BytesIO()
+    pq.write_table(to_table(df), buffer, compression="zstd")
+    return buffer.getvalue()
+
+
+def timed(func, df):
+    start = time.perf_counter()
+    result = func(df)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--legacy-max-rows", type=int, default=10_000,
+                        help="Bỏ qua bản cũ khi số dòng lớn hơn giá trị này (bản cũ chạy rất lâu)")
+    parser.add_argument("--paragraphs", type=int, default=2, help="Độ dài mô tả công việc giả lập")
+    parser.add_argument("--min-speedup", type=float, default=None,
+                        help="Thoát với mã 1 nếu hệ số tăng tốc thấp hơn ngưỡng này")
+    args = parser.parse_args()
+
+    failed = False
+    for rows in args.rows:
+        base = jobs_to_frame(make_job_records(rows, description_paragraphs=args.paragraphs))
+        # Dữ liệu đầu vào như khi extract: ngày ở dạng chuỗi ISO có múi giờ
+        for col in ['created_on', 'approved_on', 'expired_on']:
+            base[col] = base[col].dt.strftime("%Y-%m-%dT%H:%M:%S+07:00").where(base[col].notna(), None)
+
+        vectorized, vectorized_s = timed(transform_frame, base.copy())
+        line = f"rows={rows:>9d} vectorized={vectorized_s:8.3f}s"
+
+        if rows <= args.legacy_max_rows:
+            legacy, legacy_s = timed(legacy_transform_frame, base.copy())
+            identical = parquet_bytes(legacy) == parquet_bytes(vectorized)
+            speedup = legacy_s / vectorized_s
+            line += f" legacy={legacy_s:8.3f}s speedup={speedup:6.1f}x identical={identical}"
+            if not identical:
+                failed = True
+            if args.min_speedup is not None and speedup < args.min_speedup:
+                failed = True
+        print(line)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
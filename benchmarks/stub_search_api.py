@@ -0,0 +1,188 @@
+"""API tìm kiếm giả lập có cùng dạng request/response với job-search/v1.0/search của VietnamWorks.
+
+Sinh job giả lập theo (keyword, trang) một cách tất định, với độ lớn mô tả, tổng số kết quả,
+độ trễ, tỉ lệ lỗi 429 và giới hạn số request đồng thời (vượt quá thì trả 429 kèm Retry-After)
+cấu hình được. Dùng cho benchmark extract không cần mạng.
+
+    python benchmarks/stub_search_api.py --port 8765 --hits 2000 --latency-ms 50
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from functools import lru_cache
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from synthetic import ADDRESSES, CITIES, LEVELS, PARAGRAPH, SKILLS
+
+SEARCH_PATH = "/job-search/v1.0/search"
+
+
+class StubConfig:
+    """Tham số của API giả lập."""
+
+    def __init__(self, hits=1000, description_bytes=2000, latency_ms=0.0, jitter_ms=0.0,
+                 error_rate=0.0, seed=0, max_inflight=None, retry_after=1):
+        self.hits = hits
+        self.description_bytes = description_bytes
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.seed = seed
+        self.max_inflight = max_inflight
+        self.retry_after = retry_after
+
+
+def make_api_job(keyword, position, description_bytes, seed=0):
+    """Một job dạng response API (camelCase) cho vị trí position trong kết quả của keyword."""
+    rng = random.Random(f"{seed}:{keyword}:{position}")
+    # Các keyword chồng lấn một phần để có job trùng như dữ liệu thật
+    job_id = 1_000_000 + rng.randint(0, 4) * 100_000 + position
+    created = datetime(2025, 1, 1) + timedelta(days=rng.randint(0, 365), seconds=rng.randint(0, 86400))
+    description = (PARAGRAPH * (description_bytes // len(PARAGRAPH) + 1))[:description_bytes]
+    city = rng.choice(CITIES)
+    return {
+        "jobId": job_id,
+        "jobTitle": f"Senior {keyword} #{position}",
+        "jobUrl": f"https://www.vietnamworks.com/job-{job_id}-jv",
+        "createdOn": created.strftime("%Y-%m-%dT%H:%M:%S+07:00"),
+        "approvedOn": (created + timedelta(hours=6)).strftime("%Y-%m-%dT%H:%M:%S+07:00"),
+        "expiredOn": (created + timedelta(days=30)).strftime("%Y-%m-%dT%H:%M:%S+07:00"),
+        "companyName": f"Company {rng.randint(0, 500)} JSC",
+        "jobDescription": description,
+        "jobRequirement": description[:description_bytes // 2],
+        "salary": rng.choice(["Thương lượng", "1000 - 2000"]),
+        "salaryMax": rng.choice([2000, 3000, 0]),
+        "salaryMin": rng.choice([500, 1000, 0]),
+        "skills": [{"skillName": skill} for skill in rng.sample(SKILLS, rng.randint(0, 5))],
+        "address": rng.choice(ADDRESSES),
+        "workingLocations": [{"cityName": city}] if city else [],
+        "jobLevel": rng.choice(LEVELS),
+        "salaryCurrency": rng.choice(["USD", "VND"]),
+    }
+
+
+def make_handler(config, stats):
+    """Tạo lớp handler gắn với cấu hình và bộ đếm của server."""
+
+    @lru_cache(maxsize=4096)
+    def page_jobs(keyword, page, hits_per_page):
+        start = page * hits_per_page
+        stop = min(start + hits_per_page, config.hits)
+        return [make_api_job(keyword, position, config.description_bytes, config.seed)
+                for position in range(start, stop)]
+
+    class SearchHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive như API thật
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body, headers=None):
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+            with stats["lock"]:
+                stats["requests"] += 1
+                stats["bytes_sent"] += len(data)
+                stats["status"][status] = stats["status"].get(status, 0) + 1
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            if self.path != SEARCH_PATH:
+                self._send(404, {"message": "not found"})
+                return
+
+            with stats["lock"]:
+                stats["inflight"] += 1
+                overloaded = config.max_inflight is not None and stats["inflight"] > config.max_inflight
+            try:
+                delay = config.latency_ms + random.uniform(0, config.jitter_ms)
+                if delay:
+                    time.sleep(delay / 1000)
+                if overloaded or (config.error_rate and random.random() < config.error_rate):
+                    self._send(429, {"message": "Too Many Requests"}, {"Retry-After": str(config.retry_after)})
+                    return
+                self._send_page(payload)
+            finally:
+                with stats["lock"]:
+                    stats["inflight"] -= 1
+
+        def _send_page(self, payload):
+            hits_per_page = int(payload.get("hitsPerPage", 50))
+            page = int(payload.get("page", 0))
+            fields = payload.get("retrieveFields") or []
+            jobs = page_jobs(payload.get("query", ""), page, hits_per_page)
+            data = [{field: job[field] for field in fields if field in job} for job in jobs]
+            nb_pages = -(-config.hits // hits_per_page)
+            self._send(200, {"data": data, "meta": {"nbHits": config.hits, "nbPages": nb_pages, "page": page}})
+
+    return SearchHandler
+
+
+class StubSearchServer:
+    """Chạy API giả lập trong một thread nền; dùng được như context manager."""
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or StubConfig()
+        self.stats = {"lock": threading.Lock(), "requests": 0, "bytes_sent": 0, "status": {}, "inflight": 0}
+        self.server = ThreadingHTTPServer((host, port), make_handler(self.config, self.stats))
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}{SEARCH_PATH}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--hits", type=int, default=1000, help="Tổng số kết quả cho mỗi keyword")
+    parser.add_argument("--description-bytes", type=int, default=2000, help="Độ dài jobDescription")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Tỉ lệ request trả về 429")
+    parser.add_argument("--max-inflight", type=int, default=None, help="Số request đồng thời tối đa trước khi trả 429")
+    parser.add_argument("--retry-after", type=float, default=1, help="Giá trị header Retry-After (giây)")
+    args = parser.parse_args()
+
+    config = StubConfig(args.hits, args.description_bytes, args.latency_ms, args.jitter_ms, args.error_rate,
+                        max_inflight=args.max_inflight, retry_after=args.retry_after)
+    server = StubSearchServer(config, args.host, args.port)
+    print(f"API giả lập chạy tại {server.url}")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Sinh dữ liệu job giả lập có cùng dạng với job_entry của WebScraper, dùng cho benchmark."""
+import random
+from datetime import datetime, timedelta
+
+KEYWORDS = ["Data Engineer", "Data Analyst", "Data Scientist", "Machine Learning Engineer", "AI Engineer"]
+SKILLS = ["Python", "SQL", "Spark", "Airflow", "Kafka", "AWS", "Docker", "Tableau", "Power BI",
+          "Machine Learning", "Deep Learning", "TensorFlow", "PyTorch", "Excel", "Hadoop", "ETL"]
+CITIES = ["Ho Chi Minh", "Ha Noi", "Binh Duong", "Dong Nai", "Other", None]
+ADDRESSES = ["Quận 1, Ho Chi Minh", "Quận Cầu Giấy, Ha Noi", "Thành phố Thủ Dầu Một", "hcm", "Ha Noi",
+             "District 7, HCMC", "Huyện Long Thành, Đồng Nai", None]
+LEVELS = ["Experienced (non-manager)", "Entry Level", "Intern/Student", "Manager"]
+PARAGRAPH = ("<p>We are looking for a <strong>data</strong> engineer &amp; analyst to build pipelines "
+             "with Python, SQL and Spark.</p><ul><li>Own ETL jobs</li><li>Work with Airflow &amp; Kafka</li></ul>")
+
+
+def make_job_records(n, seed=0, description_paragraphs=4):
+    """Tạo n job_entry giả lập (ngày dạng chuỗi ISO có múi giờ, skill/keyword dạng list)."""
+    rng = random.Random(seed)
+    base = datetime(2025, 1, 1)
+    records = []
+    for i in range(n):
+        created = base + timedelta(days=rng.randint(0, 365), seconds=rng.randint(0, 86400))
+        records.append({
+            "job_id": 1_000_000 + i,
+            "job_title": f"  Senior {rng.choice(KEYWORDS)}  #{i} ",
+            "job_url": f"https://www.vietnamworks.com/job-{i}-jv",
+            "created_on": created.strftime("%Y-%m-%dT%H:%M:%S+07:00"),
+            "approved_on": (created + timedelta(hours=6)).strftime("%Y-%m-%dT%H:%M:%S+07:00"),
+            "expired_on": (created + timedelta(days=30)).strftime("%Y-%m-%dT%H:%M:%S+07:00") if i % 17 else None,
+            "company_name": f"Company {rng.randint(0, n // 20 + 1)} JSC",
+            "job_description": PARAGRAPH * description_paragraphs if i % 23 else None,
+            "job_requirement": PARAGRAPH * (description_paragraphs // 2 + 1),
+            "salary": rng.choice(["Thương lượng", "1000 - 2000", None]),
+            "salary_max": rng.choice([2000, 3000, 0, None]),
+            "salary_min": rng.choice([500, 1000, 0, None]),
+            "skill_name": rng.sample(SKILLS, rng.randint(0, 5)),
+            "address": rng.choice(ADDRESSES),
+            "city_name": rng.choice(CITIES),
+            "job_level": rng.choice(LEVELS),
+            "salary_currency": rng.choice(["USD", "VND"]),
+            "keywords": rng.sample(KEYWORDS, rng.randint(1, 3)),
+        })
+    return records
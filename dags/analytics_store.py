@@ -0,0 +1,263 @@
+import os
+import sqlite3
+import logging
+import pandas as pd
+import metrics
+from area_resolver import AreaResolver
+from pipeline_config import DATA_DIR
+from storage import TRANSFORMED_FILE, as_date, job_keys, read_unique_jobs, select_in
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_DIR = "analytics"
+ANALYTICS_DB_FILE = "jobs_analytics.sqlite"
+
+# Cột được phép dùng trong job_counts(by=...)
+COUNT_DIMENSIONS = {
+    'city_name': 'j.city_name',
+    'area': 'j.area',
+    'company_name': 'j.company_name',
+    'job_level': 'j.job_level',
+    'keyword': 'k.keyword',
+    'month': "substr(j.created_date, 1, 7)",
+}
+
+
+def _as_text(series):
+    values = series.astype(object)
+    return values.where(values.notna(), None)
+
+
+class AnalyticsStore:
+    """Kho phân tích SQLite có index, gộp mọi partition đã transform (mỗi job một dòng, bản mới nhất thắng).
+
+    Bảng jobs giữ thông tin từng job; job_keywords và job_skills tách danh sách ra từng dòng
+    (tham chiếu job bằng id số nguyên, join nhanh hơn khóa chuỗi) để lọc/đếm bằng index
+    thay vì đọc lại file của từng ngày.
+    """
+
+    def __init__(self, db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, timeout=60)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY,
+                job_key TEXT NOT NULL UNIQUE,
+                last_partition TEXT NOT NULL,
+                job_id TEXT,
+                job_title TEXT,
+                company_name TEXT,
+                created_date TEXT,
+                expired_date TEXT,
+                city_name TEXT,
+                area TEXT,
+                job_level TEXT,
+                salary_min REAL,
+                salary_max REAL,
+                salary_currency TEXT
+            );
+            CREATE TABLE IF NOT EXISTS job_keywords (
+                keyword TEXT NOT NULL,
+                job INTEGER NOT NULL REFERENCES jobs(id),
+                PRIMARY KEY (keyword, job)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS job_skills (
+                job INTEGER NOT NULL REFERENCES jobs(id),
+                skill TEXT NOT NULL,
+                PRIMARY KEY (job, skill)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS partitions (
+                execution_date TEXT PRIMARY KEY,
+                rows INTEGER NOT NULL,
+                loaded_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs(created_date);
+            CREATE INDEX IF NOT EXISTS idx_jobs_city_created ON jobs(city_name, created_date);
+            CREATE INDEX IF NOT EXISTS idx_jobs_area ON jobs(area);
+            CREATE INDEX IF NOT EXISTS idx_job_keywords_job ON job_keywords(job);
+            CREATE INDEX IF NOT EXISTS idx_job_skills_skill ON job_skills(skill);
+        """)
+        self.conn.commit()
+
+    def load_partition(self, execution_date, df):
+        """Upsert một partition đã transform; job đã có từ partition mới hơn được giữ nguyên.
+
+        Chạy lại cùng một ngày cho cùng kết quả.
+        """
+        df = df.assign(job_key=job_keys(df)).dropna(subset=['job_key']).drop_duplicates('job_key', keep='last')
+        current = self._lookup('last_partition', df['job_key'].tolist())
+        newer = df['job_key'].map(current).fillna('') > execution_date
+        df = df[~newer]
+
+        created = pd.to_datetime(df['created_on']).dt.strftime("%Y-%m-%d")
+        expired = pd.to_datetime(df['expired_on']).dt.strftime("%Y-%m-%d")
+        jobs = pd.DataFrame({
+            'job_key': df['job_key'],
+            'last_partition': execution_date,
+            'job_id': _as_text(df['job_id']),
+            'job_title': _as_text(df['job_title']),
+            'company_name': _as_text(df['company_name']),
+            'created_date': _as_text(created),
+            'expired_date': _as_text(expired),
+            'city_name': _as_text(df['city_name']),
+            'area': AreaResolver().resolve(_as_text(df['address']), _as_text(df['city_name'])).tolist(),
+            'job_level': _as_text(df['job_level']),
+            'salary_min': pd.to_numeric(df['salary_min'], errors='coerce').astype(object),
+            'salary_max': pd.to_numeric(df['salary_max'], errors='coerce').astype(object),
+            'salary_currency': _as_text(df['salary_currency']),
+        })
+        jobs = jobs.where(jobs.notna(), None)
+        keywords = df[['job_key', 'keywords']].explode('keywords').dropna().drop_duplicates()
+        skills = df[['job_key', 'skill_name']].explode('skill_name').dropna().drop_duplicates()
+
+        columns = ', '.join(jobs.columns)
+        updates = ', '.join(f"{col} = excluded.{col}" for col in jobs.columns if col != 'job_key')
+        with self.conn:
+            # Upsert giữ nguyên id của job đã có, sau đó thay toàn bộ keyword/skill của các job này
+            self.conn.executemany(
+                f"INSERT INTO jobs ({columns}) VALUES ({', '.join('?' * len(jobs.columns))}) "
+                f"ON CONFLICT(job_key) DO UPDATE SET {updates}",
+                jobs.itertuples(index=False, name=None)
+            )
+            ids = self._lookup('id', jobs['job_key'].tolist())
+            self.conn.executemany("DELETE FROM job_keywords WHERE job = ?", ((i,) for i in ids.values()))
+            self.conn.executemany("DELETE FROM job_skills WHERE job = ?", ((i,) for i in ids.values()))
+            self.conn.executemany(
+                "INSERT INTO job_keywords (keyword, job) VALUES (?, ?)",
+                zip(keywords['keywords'].astype(str), keywords['job_key'].map(ids))
+            )
+            self.conn.executemany(
+                "INSERT INTO job_skills (job, skill) VALUES (?, ?)",
+                zip(skills['job_key'].map(ids), skills['skill_name'].astype(str))
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO partitions (execution_date, rows, loaded_at) VALUES (?, ?, datetime('now'))",
+                (execution_date, len(jobs))
+            )
+            self.conn.execute("PRAGMA optimize")
+        logger.info("🗄 Analytics store %s: nạp %d job (%d bỏ qua vì đã có bản mới hơn), %d keyword, %d skill",
+                    execution_date, len(jobs), int(newer.sum()), len(keywords), len(skills))
+        return len(jobs)
+
+    def _lookup(self, column, job_keys):
+        """dict job_key -> column cho các job đã có trong kho."""
+        return dict(select_in(self.conn, f"SELECT job_key, {column} FROM jobs", "job_key", job_keys))
+
+    @staticmethod
+    def _filters(keyword=None, city=None, start=None, end=None):
+        """Mệnh đề JOIN/WHERE chung cho các truy vấn; ngày lọc theo created_date (bao gồm hai đầu)."""
+        joins, where, params = [], [], []
+        if keyword is not None:
+            joins.append("JOIN job_keywords kf ON kf.job = j.id AND kf.keyword = ?")
+            params.append(keyword)
+        if city is not None:
+            where.append("j.city_name = ?")
+            params.append(city.lower())
+        if start is not None:
+            where.append("j.created_date >= ?")
+            params.append(as_date(start))
+        if end is not None:
+            where.append("j.created_date <= ?")
+            params.append(as_date(end))
+        return " ".join(joins), ("WHERE " + " AND ".join(where)) if where else "", params
+
+    def query(self, sql, params=()):
+        return pd.read_sql_query(sql, self.conn, params=list(params))
+
+    def skill_counts(self, keyword=None, city=None, start=None, end=None):
+        """Số job theo keyword × skill (cùng dạng với skill_visualize.count_skills)."""
+        joins, where, params = self._filters(keyword, city, start, end)
+        return self.query(f"""
+            SELECT k.keyword AS keyword, s.skill AS skill, COUNT(*) AS count
+            FROM jobs j {joins}
+            JOIN job_keywords k ON k.job = j.id
+            JOIN job_skills s ON s.job = j.id
+            {where}
+            GROUP BY k.keyword, s.skill
+            ORDER BY k.keyword, count DESC, s.skill
+        """, params)
+
+    def top_skills(self, keyword=None, city=None, start=None, end=None, limit=10):
+        """Top skill (mỗi job đếm một lần) theo bộ lọc keyword/thành phố/khoảng ngày."""
+        joins, where, params = self._filters(keyword, city, start, end)
+        return self.query(f"""
+            SELECT s.skill AS skill, COUNT(*) AS count
+            FROM jobs j {joins}
+            JOIN job_skills s ON s.job = j.id
+            {where}
+            GROUP BY s.skill
+            ORDER BY count DESC, s.skill
+            LIMIT ?
+        """, params + [limit])
+
+    def job_counts(self, by='city_name', keyword=None, city=None, start=None, end=None, limit=None):
+        """Số job theo một chiều: city_name, area, company_name, job_level, keyword hoặc month."""
+        if by not in COUNT_DIMENSIONS:
+            raise ValueError(f"Unsupported dimension '{by}', expected one of {sorted(COUNT_DIMENSIONS)}")
+        joins, where, params = self._filters(keyword, city, start, end)
+        if by == 'keyword':
+            joins += " JOIN job_keywords k ON k.job = j.id"
+        sql = f"""
+            SELECT {COUNT_DIMENSIONS[by]} AS {by}, COUNT(*) AS count
+            FROM jobs j {joins}
+            {where}
+            GROUP BY 1
+            ORDER BY count DESC, 1
+        """
+        if limit is not None:
+            sql += " LIMIT ?"
+            params = params + [limit]
+        return self.query(sql, params)
+
+    def salary_distribution(self, keyword=None, city=None, start=None, end=None, currency='USD', bin_width=500):
+        """Phân bố lương theo khoảng bin_width (lương giữa min/max, bỏ giá trị 0/thiếu) cho một loại tiền."""
+        joins, where, params = self._filters(keyword, city, start, end)
+        where = (where + " AND" if where else "WHERE") + " j.salary_currency = ?"
+        return self.query(f"""
+            WITH salaries AS (
+                SELECT CASE
+                    WHEN j.salary_min > 0 AND j.salary_max > 0 THEN (j.salary_min + j.salary_max) / 2.0
+                    WHEN j.salary_max > 0 THEN j.salary_max
+                    WHEN j.salary_min > 0 THEN j.salary_min
+                END AS salary
+                FROM jobs j {joins}
+                {where}
+            )
+            SELECT CAST(salary / ? AS INTEGER) * ? AS salary_from,
+                   CAST(salary / ? AS INTEGER) * ? + ? AS salary_to,
+                   COUNT(*) AS count
+            FROM salaries
+            WHERE salary IS NOT NULL
+            GROUP BY 1
+            ORDER BY 1
+        """, params + [currency] + [bin_width] * 5)
+
+    def close(self):
+        self.conn.close()
+
+
+def analytics_db_path(data_dir=DATA_DIR):
+    return os.path.join(data_dir, ANALYTICS_DIR, ANALYTICS_DB_FILE)
+
+
+def load_partition(execution_date, data_dir=DATA_DIR):
+    """Nạp partition đã transform của execution_date vào kho phân tích."""
+    input_file = f"{data_dir}/{execution_date}/{TRANSFORMED_FILE}"
+    if not os.path.exists(input_file):
+        logger.error("❌ File đầu vào %s không tồn tại.", input_file)
+        raise FileNotFoundError(f"Input file {input_file} does not exist")
+
+    with metrics.stage("load_analytics", f"{data_dir}/{execution_date}", execution_date):
+        with metrics.span("load.read"):
+            df = read_unique_jobs(input_file, columns=['job_id', 'job_url', 'job_title', 'company_name', 'created_on',
+                                                       'expired_on', 'city_name', 'address', 'job_level', 'salary_min',
+                                                       'salary_max', 'salary_currency', 'keywords', 'skill_name'])
+        store = AnalyticsStore(analytics_db_path(data_dir))
+        try:
+            with metrics.span("load.upsert"):
+                rows = store.load_partition(execution_date, df)
+        finally:
+            store.close()
+        metrics.count("rows_written", rows)
+    return rows
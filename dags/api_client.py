@@ -0,0 +1,221 @@
+import time
+import random
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+import requests
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Mã lỗi tạm thời được gửi lại; 429/503 còn có nghĩa là API đang quá tải
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+THROTTLE_STATUSES = (429, 503)
+
+
+class ApiError(Exception):
+    """Request tới API thất bại sau khi đã retry hết số lần cho phép."""
+
+
+class CircuitOpenError(ApiError):
+    """Circuit breaker đang mở (API lỗi liên tiếp), request không được gửi."""
+
+
+def retry_after_seconds(response):
+    """Header Retry-After (số giây hoặc HTTP-date) đổi ra số giây, None nếu không có hoặc không đọc được."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class RetryPolicy:
+    """Số lần thử và thời gian chờ: exponential backoff với full jitter, ưu tiên Retry-After của server."""
+
+    def __init__(self, max_attempts=5, base_delay=0.5, max_delay=30.0, max_retry_after=120.0,
+                 statuses=RETRY_STATUSES):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.statuses = statuses
+
+    def delay(self, attempt, retry_after=None):
+        """Số giây chờ trước lần thử thứ attempt + 1 (attempt đếm từ 0)."""
+        if retry_after is not None:
+            return min(retry_after, self.max_retry_after)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class AIMDLimiter:
+    """Giới hạn số request đồng thời, tự điều chỉnh kiểu AIMD (additive increase, multiplicative decrease).
+
+    Sau mỗi `limit` response tốt (nhanh hơn latency_target) giới hạn tăng thêm 1, tối đa max_limit;
+    gặp 429/503, timeout hoặc response chậm thì giới hạn nhân với decrease. Chỉ request gửi sau
+    lần giảm gần nhất mới làm giảm tiếp, nên một loạt lỗi của cùng một đợt chỉ tính một lần.
+    """
+
+    def __init__(self, initial=2, min_limit=1, max_limit=16, latency_target=5.0, decrease=0.5):
+        self.min_limit = min_limit
+        self.max_limit = max(max_limit, min_limit)
+        self.limit = min(max(initial, min_limit), self.max_limit)
+        self.latency_target = latency_target
+        self.decrease = decrease
+        self.inflight = 0
+        self._successes = 0
+        self._last_decrease = float("-inf")
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Chờ đến lượt gửi request; trả về thời điểm bắt đầu để truyền lại cho release."""
+        with self._cond:
+            while True:
+                pause = self._paused_until - time.monotonic()
+                if pause > 0:
+                    self._cond.wait(pause)
+                elif self.inflight >= self.limit:
+                    self._cond.wait()
+                else:
+                    break
+            self.inflight += 1
+            return time.monotonic()
+
+    def release(self, started, outcome):
+        """Kết thúc một request. outcome: "ok", "throttled" (API quá tải) hoặc "error" (không đổi giới hạn)."""
+        latency = time.monotonic() - started
+        with self._cond:
+            self.inflight -= 1
+            if outcome == "throttled" or (outcome == "ok" and latency > self.latency_target):
+                if started >= self._last_decrease:
+                    self._last_decrease = time.monotonic()
+                    self._successes = 0
+                    previous, self.limit = self.limit, max(self.min_limit, int(self.limit * self.decrease))
+                    if self.limit != previous:
+                        metrics.count("api.limit_decreases")
+                        logger.info("⬇ Giảm số request đồng thời %d → %d (%s, %.2fs)",
+                                    previous, self.limit, outcome, latency)
+            elif outcome == "ok":
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.max_limit:
+                    self._successes = 0
+                    self.limit += 1
+                    metrics.count("api.limit_increases")
+            self._cond.notify_all()
+
+    def pause(self, seconds):
+        """Không gửi request mới trong seconds giây (server yêu cầu qua Retry-After)."""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class CircuitBreaker:
+    """Ngắt mạch sau failure_threshold lần lỗi liên tiếp.
+
+    Khi mở, mọi request bị từ chối ngay (CircuitOpenError); sau reset_timeout giây cho đúng
+    một request thử (half-open): thành công thì đóng lại, lỗi thì mở tiếp.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == "open":
+                remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+                if remaining > 0:
+                    raise CircuitOpenError(f"Circuit open after {self.failures} failures, retry in {remaining:.0f}s")
+                self.state = "half_open"
+            if self.state == "half_open":
+                if self._probing:
+                    raise CircuitOpenError("Circuit half-open, waiting for the probe request")
+                self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                logger.info("✅ API hoạt động lại, đóng circuit breaker.")
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    metrics.count("api.circuit_opened")
+                    logger.error("🛑 API lỗi %d lần liên tiếp, mở circuit breaker trong %.0fs.",
+                                 self.failures, self.reset_timeout)
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class ApiClient:
+    """Gửi request với retry, giới hạn đồng thời thích ứng và circuit breaker (dùng chung giữa các thread).
+
+    Response 2xx và lỗi 4xx (401/403 để caller làm mới cookie) được trả về; lỗi tạm thời được
+    gửi lại, hết số lần thử thì raise ApiError thay vì trả về kết quả rỗng.
+    """
+
+    def __init__(self, retry=None, limiter=None, breaker=None):
+        self.retry = retry or RetryPolicy()
+        self.limiter = limiter or AIMDLimiter()
+        self.breaker = breaker or CircuitBreaker()
+
+    def call(self, send):
+        """Gọi send() (trả về requests.Response) cho đến khi thành công hoặc hết số lần thử."""
+        error = None
+        for attempt in range(self.retry.max_attempts):
+            self.breaker.before_call()
+            retry_after = None
+            started = self.limiter.acquire()
+            try:
+                response = send()
+            except requests.Timeout as e:
+                # Timeout thường là dấu hiệu quá tải: giảm đồng thời như 429
+                self.limiter.release(started, "throttled")
+                self.breaker.record_failure()
+                metrics.count("api.timeouts")
+                error = e
+            except requests.RequestException as e:
+                self.limiter.release(started, "error")
+                self.breaker.record_failure()
+                error = e
+            else:
+                if response.status_code not in self.retry.statuses:
+                    self.limiter.release(started, "ok")
+                    self.breaker.record_success()
+                    return response
+                throttled = response.status_code in THROTTLE_STATUSES
+                self.limiter.release(started, "throttled" if throttled else "error")
+                self.breaker.record_failure()
+                if throttled:
+                    metrics.count("api.throttled")
+                    retry_after = retry_after_seconds(response)
+                    if retry_after:
+                        self.limiter.pause(min(retry_after, self.retry.max_retry_after))
+                error = ApiError(f"HTTP {response.status_code} from {response.url}")
+
+            if attempt + 1 < self.retry.max_attempts:
+                delay = self.retry.delay(attempt, retry_after)
+                metrics.count("api.retries")
+                logger.warning("⚠ Lần thử %d/%d lỗi (%s), thử lại sau %.1fs",
+                               attempt + 1, self.retry.max_attempts, error, delay)
+                time.sleep(delay)
+        raise ApiError(f"Request failed after {self.retry.max_attempts} attempts: {error}") from error
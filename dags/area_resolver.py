@@ -0,0 +1,79 @@
+import json
+import logging
+from text_match import compile_terms, fold_series, fold_text
+
+logger = logging.getLogger(__name__)
+
+# Danh sách quận/huyện và thành phố
+LOCATIONS = {
+    'Ha Noi': [
+        'Quận Ba Đình', 'Quận Hoàn Kiếm', 'Quận Đống Đa', 'Quận Hai Bà Trưng',
+        'Quận Hoàng Mai', 'Quận Thanh Xuân', 'Quận Long Biên', 'Quận Nam Từ Liêm',
+        'Quận Bắc Từ Liêm', 'Quận Tây Hồ', 'Quận Cầu Giấy', 'Quận Hà Đông',
+        'Huyện Đông Anh', 'Huyện Gia Lâm', 'Huyện Thanh Trì',
+        'District Ba Đình', 'District Hoàn Kiếm', 'District Đống Đa'
+    ],
+    'Ho Chi Minh': [
+        'Quận 1', 'Quận 3', 'Quận 4', 'Quận 5', 'Quận 6', 'Quận 7', 'Quận 8',
+        'Quận 10', 'Quận 11', 'Quận 12', 'Quận Bình Thạnh', 'Quận Gò Vấp',
+        'Quận Phú Nhuận', 'Quận Tân Bình', 'Quận Tân Phú', 'Quận Thủ Đức',
+        'Huyện Bình Chánh', 'Huyện Cần Giờ', 'Huyện Củ Chi',
+        'District 1', 'District 3', 'District 7'
+    ],
+    'Binh Duong': [
+        'Thành phố Thủ Dầu Một', 'Thành phố Dĩ An', 'Thành phố Thuận An',
+        'Huyện Bắc Tân Uyên', 'Huyện Bàu Bàng', 'Huyện Dầu Tiếng'
+    ],
+    'Dong Nai': [
+        'Thành phố Biên Hòa', 'Thành phố Long Khánh', 'Huyện Cẩm Mỹ',
+        'Huyện Định Quán', 'Huyện Long Thành'
+    ]
+}
+
+# Danh sách ánh xạ thành phố
+CITY_MAPPING = {
+    'hanoi': 'Ha Noi',
+    'ha noi': 'Ha Noi',
+    'ho chi minh': 'Ho Chi Minh',
+    'hcm': 'Ho Chi Minh',
+    'binh duong': 'Binh Duong',
+    'dong nai': 'Dong Nai',
+    'other': 'Other'
+}
+
+
+class AreaResolver:
+    """Xác định khu vực (quận/huyện hoặc thành phố) cho cả cột địa chỉ.
+
+    Gazetteer được bỏ dấu và biên dịch một lần thành regex, nên chi phí khớp gần như
+    không tăng theo số quận/huyện. "Quan 1" và "Quận 1" cho cùng kết quả.
+    """
+
+    def __init__(self, locations=LOCATIONS, city_mapping=CITY_MAPPING):
+        self.district_lookup = {}
+        for districts in locations.values():
+            for district in districts:
+                self.district_lookup.setdefault(fold_text(district), district)
+        self.city_lookup = {fold_text(key): value for key, value in city_mapping.items()}
+
+        self.district_pattern = compile_terms(self.district_lookup)
+        self.city_pattern = compile_terms(self.city_lookup)
+        logger.info("Đã biên dịch gazetteer: %d quận/huyện, %d tên thành phố",
+                    len(self.district_lookup), len(self.city_lookup))
+
+    @classmethod
+    def from_json(cls, path):
+        """Tạo resolver từ file JSON {"locations": {...}, "city_mapping": {...}} (ví dụ đủ 63 tỉnh thành)."""
+        with open(path, encoding="utf-8") as f:
+            gazetteer = json.load(f)
+        return cls(gazetteer["locations"], gazetteer.get("city_mapping", CITY_MAPPING))
+
+    def resolve(self, addresses, cities):
+        """Trả về Series khu vực: quận/huyện trong địa chỉ, nếu không có thì thành phố, cuối cùng 'Unknown'."""
+        folded_addresses = fold_series(addresses)
+
+        district = folded_addresses.str.extract(self.district_pattern, expand=False).map(self.district_lookup)
+        city = fold_series(cities).map(self.city_lookup)
+        city_in_address = folded_addresses.str.extract(self.city_pattern, expand=False).map(self.city_lookup)
+
+        return district.fillna(city).fillna(city_in_address).fillna('Unknown')
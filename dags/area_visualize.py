@@ -1,78 +1,21 @@
-import pandas as pd
+import sys
 import seaborn as sns
 import matplotlib.pyplot as plt
-import re
+from analytics_store import AnalyticsStore, analytics_db_path
+from pipeline_config import DATA_DIR
 
-df = pd.read_csv("E:/docker-projects/airflow-project/data/vietnamwork/vietnamworks_jobs_transformed.csv", encoding="utf-8-sig")
+# Khoảng ngày (created_on) tùy chọn: python area_visualize.py [start] [end]
+start, end = (sys.argv[1:] + [None, None])[:2]
 
-
-# Danh sách quận/huyện và thành phố
-locations = {
-    'Ha Noi': [
-        'Quận Ba Đình', 'Quận Hoàn Kiếm', 'Quận Đống Đa', 'Quận Hai Bà Trưng',
-        'Quận Hoàng Mai', 'Quận Thanh Xuân', 'Quận Long Biên', 'Quận Nam Từ Liêm',
-        'Quận Bắc Từ Liêm', 'Quận Tây Hồ', 'Quận Cầu Giấy', 'Quận Hà Đông',
-        'Huyện Đông Anh', 'Huyện Gia Lâm', 'Huyện Thanh Trì',
-        'District Ba Đình', 'District Hoàn Kiếm', 'District Đống Đa'
-    ],
-    'Ho Chi Minh': [
-        'Quận 1', 'Quận 3', 'Quận 4', 'Quận 5', 'Quận 6', 'Quận 7', 'Quận 8',
-        'Quận 10', 'Quận 11', 'Quận 12', 'Quận Bình Thạnh', 'Quận Gò Vấp',
-        'Quận Phú Nhuận', 'Quận Tân Bình', 'Quận Tân Phú', 'Quận Thủ Đức',
-        'Huyện Bình Chánh', 'Huyện Cần Giờ', 'Huyện Củ Chi',
-        'District 1', 'District 3', 'District 7'
-    ],
-    'Binh Duong': [
-        'Thành phố Thủ Dầu Một', 'Thành phố Dĩ An', 'Thành phố Thuận An',
-        'Huyện Bắc Tân Uyên', 'Huyện Bàu Bàng', 'Huyện Dầu Tiếng'
-    ],
-    'Dong Nai': [
-        'Thành phố Biên Hòa', 'Thành phố Long Khánh', 'Huyện Cẩm Mỹ',
-        'Huyện Định Quán', 'Huyện Long Thành'
-    ]
-}
-
-# Danh sách ánh xạ thành phố
-city_mapping = {
-    'hanoi': 'Ha Noi',
-    'ha noi': 'Ha Noi',
-    'ho chi minh': 'Ho Chi Minh',
-    'hcm': 'Ho Chi Minh',
-    'binh duong': 'Binh Duong',
-    'dong nai': 'Dong Nai',
-    'other': 'Other'
-}
-
-# Hàm trích xuất khu vực
-def extract_area(row):
-    address = row['address'] if pd.notna(row['address']) else ''
-    city_name = row['city_name'] if pd.notna(row['city_name']) else ''
-
-    address_lower = address.lower()
-
-    # Tìm quận/huyện trong address
-    for city, districts in locations.items():
-        for district in districts:
-            if district.lower() in address_lower:
-                return district
-
-    # Nếu không tìm thấy quận/huyện, dùng city_name hoặc tìm thành phố trong address
-    if city_name.lower() in city_mapping:
-        return city_mapping[city_name.lower()]
-    for city_key, city_value in city_mapping.items():
-        if city_key in address_lower:
-            return city_value
-
-    return 'Unknown'
-
-# Tạo cột area
-df['area'] = df.apply(extract_area, axis=1)
+# Đếm trực tiếp trên kho phân tích (toàn bộ lịch sử, đã có cột area), không đọc lại CSV
+store = AnalyticsStore(analytics_db_path(DATA_DIR))
 
 # Phân tích số lượng công việc theo khu vực
-area_counts = df['area'].value_counts().head(10)  # Lấy top 10 khu vực
+area_counts = store.job_counts(by='area', start=start, end=end, limit=10).set_index('area')['count']  # Lấy top 10 khu vực
 
 # Phân tích số lượng công việc theo thành phố
-city_counts = df['city_name'].value_counts()
+city_counts = store.job_counts(by='city_name', start=start, end=end).set_index('city_name')['count']
+store.close()
 
 # In kết quả phân tích
 print("Số lượng công việc theo khu vực (Top 10):")
@@ -0,0 +1,213 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from analytics_store import ANALYTICS_DB_FILE, ANALYTICS_DIR, load_partition
+from dedup import DEDUP_DB_FILE, DEDUP_DIR, deduplicate_partition
+from pipeline_config import DATA_DIR, LOG_FORMAT
+from skill_visualize import SKILL_COUNTS_FILE, get_top_skills
+from storage import DATE_PATTERN, RAW_FILE, TRANSFORMED_FILE, atomic_path
+from transform import transform_data
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "backfill_manifest.json"
+HASH_BLOCK_SIZE = 1 << 20
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _transform(execution_date, data_dir):
+    # Partition đã chạy trong một process của pool backfill, không mở thêm pool chuẩn hóa skill
+    transform_data(execution_date, data_dir=data_dir, normalizer_workers=1)
+
+
+def _visualize(execution_date, data_dir):
+    # Partition đã chạy trong một process của pool backfill, không mở thêm nhiều process vẽ biểu đồ
+    get_top_skills(execution_date, max_workers=1, data_dir=data_dir)
+
+
+# Các bước của backfill theo thứ tự chạy. Đường dẫn tính từ data_dir, {date} là execution_date.
+# modules: mã nguồn quyết định kết quả của bước, đổi nội dung là chạy lại mọi partition.
+# parallel=False: bước phụ thuộc lịch sử (cache signature, kho SQLite) nên chạy lần lượt theo ngày.
+STAGES = {
+    'transform': {
+        'run': _transform,
+        'inputs': [f"{{date}}/{RAW_FILE}"],
+        'outputs': [f"{{date}}/{TRANSFORMED_FILE}"],
+        'modules': ['transform', 'skill_normalizer', 'area_resolver', 'text_match', 'storage'],
+        'parallel': True,
+    },
+    'dedup': {
+        'run': deduplicate_partition,
+        'inputs': [f"{{date}}/{TRANSFORMED_FILE}"],
+        'outputs': [f"{{date}}/{TRANSFORMED_FILE}", f"{DEDUP_DIR}/{DEDUP_DB_FILE}"],
+        'modules': ['dedup', 'storage'],
+        'parallel': False,
+    },
+    'load': {
+        'run': load_partition,
+        'inputs': [f"{{date}}/{TRANSFORMED_FILE}"],
+        'outputs': [f"{ANALYTICS_DIR}/{ANALYTICS_DB_FILE}"],
+        'modules': ['analytics_store', 'area_resolver', 'text_match', 'storage'],
+        'parallel': False,
+    },
+    'visualize': {
+        'run': _visualize,
+        'inputs': [f"{{date}}/{TRANSFORMED_FILE}"],
+        'outputs': [f"{{date}}/{SKILL_COUNTS_FILE}"],
+        'modules': ['skill_visualize', 'storage'],
+        'parallel': True,
+    },
+}
+
+
+def file_digest(path, cached=None):
+    """sha256 của nội dung file kèm size/mtime; dùng lại hash trong cached nếu size và mtime không đổi."""
+    stat = os.stat(path)
+    if cached and cached.get("size") == stat.st_size and cached.get("mtime_ns") == stat.st_mtime_ns:
+        return cached
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest.hexdigest()}
+
+
+def stage_version(name):
+    """Hash mã nguồn các module của bước (phiên bản code/cấu hình của kết quả)."""
+    digest = hashlib.sha256(name.encode("utf-8"))
+    for module in sorted(STAGES[name]['modules']):
+        with open(os.path.join(MODULE_DIR, f"{module}.py"), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def partition_dates(data_dir, start=None, end=None):
+    """Các ngày (tăng dần) trong khoảng [start, end] có file thô trong data_dir."""
+    if not os.path.isdir(data_dir):
+        return []
+    return sorted(d for d in os.listdir(data_dir)
+                  if DATE_PATTERN.match(d) and (start is None or d >= start) and (end is None or d <= end)
+                  and os.path.exists(os.path.join(data_dir, d, RAW_FILE)))
+
+
+def load_manifest(data_dir, execution_date):
+    """Manifest của partition: {tên bước: {"version", "inputs", "finished_at", "seconds"}}."""
+    try:
+        with open(os.path.join(data_dir, execution_date, MANIFEST_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(data_dir, execution_date, manifest):
+    path = os.path.join(data_dir, execution_date, MANIFEST_FILE)
+    with atomic_path(path) as tmp_path, open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=4, sort_keys=True)
+
+
+def _paths(templates, execution_date):
+    return [template.format(date=execution_date) for template in templates]
+
+
+def is_fresh(name, execution_date, data_dir, entry, version):
+    """Bước đã chạy với đúng phiên bản code và nội dung đầu vào hiện tại, kết quả vẫn còn."""
+    stage = STAGES[name]
+    if not entry or entry.get("version") != version:
+        return False
+    if not all(os.path.exists(os.path.join(data_dir, path)) for path in _paths(stage['outputs'], execution_date)):
+        return False
+    recorded = entry.get("inputs", {})
+    for path in _paths(stage['inputs'], execution_date):
+        full_path = os.path.join(data_dir, path)
+        if path not in recorded or not os.path.exists(full_path):
+            return False
+        if file_digest(full_path, recorded[path])["sha256"] != recorded[path].get("sha256"):
+            return False
+    return True
+
+
+def run_stage(name, execution_date, data_dir, version):
+    """Chạy một bước cho một partition, trả về entry manifest (hash đầu vào sau khi chạy)."""
+    stage = STAGES[name]
+    started = time.perf_counter()
+    stage['run'](execution_date, data_dir=data_dir)
+    # Hash sau khi chạy: dedup ghi lại chính file đầu vào của nó
+    inputs = {path: file_digest(os.path.join(data_dir, path)) for path in _paths(stage['inputs'], execution_date)}
+    return {"version": version, "inputs": inputs, "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "seconds": round(time.perf_counter() - started, 3)}
+
+
+def _run_partitions(name, dates, data_dir, version, max_workers):
+    """Chạy bước name cho các partition, yield (execution_date, entry, lỗi) theo thứ tự hoàn thành."""
+    if not STAGES[name]['parallel'] or len(dates) < 2 or max_workers == 1:
+        for execution_date in dates:
+            try:
+                yield execution_date, run_stage(name, execution_date, data_dir, version), None
+            except Exception as e:
+                yield execution_date, None, e
+        return
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(run_stage, name, d, data_dir, version): d for d in dates}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
+
+
+def backfill(start=None, end=None, data_dir=DATA_DIR, stages=None, max_workers=None, force=False):
+    """Chạy lại các bước cho mọi partition trong khoảng [start, end], bỏ qua partition không đổi.
+
+    Bước parallel chia các partition cho max_workers process (mặc định bằng số CPU); partition có
+    cùng phiên bản code và cùng hash đầu vào như trong manifest được bỏ qua, trừ khi force=True.
+    Partition lỗi ở một bước không chạy các bước sau. Trả về {bước: {"ran", "skipped", "failed"}}.
+    """
+    stages = list(STAGES) if stages is None else [name for name in STAGES if name in stages]
+    dates = partition_dates(data_dir, start, end)
+    logger.info("🔁 Backfill %d partition (%s → %s), các bước: %s", len(dates), start, end, ", ".join(stages))
+    manifests = {execution_date: load_manifest(data_dir, execution_date) for execution_date in dates}
+    failed = {}
+    summary = {}
+
+    for name in stages:
+        version = stage_version(name)
+        todo = [d for d in dates if d not in failed
+                and (force or not is_fresh(name, d, data_dir, manifests[d].get(name), version))]
+        summary[name] = {"ran": 0, "skipped": len(dates) - len(failed) - len(todo), "failed": 0}
+        started = time.perf_counter()
+
+        for execution_date, entry, error in _run_partitions(name, todo, data_dir, version, max_workers):
+            if error is not None:
+                logger.error("❌ Bước %s lỗi ở partition %s: %s", name, execution_date, error)
+                failed[execution_date] = f"{name}: {error}"
+                summary[name]["failed"] += 1
+                continue
+            manifests[execution_date][name] = entry
+            save_manifest(data_dir, execution_date, manifests[execution_date])
+            summary[name]["ran"] += 1
+
+        logger.info("✅ %s: chạy %d, bỏ qua %d (không đổi), lỗi %d trong %.1fs", name, summary[name]["ran"],
+                    summary[name]["skipped"], summary[name]["failed"], time.perf_counter() - started)
+
+    if failed:
+        raise RuntimeError(f"Backfill failed for {len(failed)} partition(s): {failed}")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chạy lại pipeline cho một khoảng ngày, bỏ qua partition không đổi.")
+    parser.add_argument("start", nargs="?", help="Ngày đầu (YYYY-MM-DD), mặc định: partition cũ nhất")
+    parser.add_argument("end", nargs="?", help="Ngày cuối (YYYY-MM-DD), mặc định: partition mới nhất")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=None)
+    parser.add_argument("--workers", type=int, default=None, help="Số process, mặc định bằng số CPU")
+    parser.add_argument("--force", action="store_true", help="Chạy lại cả partition không đổi")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    backfill(args.start, args.end, data_dir=args.data_dir, stages=args.stages,
+             max_workers=args.workers, force=args.force)
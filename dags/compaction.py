@@ -0,0 +1,185 @@
+import os
+import json
+import logging
+from datetime import datetime
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import metrics
+from pipeline_config import DATA_DIR, LOG_FORMAT
+from storage import DATE_PATTERN, DEDUP_SCHEMA, DUPLICATE_COLUMN, ROW_GROUP_SIZE, TRANSFORMED_FILE, as_date, atomic_path
+
+logger = logging.getLogger(__name__)
+
+COMPACTED_DIR = "compacted"
+INDEX_FILE = "_index.json"
+# Cột thêm vào file tháng: ngày của partition gốc (execution_date)
+PARTITION_COLUMN = "partition_date"
+COMPACTED_SCHEMA = DEDUP_SCHEMA.append(pa.field(PARTITION_COLUMN, pa.string()))
+INDEX_DATE_COLUMNS = ['created_on', 'expired_on', 'approved_on']
+
+
+def compacted_file_name(month):
+    return f"jobs_{month}.parquet"
+
+
+def load_index(data_dir=DATA_DIR):
+    """Skip index của các file tháng: {"files": {tên file: {"month", "rows", "sources", min/max, keywords, cities}}}."""
+    try:
+        with open(os.path.join(data_dir, COMPACTED_DIR, INDEX_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"files": {}}
+
+
+def _save_index(data_dir, index):
+    path = os.path.join(data_dir, COMPACTED_DIR, INDEX_FILE)
+    with atomic_path(path) as tmp_path, open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=4, sort_keys=True)
+
+
+def _partition_sources(data_dir):
+    """{tháng: {execution_date: {"size", "mtime_ns"}}} của các file transform trong data_dir."""
+    months = {}
+    for name in sorted(os.listdir(data_dir)) if os.path.isdir(data_dir) else []:
+        path = os.path.join(data_dir, name, TRANSFORMED_FILE)
+        if DATE_PATTERN.match(name) and os.path.exists(path):
+            stat = os.stat(path)
+            months.setdefault(name[:7], {})[name] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    return months
+
+
+def _read_partition(data_dir, execution_date):
+    """File transform của một ngày theo COMPACTED_SCHEMA (thêm duplicate_of rỗng nếu chưa qua dedup)."""
+    table = pq.read_table(os.path.join(data_dir, execution_date, TRANSFORMED_FILE))
+    if DUPLICATE_COLUMN not in table.column_names:
+        table = table.append_column(DUPLICATE_COLUMN, pa.nulls(len(table), pa.string()))
+    table = table.append_column(PARTITION_COLUMN, pa.array([execution_date] * len(table), pa.string()))
+    return table.select(COMPACTED_SCHEMA.names).cast(COMPACTED_SCHEMA)
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def _index_entry(month, table, sources):
+    """Số dòng, min/max các cột ngày, tập keyword và thành phố của một file tháng."""
+    entry = {"month": month, "rows": len(table), "sources": sources}
+    for column in INDEX_DATE_COLUMNS:
+        bounds = pc.min_max(table[column]).as_py()
+        entry[column] = [_iso(bounds["min"]), _iso(bounds["max"])]
+    keywords = pc.unique(pc.list_flatten(table['keywords']).cast(pa.string()).drop_null())
+    cities = pc.unique(table['city_name'].cast(pa.string()).drop_null())
+    entry["keywords"] = sorted(keywords.to_pylist())
+    entry["cities"] = sorted(cities.to_pylist())
+    return entry
+
+
+def compact_month(month, sources, data_dir=DATA_DIR):
+    """Gộp các partition ngày của month thành một file, sắp theo created_on; trả về entry index."""
+    tables = [_read_partition(data_dir, execution_date) for execution_date in sorted(sources)]
+    table = pa.concat_tables(tables).unify_dictionaries().combine_chunks()
+    # Sắp theo created_on để thống kê min/max của từng row group cũng lọc được theo ngày
+    table = table.take(pc.sort_indices(table, sort_keys=[("created_on", "ascending")], null_placement="at_end"))
+
+    path = os.path.join(data_dir, COMPACTED_DIR, compacted_file_name(month))
+    with atomic_path(path) as tmp_path:
+        pq.write_table(table, tmp_path, compression="zstd", row_group_size=ROW_GROUP_SIZE)
+    metrics.count("rows_written", len(table))
+    metrics.count("bytes_written", os.path.getsize(path))
+    logger.info("🗜 Đã gộp %d partition của %s (%d dòng) vào %s", len(sources), month, len(table), path)
+    return _index_entry(month, table, sources)
+
+
+def compact_partitions(data_dir=DATA_DIR, months=None):
+    """Gộp partition ngày thành file tháng cho các tháng có partition mới hoặc đã đổi.
+
+    months=None: xét mọi tháng. Tháng có cùng danh sách partition và size/mtime như trong
+    index được bỏ qua. Trả về danh sách tháng đã gộp lại.
+    """
+    os.makedirs(os.path.join(data_dir, COMPACTED_DIR), exist_ok=True)
+    index = load_index(data_dir)
+    compacted = []
+    with metrics.stage("compact", os.path.join(data_dir, COMPACTED_DIR)):
+        for month, sources in _partition_sources(data_dir).items():
+            if months is not None and month not in months:
+                continue
+            name = compacted_file_name(month)
+            current = index["files"].get(name)
+            if current and current["sources"] == sources \
+                    and os.path.exists(os.path.join(data_dir, COMPACTED_DIR, name)):
+                continue
+            with metrics.span("compact.month"):
+                index["files"][name] = compact_month(month, sources, data_dir)
+            # Ghi index sau mỗi tháng để lần chạy bị ngắt giữa chừng không phải gộp lại từ đầu
+            _save_index(data_dir, index)
+            compacted.append(month)
+        metrics.count("months_compacted", len(compacted))
+    logger.info("✅ Compaction: gộp lại %d tháng, index có %d file", len(compacted), len(index["files"]))
+    return compacted
+
+
+def _may_match(entry, start, end, keyword, city, date_column):
+    """File có thể chứa dòng khớp điều kiện không (theo min/max và tập keyword/thành phố trong index)."""
+    low, high = entry[date_column]
+    if (start is not None or end is not None) and low is None:
+        return False
+    if start is not None and high[:10] < start:
+        return False
+    if end is not None and low[:10] > end:
+        return False
+    if keyword is not None and keyword not in entry["keywords"]:
+        return False
+    if city is not None and city.lower() not in {c.lower() for c in entry["cities"]}:
+        return False
+    return True
+
+
+def read_range(start=None, end=None, keyword=None, city=None, columns=None, date_column='created_on',
+               data_dir=DATA_DIR, drop_reposts=True):
+    """Đọc job trong khoảng ngày [start, end] (str/date/datetime, theo date_column) từ các file tháng đã gộp.
+
+    Chỉ mở file mà skip index cho biết có thể khớp; trong file, row group nằm ngoài khoảng ngày
+    được bỏ qua nhờ thống kê min/max của Parquet. keyword/city lọc thêm theo từng dòng (city
+    không phân biệt hoa thường). drop_reposts=True bỏ các dòng có duplicate_of khác null.
+    """
+    start, end = as_date(start), as_date(end)
+    index = load_index(data_dir)
+    names = [name for name, entry in sorted(index["files"].items())
+             if _may_match(entry, start, end, keyword, city, date_column)]
+    metrics.count("files_opened", len(names))
+    metrics.count("files_skipped", len(index["files"]) - len(names))
+    logger.info("📂 read_range(%s → %s, keyword=%s, city=%s): mở %d/%d file tháng",
+                start, end, keyword, city, len(names), len(index["files"]))
+
+    filters = []
+    if start is not None:
+        filters.append((date_column, ">=", pd.Timestamp(start)))
+    if end is not None:
+        filters.append((date_column, "<", pd.Timestamp(end) + pd.Timedelta(days=1)))
+    read_columns = None
+    if columns is not None:
+        extra = [date_column, DUPLICATE_COLUMN, 'keywords', 'city_name']
+        read_columns = list(dict.fromkeys([*columns, *extra]))
+
+    tables = [pq.read_table(os.path.join(data_dir, COMPACTED_DIR, name), columns=read_columns,
+                            filters=filters or None) for name in names]
+    if not tables:
+        return pd.DataFrame(columns=columns if columns is not None else COMPACTED_SCHEMA.names)
+    df = pa.concat_tables(tables).unify_dictionaries().to_pandas()
+
+    mask = pd.Series(True, index=df.index)
+    if drop_reposts:
+        mask &= df[DUPLICATE_COLUMN].isna()
+    if keyword is not None:
+        mask &= df['keywords'].map(lambda values: values is not None and keyword in values).astype(bool)
+    if city is not None:
+        mask &= df['city_name'].astype(object).str.lower().eq(city.lower()).fillna(False).astype(bool)
+    df = df[mask].reset_index(drop=True)
+    return df[columns] if columns is not None else df
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    compact_partitions(months=[datetime.now().strftime("%Y-%m")])
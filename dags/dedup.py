@@ -0,0 +1,361 @@
+import os
+import zlib
+import sqlite3
+import logging
+from datetime import datetime
+from itertools import chain
+import numpy as np
+import pandas as pd
+import metrics
+from pipeline_config import DATA_DIR, LOG_FORMAT
+from storage import (DEDUP_SCHEMA, DUPLICATE_COLUMN, TRANSFORMED_FILE, atomic_path, job_keys, read_jobs, select_in,
+                     write_jobs)
+
+logger = logging.getLogger(__name__)
+
+DEDUP_DIR = "dedup"
+DEDUP_DB_FILE = "minhash_signatures.sqlite"
+
+# Nội dung dùng để so sánh hai tin (các cột đã được transform làm sạch và chuyển chữ thường)
+TEXT_COLUMNS = ['job_title', 'company_name', 'job_description']
+
+# Số ký tự văn bản xử lý cùng lúc khi tính signature (giới hạn ma trận num_perm × số shingle uint64)
+HASH_BATCH_CHARS = 300_000
+
+# Bucket LSH có nhiều tin hơn (thường là tin cùng mẫu mô tả) không ghép mọi cặp mà chỉ so mỗi tin với
+# tin đầu bucket và tin liền trước, để số cặp ứng viên tăng tuyến tính theo kích thước bucket
+MAX_BUCKET_SIZE = 32
+# Số cặp ứng viên so signature cùng lúc (giới hạn ma trận số cặp × num_perm)
+VERIFY_BATCH = 50_000
+
+
+class MinHasher:
+    """MinHash signature trên shingle gồm shingle_size từ liên tiếp, chia thành bands band cho LSH.
+
+    Từ được hash bằng crc32 và hệ số hoán vị sinh từ seed cố định nên signature giống nhau giữa
+    các lần chạy và có thể lưu lại. Hai tin có độ tương đồng Jaccard s trở thành cặp ứng viên
+    với xác suất 1 - (1 - s^rows)^bands.
+    """
+
+    def __init__(self, num_perm=128, bands=16, shingle_size=5, seed=1):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands})")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.seed = seed
+        rng = np.random.RandomState(seed)
+        # Hệ số lẻ 64 bit cho hoán vị, cho việc gộp hash các từ trong một shingle và các giá trị trong một band
+        self.a = rng.randint(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.randint(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64)
+        self.word_weights = rng.randint(0, np.iinfo(np.uint64).max, size=shingle_size, dtype=np.uint64) | np.uint64(1)
+        self.band_weights = rng.randint(0, np.iinfo(np.uint64).max, size=self.rows, dtype=np.uint64) | np.uint64(1)
+
+    @property
+    def settings(self):
+        """Chuỗi tham số; signature đã lưu chỉ dùng lại được khi tham số không đổi."""
+        return f"minhash:{self.num_perm}:{self.bands}:{self.shingle_size}:{self.seed}"
+
+    @property
+    def threshold(self):
+        """Độ tương đồng mà tại đó xác suất thành cặp ứng viên khoảng 50%."""
+        return (1 / self.bands) ** (1 / self.rows)
+
+    def shingle_hashes(self, texts):
+        """Hash 32 bit của mọi shingle trong danh sách văn bản (nối liền) và số shingle của từng văn bản.
+
+        Văn bản ngắn hơn shingle_size từ là một shingle; mỗi từ khác nhau chỉ hash crc32 một lần.
+        """
+        words = [text.split() for text in texts]
+        lengths = np.fromiter(map(len, words), dtype=np.int64, count=len(words))
+        codes, uniques = pd.factorize(np.fromiter(chain.from_iterable(words), dtype=object, count=lengths.sum()))
+        hashes = np.fromiter((zlib.crc32(word.encode()) for word in uniques),
+                             dtype=np.uint64, count=len(uniques))[codes]
+
+        # Shingle bắt đầu tại mỗi từ, chỉ gộp các từ còn nằm trong cùng văn bản
+        ends = np.repeat(np.cumsum(lengths), lengths)
+        position = np.arange(len(hashes))
+        combined = np.zeros(len(hashes), dtype=np.uint64)
+        for j in range(self.shingle_size):
+            shifted = np.zeros(len(hashes), dtype=np.uint64)
+            shifted[:len(hashes) - j] = hashes[j:]
+            combined += np.where(position + j < ends, shifted * self.word_weights[j], np.uint64(0))
+        starts = ends - np.repeat(lengths, lengths)
+        keep = (position <= ends - self.shingle_size) | (position == starts)
+        counts = np.maximum(lengths - self.shingle_size + 1, 1)
+        return combined[keep] ^ (combined[keep] >> np.uint64(32)), counts
+
+    def signatures(self, texts):
+        """Ma trận signature (số văn bản × num_perm, uint32); mọi văn bản phải có ít nhất một từ.
+
+        Hoán vị dùng multiply-shift ((a·x + b) mod 2^64) >> 32, không cần phép chia lấy dư.
+        """
+        signatures = np.empty((len(texts), self.num_perm), dtype=np.uint32)
+        sizes = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+        start = 0
+        while start < len(texts):
+            # Gom các văn bản liên tiếp đến khi đủ HASH_BATCH_CHARS ký tự
+            end = max(start + 1, int(np.searchsorted(np.cumsum(sizes[start:]), HASH_BATCH_CHARS)) + start)
+            values, counts = self.shingle_hashes(texts[start:end])
+            permuted = self.a[:, None] * values
+            permuted += self.b[:, None]
+            permuted >>= np.uint64(32)
+            offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            signatures[start:end] = np.minimum.reduceat(permuted, offsets, axis=1).T
+            start = end
+        return signatures
+
+    def band_hashes(self, signatures):
+        """Khóa bucket LSH (số văn bản × bands, int64) của từng band."""
+        bands = signatures.astype(np.uint64).reshape(len(signatures), self.bands, self.rows)
+        return (bands * self.band_weights).sum(axis=2, dtype=np.uint64).view(np.int64)
+
+
+def similarity(left, right):
+    """Ước lượng độ tương đồng Jaccard từ hai (mảng) signature."""
+    return (left == right).mean(axis=-1)
+
+
+class SignatureStore:
+    """Cache signature MinHash theo job_key (SQLite) cùng bucket LSH của toàn bộ lịch sử.
+
+    Mỗi job chỉ được hash một lần; kết quả duplicate_of được giữ lại nên chạy lại
+    cùng một ngày cho cùng kết quả.
+    """
+
+    def __init__(self, db_path, settings):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, timeout=60)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS settings (
+                name TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                job_key TEXT PRIMARY KEY,
+                signature BLOB NOT NULL,
+                duplicate_of TEXT,
+                first_seen TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS lsh_buckets (
+                band INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                job_key TEXT NOT NULL,
+                PRIMARY KEY (band, bucket, job_key)
+            ) WITHOUT ROWID;
+        """)
+        row = self.conn.execute("SELECT value FROM settings WHERE name = 'minhash'").fetchone()
+        with self.conn:
+            if row is not None and row[0] != settings:
+                logger.warning("⚠ Tham số MinHash đổi (%s → %s), xóa cache signature cũ.", row[0], settings)
+                self.conn.execute("DELETE FROM postings")
+                self.conn.execute("DELETE FROM lsh_buckets")
+            self.conn.execute("INSERT OR REPLACE INTO settings (name, value) VALUES ('minhash', ?)", (settings,))
+
+    def _select(self, columns, job_keys):
+        """Các dòng postings của job_keys."""
+        return select_in(self.conn, f"SELECT job_key, {columns} FROM postings", "job_key", job_keys)
+
+    def known(self, job_keys):
+        """{job_key: duplicate_of} của các job đã hash ở lần chạy trước."""
+        return dict(self._select("duplicate_of", job_keys))
+
+    def signatures(self, job_keys):
+        """{job_key: signature} của các job đã lưu."""
+        return {key: np.frombuffer(blob, dtype=np.uint32) for key, blob in self._select("signature", job_keys)}
+
+    def candidates(self, band_hashes, max_bucket_size=MAX_BUCKET_SIZE):
+        """Cặp (vị trí dòng, job_key trong lịch sử) có chung ít nhất một bucket LSH.
+
+        Mỗi bucket chỉ lấy tối đa max_bucket_size job (theo job_key) làm ứng viên.
+        """
+        rows, bands = np.indices(band_hashes.shape)
+        with self.conn:
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS probe (row INTEGER, band INTEGER, bucket INTEGER)")
+            self.conn.execute("DELETE FROM probe")
+            self.conn.executemany("INSERT INTO probe VALUES (?, ?, ?)",
+                                  zip(rows.ravel().tolist(), bands.ravel().tolist(), band_hashes.ravel().tolist()))
+        return self.conn.execute("""
+            WITH probed AS (SELECT DISTINCT band, bucket FROM probe),
+            members AS (
+                SELECT b.band, b.bucket, b.job_key,
+                       ROW_NUMBER() OVER (PARTITION BY b.band, b.bucket ORDER BY b.job_key) AS position
+                FROM probed q JOIN lsh_buckets b ON b.band = q.band AND b.bucket = q.bucket
+            )
+            SELECT DISTINCT p.row, m.job_key
+            FROM probe p JOIN members m ON m.band = p.band AND m.bucket = p.bucket
+            WHERE m.position <= ?
+        """, (max_bucket_size,)).fetchall()
+
+    def add(self, execution_date, job_keys, signatures, band_hashes, duplicate_of):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO postings (job_key, signature, duplicate_of, first_seen) VALUES (?, ?, ?, ?)",
+                ((key, sig.tobytes(), dup, execution_date)
+                 for key, sig, dup in zip(job_keys, signatures, duplicate_of))
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO lsh_buckets (band, bucket, job_key) VALUES (?, ?, ?)",
+                ((band, bucket, key)
+                 for key, buckets in zip(job_keys, band_hashes.tolist())
+                 for band, bucket in enumerate(buckets))
+            )
+
+    def close(self):
+        self.conn.close()
+
+
+def _union(parent, i, j):
+    """Gộp hai nhóm, gốc là vị trí nhỏ hơn (tin đăng sớm hơn)."""
+    ri, rj = _root(parent, i), _root(parent, j)
+    if ri != rj:
+        parent[max(ri, rj)] = min(ri, rj)
+
+
+def _root(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def _bucket_pairs(band_hashes, max_bucket_size=MAX_BUCKET_SIZE):
+    """Cặp vị trí (row, row_other) với row_other < row có chung bucket ở ít nhất một band.
+
+    Bucket tối đa max_bucket_size tin ghép mọi cặp; bucket lớn hơn ghép mỗi tin với tin đầu bucket
+    và tin liền trước, nên chuỗi A≈B≈C trong cùng bucket vẫn được nối qua B.
+    """
+    bands = band_hashes.shape[1]
+    buckets = pd.DataFrame({
+        'band': np.tile(np.arange(bands), len(band_hashes)),
+        'bucket': band_hashes.ravel(),
+        'row': np.repeat(np.arange(len(band_hashes)), bands),
+    })
+    buckets = buckets[buckets.duplicated(['band', 'bucket'], keep=False)]
+    size = buckets.groupby(['band', 'bucket'])['row'].transform('size')
+
+    small = buckets[size <= max_bucket_size]
+    pairs = [small.merge(small, on=['band', 'bucket'], suffixes=('', '_other'))[['row', 'row_other']]]
+    large = buckets[size > max_bucket_size].sort_values(['band', 'bucket', 'row'])
+    group = large.groupby(['band', 'bucket'])['row']
+    pairs.append(pd.DataFrame({'row': large['row'], 'row_other': group.transform('first')}))
+    pairs.append(pd.DataFrame({'row': large['row'], 'row_other': group.shift(1)}).dropna())
+
+    pairs = pd.concat(pairs, ignore_index=True).astype(np.int64)
+    return pairs[pairs['row_other'] < pairs['row']].drop_duplicates().to_numpy()
+
+
+def _pair_similarity(left, right, left_rows, right_rows):
+    """Độ tương đồng của các cặp (left[left_rows[i]], right[right_rows[i]]), tính theo lô VERIFY_BATCH cặp."""
+    scores = np.empty(len(left_rows))
+    for start in range(0, len(left_rows), VERIFY_BATCH):
+        batch = slice(start, start + VERIFY_BATCH)
+        scores[batch] = similarity(left[left_rows[batch]], right[right_rows[batch]])
+    return scores
+
+
+def find_duplicates(execution_date, df, store, hasher, min_similarity=0.8):
+    """Series duplicate_of cho từng dòng của partition: job_key của tin gốc, None nếu không phải tin đăng lại.
+
+    Chỉ job chưa có trong cache được hash. Cặp ứng viên lấy từ bucket LSH (trong partition và
+    với lịch sử, bucket lớn chỉ ghép tối đa MAX_BUCKET_SIZE ứng viên mỗi tin) rồi được kiểm tra
+    bằng độ tương đồng ước lượng từ signature, nên số phép so sánh tăng tuyến tính theo số job
+    thay vì bình phương, kể cả khi nhiều tin dùng chung mẫu mô tả.
+    """
+    keys = job_keys(df)
+    known = store.known(keys.dropna().unique().tolist())
+    text = df[TEXT_COLUMNS[0]].astype(object).fillna('').astype(str)
+    for col in TEXT_COLUMNS[1:]:
+        text = text + ' ' + df[col].astype(object).fillna('').astype(str)
+    new = keys.notna() & ~keys.isin(list(known)) & (text.str.strip() != '') & ~keys.duplicated()
+
+    # Sắp theo ngày đăng để tin sớm nhất của mỗi nhóm được giữ làm tin gốc
+    order = df.loc[new, ['created_on']].assign(job_key=keys[new]).sort_values(['created_on', 'job_key'])
+    new_keys = order['job_key'].tolist()
+    with metrics.span("dedup.minhash"):
+        signatures = hasher.signatures(text[order.index].tolist())
+        band_hashes = hasher.band_hashes(signatures)
+    metrics.count("jobs_hashed", len(new_keys))
+
+    with metrics.span("dedup.lsh"):
+        # Cặp trong partition: mỗi job so với các job đăng trước nó cùng bucket ở từng band, để kết
+        # quả không phụ thuộc thứ tự dòng (chuỗi A≈B≈C vẫn gộp được khi A và C khác nhau nhiều)
+        pairs = _bucket_pairs(band_hashes)
+        history = store.candidates(band_hashes)
+    metrics.count("candidate_pairs", len(pairs) + len(history))
+
+    with metrics.span("dedup.verify"):
+        parent = list(range(len(new_keys)))
+        if len(pairs):
+            similar = _pair_similarity(signatures, signatures, pairs[:, 0], pairs[:, 1]) >= min_similarity
+            for row, other in pairs[similar].tolist():
+                _union(parent, row, other)
+
+        # Tin gốc trong lịch sử của mỗi nhóm (ưu tiên cặp tương đồng nhất)
+        best = {}
+        if history:
+            history_keys = list({key: None for _, key in history})
+            history_signatures = store.signatures(history_keys)
+            history_known = store.known(history_keys)
+            position = {key: i for i, key in enumerate(history_keys)}
+            history_matrix = np.stack([history_signatures[key] for key in history_keys])
+            rows = np.array([row for row, _ in history], dtype=np.int64)
+            others = np.array([position[key] for _, key in history], dtype=np.int64)
+            scores = _pair_similarity(signatures, history_matrix, rows, others)
+            matches = pd.DataFrame({'root': [_root(parent, row) for row in rows.tolist()], 'score': scores,
+                                    'original': [history_known[key] or key for _, key in history]})
+            matches = matches[matches['score'] >= min_similarity].sort_values('score', ascending=False, kind='stable')
+            best = dict(matches.drop_duplicates('root')[['root', 'original']].itertuples(index=False, name=None))
+
+    duplicate_of = []
+    for row in range(len(new_keys)):
+        root = _root(parent, row)
+        if root in best:
+            duplicate_of.append(best[root])
+        else:
+            duplicate_of.append(new_keys[root] if root != row else None)
+    store.add(execution_date, new_keys, signatures, band_hashes, duplicate_of)
+
+    result = keys.map({**known, **dict(zip(new_keys, duplicate_of))})
+    return result.where(result.notna(), None).astype(object)
+
+
+def deduplicate_partition(execution_date, data_dir=DATA_DIR, min_similarity=0.8):
+    """Đánh dấu tin đăng lại (URL mới hoặc sửa vài chữ) trong file transform của execution_date.
+
+    Ghi lại file với cột duplicate_of; các bước sau bỏ qua các dòng có duplicate_of khác null.
+    Signature được cache trong data_dir/dedup nên mỗi ngày chỉ hash các tin mới.
+    """
+    input_file = f"{data_dir}/{execution_date}/{TRANSFORMED_FILE}"
+    if not os.path.exists(input_file):
+        logger.error("❌ File đầu vào %s không tồn tại.", input_file)
+        raise FileNotFoundError(f"Input file {input_file} does not exist")
+
+    with metrics.stage("dedup", f"{data_dir}/{execution_date}", execution_date):
+        with metrics.span("dedup.read"):
+            df = read_jobs(input_file)
+        metrics.count("rows_read", len(df))
+
+        hasher = MinHasher()
+        store = SignatureStore(os.path.join(data_dir, DEDUP_DIR, DEDUP_DB_FILE), hasher.settings)
+        try:
+            df[DUPLICATE_COLUMN] = find_duplicates(execution_date, df, store, hasher, min_similarity)
+        finally:
+            store.close()
+
+        # Ghi file tạm rồi thay thế để không để lại file transform dở dang
+        with metrics.span("dedup.write"):
+            with atomic_path(input_file) as tmp_path:
+                write_jobs(df, tmp_path, schema=DEDUP_SCHEMA)
+        duplicates = int(df[DUPLICATE_COLUMN].notna().sum())
+        metrics.count("duplicates_found", duplicates)
+
+    logger.info("🔁 Dedup %s: %d/%d tin là tin đăng lại", execution_date, duplicates, len(df))
+    return duplicates
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    deduplicate_partition(datetime.now().strftime("%Y-%m-%d"))
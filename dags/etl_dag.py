@@ -1,9 +1,9 @@
 from datetime import datetime, timedelta
 from airflow import DAG
 from airflow.operators.python import PythonOperator
-from extract import WebScraper
-from transform import transform_data
-from skill_visualize import get_top_skills
+# Chỉ import cấu hình nhẹ khi parse DAG; các module nặng (selenium, pandas, matplotlib)
+# được import bên trong hàm của task, chỉ khi task thật sự chạy
+from pipeline_config import DATA_DIR, EXTRACT_PARALLELISM, KEYWORDS
 
 # Cấu hình mặc định cho DAG
 default_args = {
@@ -15,25 +15,72 @@ default_args = {
     'retry_delay': timedelta(minutes=3),
 }
 
-def run_extract(**context):
-    """Task extract dữ liệu từ VietnamWorks"""
+def run_extract_keyword(keyword, **context):
+    """Task extract một keyword từ VietnamWorks, ghi ra shard riêng"""
+    from extract import WebScraper
+
     execution_date = context['ds']  # Ngày chạy dạng YYYY-MM-DD
+    # Trigger DAG với conf {"replay": true} để dựng lại dữ liệu từ archive, không cần scrape
+    conf = context['dag_run'].conf or {}
     scraper = WebScraper(headless=True)
-    scraper.extract_jobs(
-        output_dir='/opt/airflow/data/vietnamwork',
-        execution_date=execution_date
+    scraper.extract_keyword(
+        keyword,
+        output_dir=DATA_DIR,
+        execution_date=execution_date,
+        replay=bool(conf.get('replay', False))
     )
 
+def run_merge(**context):
+    """Task gộp shard của các keyword và loại job trùng"""
+    from extract import merge_shards
+
+    execution_date = context['ds']
+    # Replay không được ghi đè state store bằng snapshot cũ
+    conf = context['dag_run'].conf or {}
+    merge_shards(output_dir=DATA_DIR, execution_date=execution_date, replay=bool(conf.get('replay', False)))
+
 def run_transform(**context):
     """Task transform dữ liệu"""
+    from transform import transform_data
+
     execution_date = context['ds']
     transform_data(execution_date)
 
+def run_dedup(**context):
+    """Task đánh dấu tin đăng lại (MinHash/LSH)"""
+    from dedup import deduplicate_partition
+
+    execution_date = context['ds']
+    deduplicate_partition(execution_date, data_dir=DATA_DIR)
+
+def run_load(**context):
+    """Task nạp partition đã transform vào kho phân tích"""
+    from analytics_store import load_partition
+
+    execution_date = context['ds']
+    load_partition(execution_date, data_dir=DATA_DIR)
+
+def run_compact(**context):
+    """Task gộp partition của tháng thành file tháng và cập nhật skip index"""
+    from compaction import compact_partitions
+
+    execution_date = context['ds']
+    compact_partitions(data_dir=DATA_DIR, months=[execution_date[:7]])
+
 def run_visualize(**context):
     """Task visualize kỹ năng"""
+    from skill_visualize import get_top_skills
+
     execution_date = context['ds']
     get_top_skills(execution_date)
 
+def run_trends(**context):
+    """Task cập nhật rollup xu hướng theo tháng"""
+    from trend_visualize import update_trends
+
+    execution_date = context['ds']
+    update_trends(execution_date)
+
 # Định nghĩa DAG
 with DAG(
     'vietnamworks_etl_pipeline',
@@ -44,9 +91,20 @@ with DAG(
     catchup=False,
 ) as dag:
     
-    extract_task = PythonOperator(
-        task_id='extract_data',
-        python_callable=run_extract,
+    # Mỗi keyword một task (dynamic task mapping), lỗi ở keyword nào chỉ retry keyword đó
+    extract_task = PythonOperator.partial(
+        task_id='extract_keyword',
+        python_callable=run_extract_keyword,
+        max_active_tis_per_dag=EXTRACT_PARALLELISM,
+        retries=2,
+    ).expand(op_kwargs=[{'keyword': keyword} for keyword in KEYWORDS])
+
+    # all_done: vẫn gộp các shard đã có khi một keyword lỗi hết số lần retry
+    # (merge_shards khi đó không cập nhật state store)
+    merge_task = PythonOperator(
+        task_id='merge_shards',
+        python_callable=run_merge,
+        trigger_rule='all_done',
         provide_context=True,  # để hàm nhận được **context
     )
 
@@ -56,11 +114,35 @@ with DAG(
         provide_context=True,
     )
 
+    dedup_task = PythonOperator(
+        task_id='dedup_postings',
+        python_callable=run_dedup,
+        provide_context=True,
+    )
+
+    load_task = PythonOperator(
+        task_id='load_analytics',
+        python_callable=run_load,
+        provide_context=True,
+    )
+
+    compact_task = PythonOperator(
+        task_id='compact_partitions',
+        python_callable=run_compact,
+        provide_context=True,
+    )
+
     visualize_task = PythonOperator(
         task_id='visualize_skills',
         python_callable=run_visualize,
         provide_context=True,
     )
 
+    trend_task = PythonOperator(
+        task_id='update_trends',
+        python_callable=run_trends,
+        provide_context=True,
+    )
+
     # Thứ tự chạy
-    extract_task >> transform_task >> visualize_task
+    extract_task >> merge_task >> transform_task >> dedup_task >> [load_task, compact_task, visualize_task, trend_task]
@@ -1,9 +1,12 @@
 import os
+import gzip
+import math
 import time
 import json
 import logging
-import pandas as pd
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 from seleniumwire import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
@@ -14,23 +17,203 @@ from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.chrome.options import Options
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import metrics
+from api_client import AIMDLimiter, ApiClient, CircuitBreaker, RetryPolicy
+from pipeline_config import DATA_DIR, KEYWORDS, LOG_FORMAT
+from raw_archive import RawArchive, slugify
+from session_cache import SESSION_CACHE_FILE, SessionCache
+from state_store import JobStateStore
+from storage import RAW_FILE, RAW_CSV_FILE, job_key, jobs_to_frame, write_jobs
 
-# Cấu hình log
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+VIETNAMWORKS_URL = "https://www.vietnamworks.com"
+SEARCH_API_URL = "https://ms.vietnamworks.com/job-search/v1.0/search"
+API_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                  "(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    "Accept": "application/json",
+    "Content-Type": "application/json"
+}
+RETRIEVE_FIELDS = [
+    "jobId", "jobTitle", "jobUrl", "createdOn", "approvedOn", "expiredOn",
+    "companyName", "jobDescription", "jobRequirement", "salary",
+    "salaryMax", "salaryMin", "skills", "address", "workingLocations",
+    "jobLevel", "salaryCurrency"
+]
+# Các trường nhẹ dùng để so với state store trước khi tải payload đầy đủ
+LIGHT_FIELDS = ["jobId", "jobUrl", "approvedOn", "expiredOn"]
+
+SHARDS_DIR = "shards"
+
+
+class JobIndex:
+    """Index job theo job_key: job trùng giữa các keyword chỉ giữ một bản và hợp nhất danh sách keyword"""
+
+    def __init__(self):
+        self.jobs = []
+        self.by_key = {}
+        self.raw_count = 0
+
+    def add(self, job_data):
+        for job_entry in job_data:
+            self.raw_count += 1
+            key = job_key(job_entry.get("job_id"), job_entry.get("job_url"))
+            if key is None:
+                self.jobs.append(job_entry)
+                continue
+            existing = self.by_key.get(key)
+            if existing is None:
+                self.by_key[key] = job_entry
+                self.jobs.append(job_entry)
+            else:
+                for keyword in job_entry["keywords"]:
+                    if keyword not in existing["keywords"]:
+                        existing["keywords"].append(keyword)
+
+    def log_dedup(self):
+        duplicates = self.raw_count - len(self.jobs)
+        logger.info("🧹 Dedup: %d job thô -> %d job duy nhất (loại %d bản trùng, %.1f%%)",
+                    self.raw_count, len(self.jobs), duplicates,
+                    100.0 * duplicates / self.raw_count if self.raw_count else 0.0)
+
+
+def shard_path(output_path, keyword):
+    """Đường dẫn file shard của một keyword trong partition"""
+    return os.path.join(output_path, SHARDS_DIR, f"{slugify(keyword)}.jsonl.gz")
+
+
+def write_shard(path, job_data):
+    """Ghi danh sách job_entry của một keyword dạng JSON lines nén gzip"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with metrics.span("extract.write_shard"), gzip.open(path, "wt", encoding="utf-8") as f:
+        for job_entry in job_data:
+            f.write(json.dumps(job_entry, ensure_ascii=False) + "\n")
+    metrics.count("rows_written", len(job_data))
+
+
+def read_shard(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def write_partition(output_dir, execution_date, index, write_csv=False, state_store=None):
+    """Ghi partition từ JobIndex: Parquet (CSV tùy chọn), cập nhật state store và changes.json"""
+    output_path = os.path.join(output_dir, execution_date)
+    if not index.jobs:
+        logger.error("❌ Không thu được dữ liệu job nào.")
+        raise ValueError("No jobs extracted")
+
+    index.log_dedup()
+    parquet_path = f"{output_path}/{RAW_FILE}"
+    csv_path = f"{output_path}/{RAW_CSV_FILE}" if write_csv else None
+
+    with metrics.span("extract.write_partition"):
+        write_jobs(jobs_to_frame(index.jobs), parquet_path, csv_path)
+    metrics.count("rows_written", len(index.jobs))
+    metrics.count("bytes_written", os.path.getsize(parquet_path))
+
+    logger.info("🎉 Hoàn tất! Đã lưu %d job vào:", len(index.jobs))
+    logger.info("   - Parquet: %s", parquet_path)
+    if csv_path:
+        logger.info("   - CSV    : %s", csv_path)
+
+    if state_store is not None:
+        changes = state_store.commit_partition(execution_date, index.by_key)
+        changes_path = f"{output_path}/changes.json"
+        with open(changes_path, "w", encoding="utf-8") as f:
+            json.dump(changes, f, ensure_ascii=False, indent=4)
+        logger.info("   - Changes: %s", changes_path)
+
+
+def merge_shards(output_dir, execution_date, keywords=KEYWORDS, write_csv=False, incremental=True, replay=False):
+    """Gộp shard của các keyword thành partition, loại job trùng giữa các keyword.
+
+    Nếu thiếu shard của keyword nào (task extract của keyword đó lỗi) thì vẫn gộp các shard còn lại
+    nhưng không cập nhật state store, tránh đánh dấu nhầm job hết hạn. Không có shard nào thì báo lỗi.
+    replay=True: shard được dựng lại từ archive nên không cập nhật state store (như extract_jobs).
+    """
+    output_path = os.path.join(output_dir, execution_date)
+    with metrics.stage("merge_shards", output_path, execution_date):
+        index = JobIndex()
+        missing = []
+        for keyword in keywords:
+            path = shard_path(output_path, keyword)
+            if not os.path.exists(path):
+                logger.warning("⚠ Không có shard cho keyword '%s' (%s)", keyword, path)
+                missing.append(keyword)
+                continue
+            with metrics.span("merge.read_shard"):
+                index.add(read_shard(path))
+        if len(missing) == len(keywords):
+            raise FileNotFoundError(f"No shards found under {output_path}")
+        logger.info("Đã gộp %d shard, thiếu %d.", len(keywords) - len(missing), len(missing))
+        metrics.count("rows_read", index.raw_count)
+
+        state_store = None
+        if incremental and replay:
+            logger.info("Replay: không cập nhật state store.")
+        elif incremental and not missing:
+            state_store = JobStateStore(os.path.join(output_dir, "state", "jobs_state.sqlite"))
+        elif incremental:
+            logger.warning("⚠ Bỏ qua cập nhật state store vì thiếu shard: %s", ", ".join(missing))
+        try:
+            write_partition(output_dir, execution_date, index, write_csv, state_store)
+        finally:
+            if state_store is not None:
+                state_store.close()
+
+
 class WebScraper:
-    def __init__(self, headless=True):
-        self.keywords = ["Data Engineer", "Data Engineer Intern", "Data Engineer Fresher", "Data Analyst", "Data Analyst Intern", "Data Analyst Fresher", 
-                         "Data Scientist", "Data Scientist Intern", "Data Scientist Fresher", "Machine Learning Engineer", "Machine Learning Intern", "Machine Learning Fresher", "AI Engineer", "AI Intern", "AI Fresher"]
+    def __init__(self, headless=True, pool_size=10, max_concurrency=4, hits_per_page=50, max_pages=None,
+                 api_url=SEARCH_API_URL, cookie_ttl=6 * 3600, timeout=(5, 30), max_attempts=5):
+        self.keywords = list(KEYWORDS)
         logger.info("Khởi tạo WebScraper...")
 
+        self.headless = headless
+        self._driver = None
+        self.index = JobIndex()
+        self.state_store = None
+        self.known_fingerprints = {}
+        self.archive = None
+        self.replay = False
+        self.execution_date = None
+        self.session = None
+        self.pool_size = max(pool_size, max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.hits_per_page = hits_per_page
+        self.max_pages = max_pages
+        self.api_url = api_url
+        self.cookie_ttl = cookie_ttl
+        self.session_cache = None
+        # (connect, read) timeout mỗi lần gửi; retry, số request đồng thời thích ứng (tối đa
+        # max_concurrency) và circuit breaker dùng chung cho mọi keyword của scraper
+        self.timeout = timeout
+        self.api_client = ApiClient(
+            RetryPolicy(max_attempts=max_attempts),
+            AIMDLimiter(initial=min(2, max_concurrency), max_limit=max_concurrency),
+            CircuitBreaker(),
+        )
+        # Cookie lấy từ cache có thể đã bị server thu hồi; khi API trả 401/403 thì lấy lại bằng trình duyệt
+        self._cookies_from_cache = False
+        self._cookie_generation = 0
+        self._refresh_lock = threading.Lock()
+
+    @property
+    def driver(self):
+        """WebDriver chỉ được khởi tạo khi thật sự cần (replay không cần trình duyệt)"""
+        if self._driver is None:
+            self._driver = self._start_driver()
+        return self._driver
+
+    def _start_driver(self):
         chrome_options = Options()
         chrome_options.add_argument("--disable-gpu")
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--disable-dev-shm-usage")
         chrome_options.add_argument("--window-size=1920,1080")
-        if headless:
+        if self.headless:
             chrome_options.add_argument("--headless=new")
         chrome_options.add_argument(
             "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -42,13 +225,23 @@ class WebScraper:
             "verify_ssl": True
         }
 
-        self.driver = webdriver.Chrome(
-            service=Service(ChromeDriverManager().install()),
-            options=chrome_options,
-            seleniumwire_options=seleniumwire_options
-        )
-        self.all_jobs = []
-        logger.info("✅ WebDriver đã khởi tạo thành công (headless=%s)", headless)
+        with metrics.span("extract.browser_startup"):
+            driver = webdriver.Chrome(
+                service=Service(self._driver_path()),
+                options=chrome_options,
+                seleniumwire_options=seleniumwire_options
+            )
+        logger.info("✅ WebDriver đã khởi tạo thành công (headless=%s)", self.headless)
+        return driver
+
+    def _driver_path(self):
+        """Đường dẫn chromedriver: lấy từ cache nếu còn hạn, không thì tra cứu/tải bằng ChromeDriverManager"""
+        path = self.session_cache.load_driver_path() if self.session_cache is not None else None
+        if path is None:
+            path = ChromeDriverManager().install()
+            if self.session_cache is not None:
+                self.session_cache.save_driver_path(path)
+        return path
 
     def handle_cookie_popup(self):
         """Đóng popup cookie nếu có"""
@@ -62,11 +255,75 @@ class WebScraper:
         except (TimeoutException, NoSuchElementException):
             logger.info("Không tìm thấy cookie banner, tiếp tục...")
 
+    def bootstrap_session(self, cookies=None):
+        """Mở VietnamWorks một lần để lấy cookie, sau đó dùng chung một requests.Session (keep-alive) cho mọi keyword.
+
+        cookies: dict cookie có sẵn (ví dụ khi chạy với API giả lập), khi đó không mở trình duyệt.
+        """
+        if cookies is None and self.session_cache is not None:
+            cookies = self.session_cache.load_cookies()
+            if cookies is not None:
+                self._cookies_from_cache = True
+                logger.info("♻ Dùng %d cookie đã lưu, không cần mở trình duyệt.", len(cookies))
+        if cookies is None:
+            cookies = self._browser_cookies()
+            if cookies is None:
+                return False
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(API_HEADERS)
+        # Không gán domain để cookie được gửi kèm như khi truyền dict cookies cho requests.post
+        for name, value in cookies.items():
+            session.cookies.set(name, value)
+
+        self.session = session
+        logger.info("✅ Đã tạo session với %d cookie.", len(session.cookies))
+        return True
+
+    def _browser_cookies(self):
+        """Mở VietnamWorks trên trình duyệt để lấy cookie, lưu vào cache nếu có"""
+        logger.info("🌐 Lấy cookie từ trình duyệt...")
+        try:
+            self.driver.get(VIETNAMWORKS_URL)
+            self.handle_cookie_popup()
+        except Exception as e:
+            logger.error("❌ Lỗi khi mở trang VietnamWorks: %s", str(e))
+            return None
+        cookies = {cookie['name']: cookie['value'] for cookie in self.driver.get_cookies()}
+        if self.session_cache is not None:
+            self.session_cache.save_cookies(cookies)
+        return cookies
+
+    def _refresh_cookies(self, generation):
+        """API từ chối cookie đã lưu: lấy cookie mới bằng trình duyệt (chỉ một thread làm, một lần)"""
+        with self._refresh_lock:
+            if generation != self._cookie_generation:
+                return True  # Thread khác đã làm mới cookie
+            if not self._cookies_from_cache:
+                return False
+            logger.warning("⚠ API từ chối cookie đã lưu, mở trình duyệt để lấy cookie mới...")
+            self._cookies_from_cache = False
+            if self.session_cache is not None:
+                self.session_cache.invalidate_cookies()
+            cookies = self._browser_cookies()
+            if cookies is None:
+                return False
+            self.session.cookies.clear()
+            for name, value in cookies.items():
+                self.session.cookies.set(name, value)
+            self._cookie_generation += 1
+            metrics.count("api.cookie_refreshes")
+            return True
+
     def search_jobs(self, keyword):
         """Truy cập trang VietnamWorks và tìm kiếm keyword"""
         logger.info("🔍 Đang tìm kiếm công việc với từ khóa: '%s'", keyword)
         try:
-            self.driver.get("https://www.vietnamworks.com")
+            with metrics.span("extract.search_page"):
+                self.driver.get(VIETNAMWORKS_URL)
             self.handle_cookie_popup()
 
             search_box = WebDriverWait(self.driver, 30).until(
@@ -76,82 +333,330 @@ class WebScraper:
             search_box.send_keys(keyword)
             search_box.send_keys(Keys.ENTER)
             logger.info("Đã gửi từ khóa tìm kiếm thành công.")
-            time.sleep(5)  # Chờ trang tải kết quả
+            with metrics.span("extract.search_wait"):
+                time.sleep(5)  # Chờ trang tải kết quả
             return True
         except Exception as e:
             logger.error("❌ Lỗi khi tìm kiếm: %s", str(e))
             return False
 
-    def fetch_jobs_api(self, keyword):
-        """Gọi API để lấy dữ liệu việc làm"""
-        logger.info("📡 Đang gọi API để lấy dữ liệu cho từ khóa '%s'...", keyword)
-        job_data = []
-        payload = {
+    def _build_payload(self, keyword, page, fields=RETRIEVE_FIELDS):
+        """Tạo payload tìm kiếm cho một trang kết quả"""
+        return {
             "userId": 0,
             "query": keyword,
             "filter": [],
             "ranges": [],
             "order": [{"field": "relevant", "value": "asc"}],
-            "hitsPerPage": 50,
-            "page": 0,
-            "retrieveFields": [
-                "jobTitle", "jobUrl", "createdOn", "approvedOn", "expiredOn",
-                "companyName", "jobDescription", "jobRequirement", "salary",
-                "salaryMax", "salaryMin", "skills", "address", "workingLocations",
-                "jobLevel", "salaryCurrency"
-            ]
+            "hitsPerPage": self.hits_per_page,
+            "page": page,
+            "retrieveFields": fields
         }
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-                          "(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-            "Accept": "application/json",
-            "Content-Type": "application/json"
+
+    def _send_search(self, payload, cookies=None):
+        """Gửi request tìm kiếm qua api_client (retry, backoff, giới hạn đồng thời, circuit breaker)"""
+        def send():
+            with metrics.span("extract.api_call"):
+                if self.session is not None:
+                    response = self.session.post(self.api_url, json=payload, timeout=self.timeout)
+                else:
+                    response = requests.post(
+                        self.api_url,
+                        json=payload,
+                        headers=API_HEADERS,
+                        cookies=cookies,
+                        timeout=self.timeout
+                    )
+            metrics.count("api.requests")
+            metrics.count("api.bytes_received", len(response.content))
+            return response
+
+        return self.api_client.call(send)
+
+    def _post_search(self, payload, cookies=None):
+        """Gửi một request tìm kiếm và trả về JSON response"""
+        generation = self._cookie_generation
+        response = self._send_search(payload, cookies)
+        if response.status_code in (401, 403) and self.session is not None and self._refresh_cookies(generation):
+            response = self._send_search(payload, cookies)
+        response.raise_for_status()
+        body = response.json()
+        if self.archive is not None:
+            self.archive.save(self.execution_date, payload["query"], payload["page"], payload["retrieveFields"], body)
+        return body
+
+    @staticmethod
+    def _parse_job(job, keyword):
+        """Chuyển một job trong response API thành job_entry"""
+        skill_names = [s.get("skillName") for s in job.get("skills", [])] if job.get("skills") else []
+        return {
+            "job_id": job.get("jobId"),
+            "job_title": job.get("jobTitle"),
+            "job_url": job.get("jobUrl"),
+            "created_on": job.get("createdOn"),
+            "approved_on": job.get("approvedOn"),
+            "expired_on": job.get("expiredOn"),
+            "company_name": job.get("companyName"),
+            "job_description": job.get("jobDescription"),
+            "job_requirement": job.get("jobRequirement"),
+            "salary": job.get("salary"),
+            "salary_max": job.get("salaryMax"),
+            "salary_min": job.get("salaryMin"),
+            "skill_name": skill_names,
+            "address": job.get("address"),
+            "city_name": job.get("workingLocations", [{}])[0].get("cityName") if job.get("workingLocations") else None,
+            "job_level": job.get("jobLevel"),
+            "salary_currency": job.get("salaryCurrency"),
+            "keywords": [keyword]
         }
 
-        try:
+    def _total_pages(self, body):
+        """Tính số trang cần lấy từ tổng số kết quả trong response"""
+        meta = body.get("meta") or {}
+        total_pages = meta.get("nbPages")
+        if not total_pages:
+            total_hits = meta.get("nbHits") or len(body.get("data", []))
+            total_pages = math.ceil(total_hits / self.hits_per_page)
+        if self.max_pages:
+            total_pages = min(total_pages, self.max_pages)
+        return total_pages
+
+    @staticmethod
+    def job_key(job_entry):
+        """Khóa định danh ổn định của một job_entry (xem storage.job_key)"""
+        return job_key(job_entry.get("job_id"), job_entry.get("job_url"))
+
+    def _iter_pages(self, keyword, fields, pages=None):
+        """Lấy các trang kết quả của keyword, trả về (page, danh sách job) ngay khi từng trang về.
+
+        pages=None: lấy trang 0 để biết tổng số trang rồi lấy các trang còn lại song song.
+        """
+        # Cookie được đọc một lần, không gọi WebDriver từ các thread
+        cookies = None
+        if self.session is None:
             cookies = {cookie['name']: cookie['value'] for cookie in self.driver.get_cookies()}
-            response = requests.post(
-                "https://ms.vietnamworks.com/job-search/v1.0/search",
-                json=payload,
-                headers=headers,
-                cookies=cookies,
-                timeout=20
-            )
-            response.raise_for_status()
-            jobs = response.json().get("data", [])
 
+        if pages is None:
+            first_page = self._post_search(self._build_payload(keyword, 0, fields), cookies)
+            yield 0, first_page.get("data", [])
+            pages = range(1, self._total_pages(first_page))
+            if len(pages):
+                logger.info("Keyword '%s' có %d trang, lấy song song tối đa %d trang một lúc.",
+                            keyword, len(pages) + 1, self.max_concurrency)
+
+        pages = list(pages)
+        if not pages:
+            return
+        # Số thread là mức trần; số request thật sự gửi cùng lúc do api_client điều chỉnh
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(pages))) as executor:
+            futures = {
+                executor.submit(self._post_search, self._build_payload(keyword, page, fields), cookies): page
+                for page in pages
+            }
+            # Trả kết quả ngay khi từng trang về
+            for future in as_completed(futures):
+                page = futures[future]
+                try:
+                    body = future.result()
+                except Exception as e:
+                    # Thiếu một trang là mất dữ liệu: dừng các trang còn lại và báo lỗi cho task
+                    metrics.count("api.errors")
+                    logger.error("❌ Lỗi khi gọi API trang %d của keyword '%s': %s", page, keyword, str(e))
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    raise
+                yield page, body.get("data", [])
+
+    def fetch_jobs_api(self, keyword):
+        """Gọi API để lấy dữ liệu việc làm (tất cả các trang)"""
+        logger.info("📡 Đang gọi API để lấy dữ liệu cho từ khóa '%s'...", keyword)
+        job_data = []
+        for _, jobs in self._iter_pages(keyword, RETRIEVE_FIELDS):
+            job_data.extend(self._parse_job(job, keyword) for job in jobs)
+
+        logger.info("✅ Đã lấy được %d job từ API cho keyword '%s'", len(job_data), keyword)
+        return job_data
+
+    def fetch_jobs_incremental(self, keyword, known_fingerprints):
+        """Quét các trường nhẹ trước, chỉ tải đầy đủ những trang có job mới hoặc thay đổi.
+
+        Job không đổi được lấy lại từ state store thay vì tải lại mô tả và yêu cầu công việc.
+        """
+        logger.info("📡 Đang quét nhẹ API cho từ khóa '%s'...", keyword)
+        light_pages = {}
+        for page, jobs in self._iter_pages(keyword, LIGHT_FIELDS):
+            light_pages[page] = jobs
+
+        stale_pages = set()
+        pending_keys = set()
+        unchanged_pages = {}
+        for page, jobs in light_pages.items():
             for job in jobs:
-                skill_names = [s.get("skillName") for s in job.get("skills", [])] if job.get("skills") else []
-                job_entry = {
-                    "job_title": job.get("jobTitle"),
-                    "job_url": job.get("jobUrl"),
-                    "created_on": job.get("createdOn"),
-                    "approved_on": job.get("approvedOn"),
-                    "expired_on": job.get("expiredOn"),
-                    "company_name": job.get("companyName"),
-                    "job_description": job.get("jobDescription"),
-                    "job_requirement": job.get("jobRequirement"),
-                    "salary": job.get("salary"),
-                    "salary_max": job.get("salaryMax"),
-                    "salary_min": job.get("salaryMin"),
-                    "skill_name": skill_names,
-                    "address": job.get("address"),
-                    "city_name": job.get("workingLocations", [{}])[0].get("cityName") if job.get("workingLocations") else None,
-                    "job_level": job.get("jobLevel"),
-                    "salary_currency": job.get("salaryCurrency"),
-                    "keywords": keyword
-                }
-                job_data.append(job_entry)
-
-            logger.info("✅ Đã lấy được %d job từ API cho keyword '%s'", len(job_data), keyword)
+                key = self.job_key({"job_id": job.get("jobId"), "job_url": job.get("jobUrl")})
+                fingerprint = JobStateStore.fingerprint(job.get("approvedOn"), job.get("expiredOn"))
+                if key is None or known_fingerprints.get(key) != fingerprint:
+                    stale_pages.add(page)
+                    if key is not None:
+                        pending_keys.add(key)
+                else:
+                    unchanged_pages[key] = page
 
-        except Exception as e:
-            logger.error("❌ Lỗi khi gọi API: %s", str(e))
+        # Job không đổi nằm trên trang phải tải lại thì lấy luôn từ trang đó
+        reused_keys = [key for key, page in unchanged_pages.items() if page not in stale_pages]
+        stored = self.state_store.get_payloads(reused_keys)
+        missing_keys = [key for key in reused_keys if key not in stored]
+        if missing_keys:
+            # Không có payload trong state store: tải đầy đủ trang chứa job đó thay vì bỏ qua job
+            logger.warning("⚠ %d job không đổi của '%s' không có payload trong state store, tải lại %d trang.",
+                           len(missing_keys), keyword, len({unchanged_pages[key] for key in missing_keys}))
+            metrics.count("extract.missing_payloads", len(missing_keys))
+            for key in missing_keys:
+                stale_pages.add(unchanged_pages[key])
+                pending_keys.add(key)
+
+        job_data = []
+        fetched_keys = set()
+        if stale_pages:
+            for _, jobs in self._iter_pages(keyword, RETRIEVE_FIELDS, pages=sorted(stale_pages)):
+                for job in jobs:
+                    job_entry = self._parse_job(job, keyword)
+                    key = self.job_key(job_entry)
+                    job_data.append(job_entry)
+                    fetched_keys.add(key)
+                    pending_keys.discard(key)
+
+        if pending_keys:
+            # Thứ tự kết quả đã thay đổi giữa hai lần gọi, không ghép được theo trang
+            logger.warning("⚠ Còn %d job mới/thay đổi chưa tải được cho '%s', tải lại toàn bộ.",
+                           len(pending_keys), keyword)
+            return self.fetch_jobs_api(keyword)
+
+        # Job không đổi trên trang đã tải lại nhưng không còn trong trang đó (thứ tự kết quả thay đổi)
+        moved_keys = [key for key in unchanged_pages if key not in fetched_keys and key not in stored]
+        if moved_keys:
+            stored.update(self.state_store.get_payloads(moved_keys))
+            lost_keys = [key for key in moved_keys if key not in stored]
+            if lost_keys:
+                logger.warning("⚠ %d job không đổi của '%s' không tải lại được và không có trong state store, "
+                               "tải lại toàn bộ.", len(lost_keys), keyword)
+                return self.fetch_jobs_api(keyword)
+
+        stored = {key: job_entry for key, job_entry in stored.items() if key not in fetched_keys}
+        for job_entry in stored.values():
+            job_entry["keywords"] = [keyword]
+            job_data.append(job_entry)
+
+        logger.info("✅ Keyword '%s': %d job, tải đầy đủ %d/%d trang, dùng lại %d job từ state store",
+                    keyword, len(job_data), len(stale_pages), len(light_pages), len(stored))
+        return job_data
 
+    def _archived_jobs(self, keys):
+        """Tìm payload đầy đủ mới nhất (tính đến execution_date) của các job_key trong archive"""
+        found = {}
+        for date in reversed(self.archive.dates(until=self.execution_date)):
+            for keyword_slug in self.archive.keywords(date):
+                for body in self.archive.pages(date, keyword_slug, RETRIEVE_FIELDS).values():
+                    for job in body.get("data", []):
+                        key = self.job_key({"job_id": job.get("jobId"), "job_url": job.get("jobUrl")})
+                        if key in keys and key not in found:
+                            found[key] = job
+            if len(found) == len(keys):
+                break
+        return found
+
+    def replay_keyword(self, keyword):
+        """Dựng lại job của keyword từ archive, không cần trình duyệt hay mạng.
+
+        Nếu ngày đó chạy incremental (job không đổi chỉ có trong trang nhẹ), payload đầy đủ
+        được tìm lại trong các ngày trước đó của archive.
+        """
+        full_pages = self.archive.pages(self.execution_date, keyword, RETRIEVE_FIELDS)
+        light_pages = self.archive.pages(self.execution_date, keyword, LIGHT_FIELDS)
+        if not full_pages and not light_pages:
+            logger.warning("⚠ Archive không có dữ liệu cho keyword '%s' ngày %s", keyword, self.execution_date)
+            return []
+
+        if not light_pages:
+            job_data = [self._parse_job(job, keyword)
+                        for page in sorted(full_pages) for job in full_pages[page].get("data", [])]
+        else:
+            wanted = []
+            for page in sorted(light_pages):
+                for job in light_pages[page].get("data", []):
+                    key = self.job_key({"job_id": job.get("jobId"), "job_url": job.get("jobUrl")})
+                    if key is not None:
+                        wanted.append(key)
+            raw_jobs = self._archived_jobs(set(wanted))
+            job_data = [self._parse_job(raw_jobs[key], keyword) for key in wanted if key in raw_jobs]
+            if len(raw_jobs) < len(set(wanted)):
+                logger.warning("⚠ Archive thiếu payload của %d job cho keyword '%s'",
+                               len(set(wanted)) - len(raw_jobs), keyword)
+
+        logger.info("♻ Replay keyword '%s': %d job từ archive", keyword, len(job_data))
         return job_data
 
-    def extract_jobs(self, output_dir, execution_date=None):
-        """Hàm chính để extract job"""
+    def _fetch_keyword(self, keyword):
+        """Lấy job cho một keyword theo chế độ đã chọn"""
+        if self.state_store is not None:
+            return self.fetch_jobs_incremental(keyword, self.known_fingerprints)
+        return self.fetch_jobs_api(keyword)
+
+    def _prepare(self, output_dir, execution_date, incremental, archive, replay):
+        """Thiết lập archive, cache cookie, chế độ replay và state store cho một lần extract"""
+        self.execution_date = execution_date
+        self.replay = replay
+        self.session_cache = SessionCache(os.path.join(output_dir, "state", SESSION_CACHE_FILE), self.cookie_ttl)
+        if archive or replay:
+            self.archive = RawArchive(os.path.join(output_dir, "raw"))
+        # Replay dựng lại output từ archive, không cập nhật state store
+        if incremental and not replay:
+            self._open_state_store(output_dir)
+
+    def _open_state_store(self, output_dir):
+        """Mở state store trong output_dir/state và nạp fingerprint các job đang hoạt động"""
+        self.state_store = JobStateStore(os.path.join(output_dir, "state", "jobs_state.sqlite"))
+        self.known_fingerprints = self.state_store.get_fingerprints()
+        logger.info("State store có %d job đang hoạt động.", len(self.known_fingerprints))
+
+    def _collect(self, keywords, use_session):
+        """Lấy job cho danh sách keyword và gộp vào index"""
+        if self.replay:
+            for keyword in keywords:
+                self.index.add(self.replay_keyword(keyword))
+        elif use_session and (self.session is not None or self.bootstrap_session()):
+            for keyword in keywords:
+                self.index.add(self._fetch_keyword(keyword))
+        else:
+            if use_session:
+                logger.warning("⚠ Không tạo được session, chuyển sang tìm kiếm từng keyword trên trình duyệt.")
+            for keyword in keywords:
+                if self.search_jobs(keyword):
+                    self.index.add(self._fetch_keyword(keyword))
+                else:
+                    logger.warning("⚠ Không thể tìm kiếm với từ khóa '%s'", keyword)
+
+    def close(self):
+        """Đóng state store, archive, session và WebDriver"""
+        if self.state_store is not None:
+            self.state_store.close()
+        if self.archive is not None:
+            self.archive.close()
+        if self.session is not None:
+            self.session.close()
+        if self._driver is not None:
+            self._driver.quit()
+            logger.info("Đã đóng WebDriver.")
+
+    def extract_jobs(self, output_dir, execution_date=None, use_session=True, incremental=True, write_csv=False,
+                     archive=True, replay=False):
+        """Hàm chính để extract job (tất cả keyword trong một process).
+
+        use_session=True: lấy cookie từ trình duyệt một lần rồi gọi API cho tất cả keyword qua một session.
+        use_session=False: tìm kiếm trên trình duyệt cho từng keyword như trước.
+        incremental=True: chỉ tải payload đầy đủ cho job mới/thay đổi so với state store trong output_dir/state.
+        write_csv=True: ghi thêm bản CSV bên cạnh file Parquet.
+        archive=True: lưu response thô vào output_dir/raw/<execution_date>/.
+        replay=True: dựng lại output từ archive, không mở trình duyệt và không gọi mạng.
+        """
         if execution_date is None:
             execution_date = datetime.now().strftime("%Y-%m-%d")
 
@@ -159,33 +664,40 @@ class WebScraper:
         os.makedirs(output_path, exist_ok=True)
         logger.info("Bắt đầu extract dữ liệu, output: %s", output_path)
 
-        try:
-            for keyword in self.keywords:
-                if self.search_jobs(keyword):
-                    job_data = self.fetch_jobs_api(keyword)
-                    self.all_jobs.extend(job_data)
-                else:
-                    logger.warning("⚠ Không thể tìm kiếm với từ khóa '%s'", keyword)
-
-            if self.all_jobs:
-                json_path = f"{output_path}/vietnamworks_jobs.json"
-                csv_path = f"{output_path}/vietnamworks_jobs.csv"
+        with metrics.stage("extract", output_path, execution_date):
+            try:
+                self._prepare(output_dir, execution_date, incremental, archive, replay)
+                self._collect(self.keywords, use_session)
+                metrics.count("jobs_fetched", self.index.raw_count)
+                write_partition(output_dir, execution_date, self.index, write_csv, self.state_store)
+            finally:
+                self.close()
 
-                with open(json_path, "w", encoding="utf-8") as f:
-                    json.dump(self.all_jobs, f, ensure_ascii=False, indent=4)
-                pd.DataFrame(self.all_jobs).to_csv(csv_path, index=False, encoding="utf-8-sig")
+    def extract_keyword(self, keyword, output_dir, execution_date=None, use_session=True, incremental=True,
+                        archive=True, replay=False):
+        """Extract một keyword và ghi shard riêng; merge_shards gộp các shard thành partition."""
+        if execution_date is None:
+            execution_date = datetime.now().strftime("%Y-%m-%d")
 
-                logger.info("🎉 Hoàn tất! Đã lưu %d job vào:", len(self.all_jobs))
-                logger.info("   - JSON: %s", json_path)
-                logger.info("   - CSV : %s", csv_path)
-            else:
-                logger.error("❌ Không thu được dữ liệu job nào.")
-                raise ValueError("No jobs extracted")
+        output_path = os.path.join(output_dir, execution_date)
+        path = shard_path(output_path, keyword)
+        logger.info("Bắt đầu extract keyword '%s', shard: %s", keyword, path)
 
-        finally:
-            self.driver.quit()
-            logger.info("Đã đóng WebDriver.")
+        with metrics.stage(f"extract-{slugify(keyword)}", output_path, execution_date):
+            try:
+                self._prepare(output_dir, execution_date, incremental, archive, replay)
+                self._collect([keyword], use_session)
+                metrics.count("jobs_fetched", self.index.raw_count)
+                if not self.index.jobs:
+                    logger.error("❌ Không thu được job nào cho keyword '%s'.", keyword)
+                    raise ValueError(f"No jobs extracted for keyword '{keyword}'")
+                write_shard(path, self.index.jobs)
+                logger.info("✅ Đã ghi %d job vào shard %s", len(self.index.jobs), path)
+            finally:
+                self.close()
+        return path
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
     scraper = WebScraper(headless=True)
-    scraper.extract_jobs(output_dir="/opt/airflow/data/vietnamwork")
+    scraper.extract_jobs(output_dir=DATA_DIR)
@@ -0,0 +1,216 @@
+import os
+import json
+import time
+import socket
+import logging
+import resource
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+METRICS_DIR = "metrics"
+# Bật profiler cho các stage: VIETNAMWORKS_PROFILE="transform,visualize_skills" (hoặc "all")
+PROFILE_ENV = "VIETNAMWORKS_PROFILE"
+# "cprofile" (mặc định) hoặc "pyinstrument" nếu đã cài
+PROFILER_ENV = "VIETNAMWORKS_PROFILER"
+# Gửi metrics qua UDP: VIETNAMWORKS_STATSD="host:port"
+STATSD_ENV = "VIETNAMWORKS_STATSD"
+# Ghi file .prom cho textfile collector của node_exporter
+PROM_DIR_ENV = "VIETNAMWORKS_PROM_TEXTFILE_DIR"
+
+
+def peak_rss_mb():
+    """Peak RSS của process hiện tại (MB)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class StageMetrics:
+    """Thu thập span thời gian, bộ đếm và peak RSS của một stage (an toàn khi dùng từ nhiều thread).
+
+    Các span cùng tên được gộp: số lần, tổng và lớn nhất thời gian, peak RSS khi kết thúc span.
+    """
+
+    def __init__(self, stage, execution_date=None):
+        self.stage = stage
+        self.execution_date = execution_date
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self.spans = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self.duration_s = None
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            rss = peak_rss_mb()
+            with self._lock:
+                entry = self.spans.setdefault(name, {"count": 0, "total_s": 0.0, "max_s": 0.0, "peak_rss_mb": 0.0})
+                entry["count"] += 1
+                entry["total_s"] += elapsed
+                entry["max_s"] = max(entry["max_s"], elapsed)
+                entry["peak_rss_mb"] = max(entry["peak_rss_mb"], rss)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def finish(self):
+        self.duration_s = time.perf_counter() - self._start
+
+    def to_dict(self):
+        return {
+            "stage": self.stage,
+            "execution_date": self.execution_date,
+            "started_at": self.started_at,
+            "duration_s": self.duration_s,
+            "peak_rss_mb": peak_rss_mb(),
+            "spans": self.spans,
+            "counters": self.counters,
+        }
+
+    def _samples(self):
+        """(tên metric, nhãn span, giá trị) cho các định dạng xuất."""
+        yield "stage_duration_seconds", None, self.duration_s or 0.0
+        yield "stage_peak_rss_megabytes", None, peak_rss_mb()
+        for name, entry in sorted(self.spans.items()):
+            yield "span_seconds_total", name, entry["total_s"]
+            yield "span_count", name, entry["count"]
+        for name, value in sorted(self.counters.items()):
+            yield f"counter_{name.replace('.', '_')}", None, value
+
+    def to_prometheus(self, prefix="vietnamworks"):
+        """Metrics dạng Prometheus text exposition format."""
+        lines = []
+        for metric, span, value in self._samples():
+            labels = f'stage="{self.stage}"' + (f',span="{span}"' if span else "")
+            lines.append(f"{prefix}_{metric}{{{labels}}} {value}")
+        return "\n".join(lines) + "\n"
+
+    def send_statsd(self, address, prefix="vietnamworks"):
+        """Gửi metrics dạng gauge qua UDP tới StatsD (address="host:port"), lỗi chỉ được ghi log."""
+        host, port = address.rsplit(":", 1)
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                for metric, span, value in self._samples():
+                    name = ".".join(part for part in (prefix, self.stage, span, metric) if part)
+                    sock.sendto(f"{name}:{value}|g".encode("utf-8"), (host, int(port)))
+        except OSError as e:
+            logger.warning("⚠ Không gửi được metrics tới StatsD %s: %s", address, str(e))
+
+    def write(self, output_dir):
+        """Ghi <output_dir>/metrics/<stage>.json và xuất StatsD/Prometheus nếu được bật qua biến môi trường."""
+        metrics_dir = os.path.join(output_dir, METRICS_DIR)
+        os.makedirs(metrics_dir, exist_ok=True)
+        path = os.path.join(metrics_dir, f"{self.stage}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=4)
+        logger.info("📊 Stage '%s' mất %.2fs, peak RSS %.1fMB, metrics: %s",
+                    self.stage, self.duration_s or 0.0, peak_rss_mb(), path)
+
+        prom_dir = os.environ.get(PROM_DIR_ENV)
+        if prom_dir:
+            os.makedirs(prom_dir, exist_ok=True)
+            with open(os.path.join(prom_dir, f"vietnamworks_{self.stage}.prom"), "w", encoding="utf-8") as f:
+                f.write(self.to_prometheus())
+        statsd = os.environ.get(STATSD_ENV)
+        if statsd:
+            self.send_statsd(statsd)
+        return path
+
+
+class _NullMetrics:
+    """Dùng khi không có stage nào đang chạy: span/count không làm gì."""
+
+    @contextmanager
+    def span(self, name):
+        yield
+
+    def count(self, name, value=1):
+        pass
+
+
+_NULL = _NullMetrics()
+_active = None
+
+
+def current():
+    """Stage đang chạy trong process (hoặc đối tượng rỗng)."""
+    return _active or _NULL
+
+
+def span(name):
+    """Đo thời gian một đoạn code trong stage đang chạy."""
+    return current().span(name)
+
+
+def count(name, value=1):
+    """Cộng bộ đếm (số dòng, số byte...) trong stage đang chạy."""
+    current().count(name, value)
+
+
+def _profiling_enabled(stage):
+    wanted = {s.strip() for s in os.environ.get(PROFILE_ENV, "").split(",") if s.strip()}
+    return "all" in wanted or stage in wanted
+
+
+@contextmanager
+def _profile(stage, output_dir):
+    """Chạy stage dưới cProfile (hoặc pyinstrument), lưu kết quả vào thư mục metrics."""
+    metrics_dir = os.path.join(output_dir, METRICS_DIR)
+    os.makedirs(metrics_dir, exist_ok=True)
+    if os.environ.get(PROFILER_ENV, "cprofile") == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logger.warning("⚠ Chưa cài pyinstrument, dùng cProfile.")
+        else:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                path = os.path.join(metrics_dir, f"{stage}.profile.html")
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(profiler.output_html())
+                logger.info("🔬 Đã lưu profile của stage '%s' vào %s", stage, path)
+            return
+
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        path = os.path.join(metrics_dir, f"{stage}.prof")
+        profiler.dump_stats(path)
+        logger.info("🔬 Đã lưu profile của stage '%s' vào %s (xem bằng snakeviz/pstats)", stage, path)
+
+
+@contextmanager
+def stage(name, output_dir, execution_date=None):
+    """Đo một stage của pipeline; metrics được ghi vào output_dir/metrics/<name>.json kể cả khi stage lỗi."""
+    global _active
+    metrics = StageMetrics(name, execution_date)
+    previous, _active = _active, metrics
+    try:
+        if _profiling_enabled(name):
+            with _profile(name, output_dir):
+                yield metrics
+        else:
+            yield metrics
+    finally:
+        _active = previous
+        metrics.finish()
+        try:
+            metrics.write(output_dir)
+        except OSError as e:
+            logger.warning("⚠ Không ghi được metrics của stage '%s': %s", name, str(e))
@@ -0,0 +1,14 @@
+import os
+
+# Cấu hình dùng chung cho DAG và các stage. Chỉ dùng thư viện chuẩn để scheduler
+# parse etl_dag.py nhanh, không kéo theo selenium/pandas/matplotlib.
+
+DATA_DIR = '/opt/airflow/data/vietnamwork'
+
+KEYWORDS = ["Data Engineer", "Data Engineer Intern", "Data Engineer Fresher", "Data Analyst", "Data Analyst Intern", "Data Analyst Fresher",
+            "Data Scientist", "Data Scientist Intern", "Data Scientist Fresher", "Machine Learning Engineer", "Machine Learning Intern", "Machine Learning Fresher", "AI Engineer", "AI Intern", "AI Fresher"]
+
+# Số keyword được extract đồng thời (mỗi task giữ một trình duyệt/session)
+EXTRACT_PARALLELISM = int(os.environ.get('VIETNAMWORKS_EXTRACT_PARALLELISM', 4))
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
@@ -0,0 +1,118 @@
+import os
+import re
+import gzip
+import json
+import hashlib
+import logging
+import threading
+from storage import atomic_path
+
+logger = logging.getLogger(__name__)
+
+
+def slugify(keyword):
+    """Tên file an toàn cho một keyword: "Data Engineer" -> "data-engineer"."""
+    return re.sub(r'[^a-z0-9]+', '-', keyword.lower()).strip('-')
+
+
+class RawArchive:
+    """Lưu response thô của API tìm kiếm dạng JSON lines nén gzip.
+
+    Mỗi ngày/keyword một file base_dir/<date>/<keyword>.jsonl.gz, mỗi dòng là một trang
+    response kèm request_key (hash của ngày, keyword, trang và danh sách trường). Chạy lại
+    cùng ngày không làm file lớn dần: mỗi request_key chỉ giữ một bản sau close().
+    """
+
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._stale = set()
+
+    @staticmethod
+    def request_key(execution_date, keyword, page, fields):
+        raw = json.dumps([execution_date, keyword, page, sorted(fields)], ensure_ascii=False)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, execution_date, keyword):
+        return os.path.join(self.base_dir, execution_date, f"{slugify(keyword)}.jsonl.gz")
+
+    def save(self, execution_date, keyword, page, fields, body):
+        """Ghi một trang response (an toàn khi gọi từ nhiều thread).
+
+        Trang đã có trong file với đúng response không được ghi lại; response mới của một trang
+        đã có được ghi thêm và file được viết lại (chỉ giữ bản mới nhất) khi gọi close().
+        """
+        record = {
+            "key": self.request_key(execution_date, keyword, page, fields),
+            "keyword": keyword,
+            "page": page,
+            "fields": fields,
+            "response": body,
+        }
+        path = self._path(execution_date, keyword)
+        with self._lock:
+            records = self._read(path)
+            previous = records.get(record["key"])
+            if previous is not None and previous["response"] == body:
+                return
+            if previous is not None:
+                self._stale.add(path)
+            records[record["key"]] = record
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with gzip.open(path, "at", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _read(self, path):
+        """{request_key: record} của một file (bản ghi sau cùng thắng), đọc một lần rồi cache."""
+        if path not in self._cache:
+            records = {}
+            if os.path.exists(path):
+                with gzip.open(path, "rt", encoding="utf-8") as f:
+                    for line in f:
+                        record = json.loads(line)
+                        records[record["key"]] = record
+            self._cache[path] = records
+        return self._cache[path]
+
+    def records(self, execution_date, keyword):
+        """Đọc các trang đã lưu của một ngày/keyword: {request_key: record}, bản ghi sau cùng thắng."""
+        with self._lock:
+            return self._read(self._path(execution_date, keyword))
+
+    def close(self):
+        """Viết lại (nguyên tử) các file có trang bị ghi đè, chỉ giữ bản mới nhất của mỗi request_key."""
+        with self._lock:
+            for path in sorted(self._stale):
+                with atomic_path(path) as tmp_path, gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                    for record in self._cache[path].values():
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                logger.info("🗜 Đã viết lại archive %s (%d trang)", path, len(self._cache[path]))
+            self._stale.clear()
+
+    def load(self, execution_date, keyword, page, fields):
+        """Lấy response đã lưu cho đúng request, None nếu không có."""
+        record = self.records(execution_date, keyword).get(self.request_key(execution_date, keyword, page, fields))
+        return record["response"] if record else None
+
+    def pages(self, execution_date, keyword, fields):
+        """{page: response} của mọi trang đã lưu cho keyword với đúng danh sách trường."""
+        wanted = sorted(fields)
+        return {
+            record["page"]: record["response"]
+            for record in self.records(execution_date, keyword).values()
+            if sorted(record["fields"]) == wanted
+        }
+
+    def keywords(self, execution_date):
+        """Slug các keyword có dữ liệu trong ngày."""
+        day_dir = os.path.join(self.base_dir, execution_date)
+        if not os.path.isdir(day_dir):
+            return []
+        return sorted(name[:-len(".jsonl.gz")] for name in os.listdir(day_dir) if name.endswith(".jsonl.gz"))
+
+    def dates(self, until=None):
+        """Các ngày có trong archive (tăng dần), tùy chọn chỉ lấy ngày <= until."""
+        if not os.path.isdir(self.base_dir):
+            return []
+        return sorted(d for d in os.listdir(self.base_dir) if until is None or d <= until)
@@ -0,0 +1,66 @@
+import os
+import json
+import time
+import logging
+from storage import atomic_path
+
+logger = logging.getLogger(__name__)
+
+SESSION_CACHE_FILE = "session_cache.json"
+
+
+class SessionCache:
+    """Lưu cookie của VietnamWorks và đường dẫn chromedriver ra file JSON, kèm thời điểm lưu.
+
+    Cookie còn hạn (cookie_ttl giây) cho phép gọi API mà không mở trình duyệt; đường dẫn
+    driver còn hạn (driver_ttl giây) giúp bỏ qua ChromeDriverManager().install().
+    File được ghi nguyên tử (ghi file tạm rồi os.replace) vì nhiều task extract dùng chung.
+    """
+
+    def __init__(self, path, cookie_ttl=6 * 3600, driver_ttl=7 * 24 * 3600):
+        self.path = path
+        self.cookie_ttl = cookie_ttl
+        self.driver_ttl = driver_ttl
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _update(self, **values):
+        data = self._load()
+        data.update(values)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with atomic_path(self.path) as tmp_path, open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+
+    @staticmethod
+    def _fresh(entry, ttl):
+        return bool(entry) and time.time() - entry.get("saved_at", 0) < ttl
+
+    def load_cookies(self):
+        """dict cookie còn hạn, None nếu chưa có hoặc đã hết hạn."""
+        entry = self._load().get("cookies")
+        if not self._fresh(entry, self.cookie_ttl):
+            return None
+        return entry["values"]
+
+    def save_cookies(self, cookies):
+        self._update(cookies={"values": cookies, "saved_at": time.time()})
+        logger.info("💾 Đã lưu %d cookie vào %s", len(cookies), self.path)
+
+    def invalidate_cookies(self):
+        """Xóa cookie đã lưu (ví dụ khi API từ chối)."""
+        self._update(cookies=None)
+
+    def load_driver_path(self):
+        """Đường dẫn chromedriver còn hạn và vẫn tồn tại trên đĩa, None nếu không có."""
+        entry = self._load().get("driver")
+        if not self._fresh(entry, self.driver_ttl) or not os.path.exists(entry["path"]):
+            return None
+        return entry["path"]
+
+    def save_driver_path(self, path):
+        self._update(driver={"path": path, "saved_at": time.time()})
@@ -0,0 +1,177 @@
+import os
+import re
+import json
+import logging
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from text_match import compile_terms
+
+logger = logging.getLogger(__name__)
+
+# Tên chuẩn -> các cách viết khác (so khớp không phân biệt hoa thường, bỏ phần trong ngoặc)
+SKILL_ALIASES = {
+    'Python': ['python', 'python3', 'python 3', 'python programming', 'python developer'],
+    'SQL': ['sql', 'ansi sql', 'sql query', 'sql queries', 't-sql', 'tsql', 'transact-sql'],
+    'PL/SQL': ['pl/sql', 'plsql'],
+    'MySQL': ['mysql'],
+    'PostgreSQL': ['postgresql', 'postgres', 'postgre sql', 'postgre'],
+    'SQL Server': ['sql server', 'mssql', 'ms sql', 'microsoft sql server'],
+    'Oracle': ['oracle', 'oracle database', 'oracle db'],
+    'MongoDB': ['mongodb', 'mongo db', 'mongo'],
+    'Redis': ['redis'],
+    'Spark': ['spark', 'apache spark', 'pyspark', 'spark sql'],
+    'Hadoop': ['hadoop', 'apache hadoop', 'hdfs', 'mapreduce'],
+    'Hive': ['hive', 'apache hive'],
+    'Kafka': ['kafka', 'apache kafka'],
+    'Airflow': ['airflow', 'apache airflow'],
+    'Flink': ['flink', 'apache flink'],
+    'dbt': ['dbt', 'data build tool'],
+    'Databricks': ['databricks'],
+    'Snowflake': ['snowflake'],
+    'BigQuery': ['bigquery', 'google bigquery', 'big query'],
+    'Redshift': ['redshift', 'amazon redshift', 'aws redshift'],
+    'ETL': ['etl', 'elt', 'etl/elt', 'etl pipeline', 'etl pipelines'],
+    'Data Warehouse': ['data warehouse', 'data warehousing', 'dwh'],
+    'AWS': ['aws', 'amazon web services'],
+    'Azure': ['azure', 'microsoft azure'],
+    'GCP': ['gcp', 'google cloud', 'google cloud platform'],
+    'Docker': ['docker'],
+    'Kubernetes': ['kubernetes', 'k8s'],
+    'Git': ['git', 'github', 'gitlab'],
+    'Linux': ['linux', 'unix'],
+    'CI/CD': ['ci/cd', 'cicd'],
+    'Java': ['java'],
+    'Scala': ['scala'],
+    'R': ['r', 'r programming', 'r language'],
+    'Go': ['go', 'golang'],
+    'C++': ['c++', 'cpp'],
+    'C#': ['c#', 'csharp'],
+    'JavaScript': ['javascript', 'js'],
+    'Excel': ['excel', 'ms excel', 'microsoft excel', 'advanced excel'],
+    'Power BI': ['power bi', 'powerbi', 'microsoft power bi'],
+    'Tableau': ['tableau'],
+    'Looker': ['looker', 'looker studio', 'google data studio'],
+    'Pandas': ['pandas'],
+    'NumPy': ['numpy'],
+    'Scikit-learn': ['scikit-learn', 'scikit learn', 'sklearn'],
+    'TensorFlow': ['tensorflow', 'tensor flow'],
+    'PyTorch': ['pytorch', 'torch'],
+    'Keras': ['keras'],
+    'Machine Learning': ['machine learning', 'ml'],
+    'Deep Learning': ['deep learning', 'dl'],
+    'NLP': ['nlp', 'natural language processing'],
+    'Computer Vision': ['computer vision', 'cv'],
+    'LLM': ['llm', 'llms', 'large language model', 'large language models'],
+    'Statistics': ['statistics', 'statistical analysis'],
+    'Data Analysis': ['data analysis', 'data analytics'],
+    'Data Visualization': ['data visualization', 'data visualisation'],
+}
+
+# Cách viết quá ngắn/dễ trùng từ thông thường: chỉ dùng khi chuẩn hóa danh sách skill từ API,
+# không dùng để tìm trong mô tả ("r", "go", "cv" xuất hiện trong văn bản với nghĩa khác)
+TEXT_EXCLUDED_ALIASES = {'r', 'go', 'c', 'js', 'ml', 'dl', 'cv', 'torch', 'git', 'unix', 'mongo', 'oracle', 'elt'}
+
+PARENTHESES_PATTERN = r'\([^)]*\)'
+
+# Dưới ngưỡng này quét văn bản ngay trong process hiện tại (chi phí tạo process lớn hơn lợi ích)
+PARALLEL_MIN_TEXTS = 50_000
+
+
+def skill_key(name):
+    """Khóa so khớp của một tên skill: "Python (Programming) " -> "python"."""
+    return ' '.join(re.sub(PARENTHESES_PATTERN, ' ', name).lower().split())
+
+
+def _find_terms(pattern, texts):
+    """findall của pattern trên danh sách văn bản (chạy được trong process con)."""
+    compiled = re.compile(pattern)
+    return [compiled.findall(text) for text in texts]
+
+
+class SkillNormalizer:
+    """Chuẩn hóa danh sách skill về tên chuẩn và tìm thêm skill trong mô tả công việc.
+
+    Bảng alias được biên dịch một lần thành một regex dạng trie, chạy trên cả cột văn bản;
+    mỗi văn bản khác nhau chỉ được quét một lần. Skill không có trong bảng được giữ nguyên
+    tên (bỏ khoảng trắng thừa).
+    """
+
+    def __init__(self, aliases=SKILL_ALIASES, text_excluded=TEXT_EXCLUDED_ALIASES, max_workers=None):
+        self.lookup = {}
+        for canonical, names in aliases.items():
+            for name in [canonical, *names]:
+                self.lookup.setdefault(skill_key(name), canonical)
+        text_terms = [term for term in self.lookup if term not in text_excluded]
+        self.text_pattern = compile_terms(text_terms)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        logger.info("Đã biên dịch từ điển skill: %d alias cho %d skill (%d dùng cho văn bản)",
+                    len(self.lookup), len(aliases), len(text_terms))
+
+    @classmethod
+    def from_json(cls, path, max_workers=None):
+        """Tạo normalizer từ file JSON {"aliases": {tên chuẩn: [alias...]}, "text_excluded": [...]}."""
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+        return cls(config["aliases"], set(config.get("text_excluded", TEXT_EXCLUDED_ALIASES)), max_workers)
+
+    def canonical(self, skills):
+        """Series tên skill -> Series tên chuẩn (chỉ tính trên các giá trị khác nhau)."""
+        mapping = {}
+        for name in pd.unique(skills):
+            mapping[name] = self.lookup.get(skill_key(name), ' '.join(name.split()))
+        return skills.map(mapping)
+
+    def _scan(self, texts):
+        """findall trên danh sách văn bản, chia cho nhiều process khi đủ lớn."""
+        if self.max_workers <= 1 or len(texts) < PARALLEL_MIN_TEXTS:
+            return _find_terms(self.text_pattern.pattern, texts)
+        size = -(-len(texts) // (self.max_workers * 4))
+        chunks = [texts[i:i + size] for i in range(0, len(texts), size)]
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            results = executor.map(_find_terms, [self.text_pattern.pattern] * len(chunks), chunks)
+            return [found for chunk in results for found in chunk]
+
+    def extract_from_text(self, texts):
+        """Series văn bản (đã chữ thường) -> Series tên chuẩn, index lặp lại theo từng skill tìm thấy.
+
+        Văn bản trùng nhau (mô tả dùng lại giữa các tin) chỉ được quét một lần.
+        """
+        texts = texts.dropna()
+        codes, uniques = pd.factorize(texts)
+        found = pd.Series(self._scan(uniques.tolist()), dtype=object).explode().dropna()
+        found_codes = found.index.to_numpy(dtype=np.int64)
+        found_skills = found.map(self.lookup).to_numpy()
+
+        # Mở rộng kết quả của từng văn bản khác nhau về mọi dòng dùng văn bản đó
+        starts = np.searchsorted(found_codes, np.arange(len(uniques)))
+        per_row = np.bincount(found_codes, minlength=len(uniques))[codes]
+        offsets = np.arange(per_row.sum()) - np.repeat(np.cumsum(per_row) - per_row, per_row)
+        take = np.repeat(starts[codes], per_row) + offsets
+        rows = np.repeat(texts.index.to_numpy(), per_row)
+        return pd.Series(found_skills[take], index=rows, dtype=object)
+
+    def normalize(self, skill_lists, texts=()):
+        """Trả về list skill chuẩn cho từng dòng: skill từ API trước, sau đó skill tìm thấy trong các cột văn bản."""
+        # Làm việc theo vị trí dòng để index trùng không ảnh hưởng việc gộp lại
+        index = skill_lists.index
+        skill_lists = skill_lists.reset_index(drop=True)
+        api_skills = skill_lists.explode().dropna().astype(str)
+        api_skills = api_skills[api_skills.str.strip() != '']
+        parts = [self.canonical(api_skills)]
+        for text in texts:
+            parts.append(self.extract_from_text(text.reset_index(drop=True)))
+
+        # Sắp xếp ổn định theo dòng: skill từ API đứng trước, skill trong văn bản theo thứ tự xuất hiện
+        skills = pd.concat(parts)
+        rows = skills.index.to_numpy(dtype=np.int64)
+        codes, names = pd.factorize(skills)
+        order = np.argsort(rows, kind='stable')
+        rows, codes = rows[order], codes[order]
+        keep = ~pd.Series(rows * len(names) + codes).duplicated().to_numpy()
+        rows, codes = rows[keep], codes[keep]
+
+        values = np.asarray(names, dtype=object)[codes].tolist()
+        ends = np.cumsum(np.bincount(rows, minlength=len(skill_lists))).tolist()
+        lists = [values[start:end] for start, end in zip([0] + ends[:-1], ends)]
+        return pd.Series(lists, index=index, dtype=object)
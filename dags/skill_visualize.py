@@ -1,47 +1,45 @@
+import os
+import logging
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
+import matplotlib
+matplotlib.use("Agg")  # Vẽ không cần màn hình, an toàn trong process con
 import seaborn as sns
 import matplotlib.pyplot as plt
-import ast
-import os
-import logging
+import metrics
+from analytics_store import AnalyticsStore, analytics_db_path
+from pipeline_config import DATA_DIR
+from storage import TRANSFORMED_FILE, list_codes, memory_report, read_unique_jobs
 
-# Thiết lập logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def get_top_skills(execution_date):
-    """Tạo biểu đồ top 10 kỹ năng phổ biến cho ngành Data Engineer."""
-    keyword = "Data Engineer"  # Chỉ sử dụng từ khóa thử nghiệm
-    input_file = f"/opt/airflow/data/vietnamwork/{execution_date}/vietnamworks_jobs_transformed.csv"
-    output_dir = f"/opt/airflow/data/vietnamwork/{execution_date}"
-
-    # Kiểm tra file đầu vào
-    if not os.path.exists(input_file):
-        logger.error("File đầu vào %s không tồn tại.", input_file)
-        raise FileNotFoundError(f"Input file {input_file} does not exist")
-
-    # Tạo thư mục đầu ra
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Đọc dữ liệu
-    df = pd.read_csv(input_file, encoding="utf-8-sig")
-    logger.info("Đã đọc %d bản ghi từ %s", len(df), input_file)
+SKILL_COUNTS_FILE = "skill_counts.csv"
 
-    # Lọc dữ liệu theo từ khóa
-    df_keyword = df[df['keywords'] == keyword]
 
-    # Chuyển skill_name từ chuỗi JSON thành danh sách
-    df_keyword['skill_name'] = df_keyword['skill_name'].apply(
-        lambda x: ast.literal_eval(x) if pd.notna(x) else []
-    )
+def count_skills(df):
+    """Đếm số lần xuất hiện của từng kỹ năng theo từng keyword.
 
-    # Tạo dictionary tần suất kỹ năng
-    skills = df_keyword['skill_name'].explode().value_counts().head(10).to_dict()
+    Làm việc trên mã số nguyên của keyword/kỹ năng (list_codes): ghép cặp theo dòng rồi
+    bincount, chỉ đổi mã ra tên ở bảng kết quả.
+    """
+    keyword_rows, keyword_codes, keyword_names = list_codes(df['keywords'])
+    skill_rows, skill_codes, skill_names = list_codes(df['skill_name'])
+    pairs = pd.DataFrame({'row': keyword_rows, 'keyword': keyword_codes}).merge(
+        pd.DataFrame({'row': skill_rows, 'skill': skill_codes}), on='row')
+    pair_codes = pairs['keyword'].to_numpy() * len(skill_names) + pairs['skill'].to_numpy()
+    totals = np.bincount(pair_codes, minlength=len(keyword_names) * len(skill_names))
+    present = np.flatnonzero(totals)
+    counts = pd.DataFrame({
+        'keyword': keyword_names[present // max(len(skill_names), 1)].astype(object),
+        'skill': skill_names[present % max(len(skill_names), 1)].astype(object),
+        'count': totals[present],
+    })
+    return counts.sort_values(['keyword', 'count', 'skill'], ascending=[True, False, True], ignore_index=True)
 
-    # Chuyển dictionary thành DataFrame để vẽ biểu đồ
-    skills_df = pd.DataFrame(list(skills.items()), columns=['Skill', 'Count'])
-    logger.info("Top 10 kỹ năng: %s", skills_df.to_dict())
 
+def render_skill_chart(keyword, skills_df, output_path):
+    """Vẽ biểu đồ cột top kỹ năng của một keyword (chạy trong process con)."""
     # Thiết lập style cho Seaborn
     sns.set_style("dark")
 
@@ -50,13 +48,97 @@ def get_top_skills(execution_date):
     sns.barplot(data=skills_df, x='Count', y='Skill', palette='viridis')
 
     # Tùy chỉnh biểu đồ
-    plt.title(f"Top 10 Kỹ năng phổ biến ngành {keyword}", fontsize=14, pad=20)
+    plt.title(f"Top {len(skills_df)} Kỹ năng phổ biến ngành {keyword}", fontsize=14, pad=20)
     plt.xlabel('Số lần xuất hiện', fontsize=12)
     plt.ylabel('Kỹ năng', fontsize=12)
     plt.tight_layout()
 
     # Lưu biểu đồ
-    output_path = f"{output_dir}/{keyword}_skills_barplot.png"
     plt.savefig(output_path, dpi=300, bbox_inches='tight')
     plt.close()
-    logger.info("Đã lưu biểu đồ vào %s", output_path)
\ No newline at end of file
+    return output_path
+
+
+def get_top_skills(execution_date, keywords=None, top_n=10, max_workers=None,
+                   from_store=False, start=None, end=None, data_dir=DATA_DIR):
+    """Tạo biểu đồ top kỹ năng phổ biến cho từng keyword và file đếm kỹ năng.
+
+    keywords=None: vẽ cho mọi keyword có trong dữ liệu. Các biểu đồ được vẽ song song
+    trong max_workers process (mặc định bằng số CPU).
+    from_store=True: đếm trên kho phân tích (toàn bộ lịch sử, lọc theo khoảng ngày start/end)
+    thay vì file transform của execution_date.
+    """
+    input_file = f"{data_dir}/{execution_date}/{TRANSFORMED_FILE}"
+    output_dir = f"{data_dir}/{execution_date}"
+
+    # Kiểm tra file đầu vào
+    if not from_store and not os.path.exists(input_file):
+        logger.error("File đầu vào %s không tồn tại.", input_file)
+        raise FileNotFoundError(f"Input file {input_file} does not exist")
+
+    # Tạo thư mục đầu ra
+    os.makedirs(output_dir, exist_ok=True)
+
+    with metrics.stage("visualize_skills", output_dir, execution_date):
+        if from_store:
+            counts = _store_skill_counts(data_dir, start, end)
+        else:
+            counts = _file_skill_counts(input_file)
+        _render_top_skills(counts, output_dir, keywords, top_n, max_workers)
+
+
+def _file_skill_counts(input_file):
+    """Bảng đếm keyword × kỹ năng từ file transform của một ngày."""
+    # Đọc dữ liệu
+    with metrics.span("visualize.read"):
+        # Tin đăng lại của tin gốc ở ngày trước vẫn là tin đang tuyển trong ngày này
+        df = read_unique_jobs(input_file, columns=['keywords', 'skill_name'], compact=True, within_file=True)
+    logger.info("Đã đọc %d bản ghi từ %s", len(df), input_file)
+    memory_report(df, "visualize.skills")
+    metrics.count("rows_read", len(df))
+
+    # Bảng đếm keyword × kỹ năng cho toàn bộ keyword
+    with metrics.span("visualize.count_skills"):
+        return count_skills(df)
+
+
+def _store_skill_counts(data_dir, start, end):
+    """Bảng đếm keyword × kỹ năng từ kho phân tích (không đọc lại file của từng ngày)."""
+    store = AnalyticsStore(analytics_db_path(data_dir))
+    try:
+        with metrics.span("visualize.query_store"):
+            counts = store.skill_counts(start=start, end=end)
+    finally:
+        store.close()
+    logger.info("Đã truy vấn %d dòng đếm kỹ năng từ kho phân tích (%s → %s)", len(counts), start, end)
+    return counts
+
+
+def _render_top_skills(counts, output_dir, keywords, top_n, max_workers):
+    """Lưu bảng đếm và vẽ biểu đồ (thân của get_top_skills, chạy trong stage metrics)."""
+    counts_path = f"{output_dir}/{SKILL_COUNTS_FILE}"
+    with metrics.span("visualize.write_counts"):
+        counts.to_csv(counts_path, index=False, encoding="utf-8-sig")
+    logger.info("Đã lưu bảng đếm kỹ năng (%d dòng) vào %s", len(counts), counts_path)
+
+    if keywords is None:
+        keywords = counts['keyword'].unique().tolist()
+
+    jobs = []
+    for keyword in keywords:
+        top = counts[counts['keyword'] == keyword].head(top_n)
+        if top.empty:
+            logger.warning("⚠ Không có kỹ năng nào cho keyword '%s', bỏ qua biểu đồ.", keyword)
+            continue
+        skills_df = top.rename(columns={'skill': 'Skill', 'count': 'Count'})[['Skill', 'Count']]
+        logger.info("Top %d kỹ năng cho '%s': %s", top_n, keyword, skills_df.to_dict())
+        jobs.append((keyword, skills_df.reset_index(drop=True), f"{output_dir}/{keyword}_skills_barplot.png"))
+
+    # Vẽ song song các biểu đồ
+    with metrics.span("visualize.render_charts"), ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(render_skill_chart, *job) for job in jobs]
+        for future in futures:
+            path = future.result()
+            metrics.count("charts_rendered")
+            metrics.count("bytes_written", os.path.getsize(path))
+            logger.info("Đã lưu biểu đồ vào %s", path)
@@ -0,0 +1,111 @@
+import os
+import json
+import sqlite3
+import logging
+from storage import select_in
+
+logger = logging.getLogger(__name__)
+
+
+class JobStateStore:
+    """Lưu trạng thái các job đã thấy (SQLite) để extract chỉ tải lại job mới hoặc thay đổi."""
+
+    def __init__(self, db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, timeout=60)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_key TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'active',
+                first_seen TEXT NOT NULL,
+                last_changed TEXT NOT NULL,
+                last_seen TEXT NOT NULL,
+                expired_at TEXT
+            );
+            CREATE TABLE IF NOT EXISTS changes (
+                execution_date TEXT NOT NULL,
+                job_key TEXT NOT NULL,
+                change TEXT NOT NULL,
+                PRIMARY KEY (execution_date, job_key)
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status);
+        """)
+        self.conn.commit()
+
+    @staticmethod
+    def fingerprint(approved_on, expired_on):
+        """Dấu vân tay của job: đổi khi job được duyệt lại hoặc gia hạn"""
+        return f"{approved_on}|{expired_on}"
+
+    def get_fingerprints(self):
+        """Trả về {job_key: fingerprint} của các job còn hoạt động"""
+        rows = self.conn.execute("SELECT job_key, fingerprint FROM jobs WHERE status = 'active'")
+        return dict(rows.fetchall())
+
+    def get_payloads(self, job_keys):
+        """Trả về {job_key: job_entry} đã lưu cho các job_key cho trước"""
+        rows = select_in(self.conn, "SELECT job_key, payload FROM jobs", "job_key", job_keys)
+        return {job_key: json.loads(payload) for job_key, payload in rows}
+
+    def commit_partition(self, execution_date, jobs):
+        """Ghi snapshot của ngày execution_date và trả về danh sách job added/changed/expired.
+
+        jobs là {job_key: job_entry} của toàn bộ job thấy trong ngày. Job đang hoạt động
+        trong store mà không còn xuất hiện được coi là hết hạn. Chạy lại cùng một ngày
+        cho cùng kết quả.
+        """
+        existing = {
+            row[0]: row[1:]
+            for row in self.conn.execute(
+                "SELECT job_key, fingerprint, status, first_seen, last_changed, expired_at FROM jobs"
+            )
+        }
+        changes = {"added": [], "changed": [], "expired": []}
+
+        with self.conn:
+            self.conn.execute("DELETE FROM changes WHERE execution_date = ?", (execution_date,))
+            for job_key, job_entry in jobs.items():
+                fingerprint = self.fingerprint(job_entry.get("approved_on"), job_entry.get("expired_on"))
+                payload = json.dumps(job_entry, ensure_ascii=False)
+                previous = existing.get(job_key)
+
+                if previous is None or previous[2] == execution_date:
+                    change, first_seen, last_changed = "added", execution_date, execution_date
+                elif previous[0] != fingerprint or previous[1] != "active" or previous[3] == execution_date:
+                    change, first_seen, last_changed = "changed", previous[2], execution_date
+                else:
+                    change, first_seen, last_changed = None, previous[2], previous[3]
+
+                self.conn.execute(
+                    """INSERT OR REPLACE INTO jobs
+                       (job_key, fingerprint, payload, status, first_seen, last_changed, last_seen, expired_at)
+                       VALUES (?, ?, ?, 'active', ?, ?, ?, NULL)""",
+                    (job_key, fingerprint, payload, first_seen, last_changed, execution_date)
+                )
+                if change:
+                    changes[change].append(job_key)
+
+            for job_key, (_, status, _, _, expired_at) in existing.items():
+                if job_key in jobs:
+                    continue
+                if status == "active" or expired_at == execution_date:
+                    changes["expired"].append(job_key)
+            self.conn.executemany(
+                "UPDATE jobs SET status = 'expired', expired_at = ? WHERE job_key = ?",
+                [(execution_date, job_key) for job_key in changes["expired"]]
+            )
+
+            self.conn.executemany(
+                "INSERT INTO changes (execution_date, job_key, change) VALUES (?, ?, ?)",
+                [(execution_date, job_key, change) for change, keys in changes.items() for job_key in keys]
+            )
+
+        logger.info("🗂 State store %s: %d added, %d changed, %d expired",
+                    execution_date, len(changes["added"]), len(changes["changed"]), len(changes["expired"]))
+        return changes
+
+    def close(self):
+        self.conn.close()
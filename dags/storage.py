@@ -0,0 +1,343 @@
+import os
+import re
+import logging
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+RAW_FILE = "vietnamworks_jobs.parquet"
+RAW_CSV_FILE = "vietnamworks_jobs.csv"
+TRANSFORMED_FILE = "vietnamworks_jobs_transformed.parquet"
+TRANSFORMED_CSV_FILE = "vietnamworks_jobs_transformed.csv"
+
+# Cột ít giá trị khác nhau được lưu dạng dictionary (categorical khi đọc bằng pandas)
+CATEGORY = pa.dictionary(pa.int32(), pa.string())
+
+JOB_SCHEMA = pa.schema([
+    ("job_id", pa.string()),
+    ("job_title", pa.string()),
+    ("job_url", pa.string()),
+    ("created_on", pa.timestamp("us")),
+    ("approved_on", pa.timestamp("us")),
+    ("expired_on", pa.timestamp("us")),
+    ("company_name", pa.string()),
+    ("job_description", pa.string()),
+    ("job_requirement", pa.string()),
+    ("salary", pa.string()),
+    ("salary_max", pa.float64()),
+    ("salary_min", pa.float64()),
+    ("skill_name", pa.list_(pa.string())),
+    ("address", pa.string()),
+    ("city_name", CATEGORY),
+    ("job_level", CATEGORY),
+    ("salary_currency", CATEGORY),
+    ("keywords", pa.list_(CATEGORY)),
+])
+
+DATE_COLUMNS = ['created_on', 'approved_on', 'expired_on']
+
+# Cột do bước dedup thêm vào file transform: job_key của tin gốc nếu job là tin đăng lại
+DUPLICATE_COLUMN = "duplicate_of"
+DEDUP_SCHEMA = JOB_SCHEMA.append(pa.field(DUPLICATE_COLUMN, pa.string()))
+
+# Cột lặp lại nhiều được đọc thành categorical khi đọc gọn (read_jobs(compact=True)),
+# ngoài các cột đã lưu dạng dictionary trong JOB_SCHEMA
+COMPACT_CATEGORY_COLUMNS = ['company_name']
+# Cột lương được hạ xuống float32 khi việc này không làm mất chính xác
+COMPACT_FLOAT_COLUMNS = ['salary_min', 'salary_max']
+
+# Giới hạn số dòng mỗi row group để có thể đọc file theo từng phần với bộ nhớ cố định
+ROW_GROUP_SIZE = 20_000
+
+# Số tham số tối đa trong một mệnh đề IN (...) (SQLite giới hạn số tham số trong một câu lệnh)
+SQLITE_BATCH_SIZE = 500
+
+# Tên thư mục partition trong data_dir (execution_date)
+DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+@contextmanager
+def atomic_path(path):
+    """Đường dẫn file tạm để ghi; khi khối with xong file tạm thay thế path (os.replace), lỗi thì bị xóa.
+
+    Người đọc không bao giờ thấy file ghi dở.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        yield tmp_path
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+
+
+def select_in(conn, sql, column, values, batch_size=SQLITE_BATCH_SIZE):
+    """Mọi dòng của `sql WHERE column IN (values)`, truy vấn theo lô batch_size giá trị."""
+    values = list(values)
+    rows = []
+    for i in range(0, len(values), batch_size):
+        batch = values[i:i + batch_size]
+        rows += conn.execute(f"{sql} WHERE {column} IN ({','.join('?' * len(batch))})", batch).fetchall()
+    return rows
+
+
+def as_date(value):
+    """Chuẩn hóa ngày lọc (str/date/datetime) thành chuỗi YYYY-MM-DD."""
+    return None if value is None else pd.Timestamp(value).strftime("%Y-%m-%d")
+
+
+def job_key(job_id, job_url):
+    """Khóa định danh ổn định của một job: job_id, nếu không có thì dùng job_url đã chuẩn hóa."""
+    if job_id is not None and not pd.isna(job_id):
+        return f"id:{job_id}"
+    if job_url is None or pd.isna(job_url) or not job_url:
+        return None
+    parts = urlsplit(job_url)
+    return f"url:{parts.netloc.lower()}{parts.path.rstrip('/')}"
+
+
+def job_keys(df):
+    """Tính job_key cho từng dòng của DataFrame có cột job_id và job_url."""
+    return pd.Series([job_key(i, u) for i, u in zip(df['job_id'], df['job_url'])], index=df.index, dtype=object)
+
+
+def parse_timestamps(series):
+    """Chuyển chuỗi ngày ISO thành datetime không múi giờ, giữ giờ địa phương như tz_localize(None)."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.dt.tz_localize(None) if series.dt.tz is not None else series
+
+    present = series.notna()
+    text = series[present].astype(str).str.replace(r'(?:Z|[+-]\d{2}:?\d{2})$', '', regex=True)
+    parsed = pd.to_datetime(text, format='ISO8601', errors='coerce')
+
+    # Giá trị không theo ISO 8601 được parse lại riêng, lỗi thì thành NaT
+    failed = parsed.isna()
+    if failed.any():
+        parsed[failed] = pd.to_datetime(text[failed], format='mixed', errors='coerce')
+
+    result = pd.Series(pd.NaT, index=series.index, dtype='datetime64[ns]')
+    result[present] = parsed
+    return result
+
+
+def _as_str(series):
+    """Chuyển giá trị khác null thành str, giữ nguyên null."""
+    values = series.astype(object)
+    return values.where(values.isna(), values.astype(str))
+
+
+def _as_lists(series):
+    """Chuẩn hóa cột danh sách: null thành [], phần tử thành str."""
+    return [
+        [str(item) for item in value] if value is not None and not isinstance(value, float) else []
+        for value in series.astype(object)
+    ]
+
+
+def _to_arrow(series, arrow_type):
+    """Chuyển một cột pandas sang Arrow theo kiểu trong schema."""
+    if pa.types.is_timestamp(arrow_type):
+        return pa.array(parse_timestamps(series), from_pandas=True).cast(arrow_type, safe=False)
+    if pa.types.is_floating(arrow_type) or pa.types.is_integer(arrow_type):
+        return pa.array(pd.to_numeric(series, errors='coerce'), from_pandas=True).cast(arrow_type)
+    if pa.types.is_dictionary(arrow_type):
+        return pa.array(_as_str(series), type=pa.string(), from_pandas=True).dictionary_encode()
+    if pa.types.is_list(arrow_type):
+        lists = pa.array(_as_lists(series), type=pa.list_(pa.string()))
+        if pa.types.is_dictionary(arrow_type.value_type):
+            return pa.ListArray.from_arrays(lists.offsets, lists.flatten().dictionary_encode())
+        return lists
+    return pa.array(_as_str(series), type=arrow_type, from_pandas=True)
+
+
+def to_table(df, schema=JOB_SCHEMA):
+    """Tạo pyarrow.Table theo schema cố định; cột ngoài schema được suy kiểu tự động."""
+    arrays, fields = [], []
+    for name in schema.names:
+        if name not in df.columns:
+            continue
+        field = schema.field(name)
+        arrays.append(_to_arrow(df[name], field.type))
+        fields.append(field)
+    for name in df.columns:
+        if name in schema.names:
+            continue
+        array = pa.array(df[name], from_pandas=True)
+        arrays.append(array)
+        fields.append(pa.field(name, array.type))
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+
+def jobs_to_frame(records):
+    """Tạo DataFrame từ danh sách job_entry, giữ nguyên kiểu Python (job_id không bị ép sang float)."""
+    df = pd.DataFrame(records, columns=JOB_SCHEMA.names, dtype=object)
+    for col in DATE_COLUMNS:
+        df[col] = parse_timestamps(df[col])
+    return df
+
+
+def write_jobs(df, path, csv_path=None, schema=JOB_SCHEMA):
+    """Ghi DataFrame ra Parquet theo schema (mặc định JOB_SCHEMA), tùy chọn ghi thêm bản CSV."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pq.write_table(to_table(df, schema), path, compression="zstd", row_group_size=ROW_GROUP_SIZE)
+    logger.info("💾 Đã ghi %d bản ghi vào %s", len(df), path)
+    if csv_path:
+        df.to_csv(csv_path, index=False, encoding="utf-8-sig")
+        logger.info("💾 Đã ghi bản CSV vào %s", csv_path)
+
+
+def _compact_type(arrow_type):
+    """Kiểu pandas của cột khi đọc gọn; None: giữ cách chuyển mặc định (dictionary thành categorical)."""
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return pd.StringDtype("pyarrow")
+    if pa.types.is_list(arrow_type):
+        return pd.ArrowDtype(arrow_type)
+    return None
+
+
+def _dictionary_lists(column):
+    """Cột list<string> thành list<dictionary>: mỗi skill là một mã số nguyên thay vì một chuỗi Python."""
+    lists = column.combine_chunks()
+    if pa.types.is_dictionary(lists.type.value_type):
+        return lists
+    return pa.ListArray.from_arrays(lists.offsets, lists.values.dictionary_encode(), mask=lists.is_null())
+
+
+def to_compact_frame(table):
+    """pyarrow.Table thành DataFrame gọn.
+
+    Cột lặp lại nhiều (dictionary trong schema và COMPACT_CATEGORY_COLUMNS) thành categorical,
+    văn bản thành chuỗi Arrow, cột danh sách thành list<dictionary> của Arrow, lương thành float32
+    (chỉ khi mọi giá trị giữ nguyên, để dữ liệu ghi lại không đổi).
+    """
+    for name in table.column_names:
+        column = table.column(name)
+        if name in COMPACT_CATEGORY_COLUMNS and pa.types.is_string(column.type):
+            column = column.dictionary_encode()
+        elif pa.types.is_list(column.type):
+            column = _dictionary_lists(column)
+        elif name in COMPACT_FLOAT_COLUMNS and pa.types.is_float64(column.type):
+            narrowed = column.cast(pa.float32())
+            # pc.all trả về null khi cột toàn null/rỗng: vẫn hạ kiểu được
+            if pc.all(pc.equal(narrowed.cast(pa.float64()), column)).as_py() is not False:
+                column = narrowed
+        else:
+            continue
+        table = table.set_column(table.schema.get_field_index(name), name, column)
+    return table.unify_dictionaries().to_pandas(types_mapper=_compact_type)
+
+
+def memory_report(df, label):
+    """Log dung lượng bộ nhớ (MB) của từng cột và tổng, trả về Series số MB theo cột."""
+    usage = df.memory_usage(index=False, deep=True) / 2**20
+    logger.info("🧮 Bộ nhớ %s: %.1f MB (%d dòng) — %s", label, usage.sum(), len(df),
+                ", ".join(f"{name}={mb:.1f}" for name, mb in usage.sort_values(ascending=False).items()))
+    return usage
+
+
+def list_codes(series):
+    """Cột danh sách thành (vị trí dòng, mã phần tử, tên các mã); phần tử null bị bỏ.
+
+    Cột list<dictionary> của Arrow (read_jobs(compact=True)) được đọc thẳng từ mã đã lưu,
+    cột list Python được explode rồi factorize.
+    """
+    if isinstance(series.dtype, pd.ArrowDtype) and pa.types.is_list(series.dtype.pyarrow_dtype):
+        lists = pa.array(series)
+        if isinstance(lists, pa.ChunkedArray):
+            lists = lists.combine_chunks()
+        rows = pc.list_parent_indices(lists).to_numpy()
+        values = pc.list_flatten(lists)
+        if not pa.types.is_dictionary(values.type):
+            values = values.dictionary_encode()
+        present = values.is_valid().to_numpy(zero_copy_only=False)
+        codes = values.indices.to_numpy(zero_copy_only=False)
+        return rows[present], codes[present].astype(np.int64), pd.Index(values.dictionary.to_pylist())
+    exploded = series.reset_index(drop=True).explode().dropna()
+    codes, names = pd.factorize(exploded.astype(str))
+    return exploded.index.to_numpy(dtype=np.int64), codes.astype(np.int64), pd.Index(names)
+
+
+def read_jobs(path, columns=None, compact=False):
+    """Đọc file Parquet của pipeline thành DataFrame (cột dictionary thành categorical).
+
+    compact=True: đọc gọn theo to_compact_frame.
+    """
+    table = pq.read_table(path, columns=columns)
+    return to_compact_frame(table) if compact else table.to_pandas()
+
+
+def read_unique_jobs(path, columns=None, compact=False, within_file=False):
+    """Như read_jobs nhưng bỏ các tin đăng lại (duplicate_of khác null) nếu file đã qua bước dedup.
+
+    within_file=True: chỉ bỏ tin đăng lại có tin gốc cũng nằm trong file, tin có tin gốc ở
+    partition trước vẫn được giữ (cho thống kê riêng từng ngày).
+    """
+    has_dedup = DUPLICATE_COLUMN in pq.read_schema(path).names
+    key_columns = ['job_id', 'job_url'] if within_file else []
+    read_columns = columns
+    if columns is not None and has_dedup:
+        read_columns = list(dict.fromkeys([*columns, *key_columns, DUPLICATE_COLUMN]))
+    df = read_jobs(path, columns=read_columns, compact=compact)
+    if not has_dedup:
+        return df
+    reposts = df[DUPLICATE_COLUMN].notna()
+    if within_file:
+        reposts &= df[DUPLICATE_COLUMN].astype(object).isin(set(job_keys(df).dropna()))
+    df = df[~reposts].drop(columns=DUPLICATE_COLUMN).reset_index(drop=True)
+    return df[columns] if columns is not None else df
+
+
+def iter_jobs(path, chunksize, columns=None, compact=False):
+    """Đọc file Parquet theo từng phần tối đa chunksize dòng (compact=True: như read_jobs)."""
+    parquet_file = pq.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+        table = pa.Table.from_batches([batch])
+        yield to_compact_frame(table) if compact else table.to_pandas()
+
+
+class JobsWriter:
+    """Ghi DataFrame theo từng phần vào cùng một file Parquet (và CSV nếu cần)."""
+
+    def __init__(self, path, csv_path=None):
+        self.path = path
+        self.csv_path = csv_path
+        self.writer = None
+        self.rows = 0
+
+    def write(self, df):
+        table = to_table(df)
+        if self.writer is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.writer = pq.ParquetWriter(self.path, table.schema, compression="zstd")
+        elif not table.schema.equals(self.writer.schema):
+            # Cột ngoài schema có thể suy ra kiểu khác nhau giữa các phần (ví dụ toàn null)
+            table = table.cast(self.writer.schema)
+        self.writer.write_table(table, row_group_size=ROW_GROUP_SIZE)
+
+        if self.csv_path:
+            first = self.rows == 0
+            df.to_csv(self.csv_path, mode="w" if first else "a", header=first,
+                      index=False, encoding="utf-8-sig")
+        self.rows += len(df)
+
+    def close(self):
+        if self.writer is None:
+            self.write(pd.DataFrame(columns=JOB_SCHEMA.names))
+        self.writer.close()
+        logger.info("💾 Đã ghi %d bản ghi vào %s", self.rows, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif self.writer is not None:
+            self.writer.close()
@@ -0,0 +1,46 @@
+import re
+import unicodedata
+
+# Dấu thanh/dấu mũ sau khi tách NFD
+COMBINING_MARKS = r'[\u0300-\u036f]'
+
+
+def fold_text(text):
+    """Chuyển chữ thường và bỏ dấu tiếng Việt: "Quận Đống Đa" -> "quan dong da"."""
+    text = unicodedata.normalize('NFD', text.lower())
+    text = re.sub(COMBINING_MARKS, '', text)
+    return text.replace('đ', 'd')
+
+
+def fold_series(series):
+    """Phiên bản fold_text cho cả cột (null thành chuỗi rỗng)."""
+    return (series.fillna('').astype(str)
+            .str.lower()
+            .str.normalize('NFD')
+            .str.replace(COMBINING_MARKS, '', regex=True)
+            .str.replace('đ', 'd', regex=False))
+
+
+def _trie_pattern(node):
+    """Dựng regex từ trie ký tự, các nhánh có chung tiền tố được gộp lại."""
+    alternatives = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if not alternatives:
+        return ''
+    optional = '' in node
+    if len(alternatives) == 1 and not optional:
+        return alternatives[0]
+    return '(?:' + '|'.join(alternatives) + ')' + ('?' if optional else '')
+
+
+def compile_terms(terms):
+    """Biên dịch danh sách cụm từ thành một regex duy nhất (dạng trie) chỉ khớp trọn từ.
+
+    Nhánh dài hơn được thử trước nên cụm dài nhất tại mỗi vị trí thắng ("quan 10" thay vì "quan 1").
+    """
+    trie = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    return re.compile(r'(?<!\w)(' + _trie_pattern(trie) + r')(?!\w)')
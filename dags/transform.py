@@ -1,108 +1,198 @@
 import os
-import re
-import ast
-import pandas as pd
 from html import unescape
 import logging
+import numpy as np
+import pandas as pd
+import metrics
+from area_resolver import CITY_MAPPING
+from pipeline_config import DATA_DIR
+from skill_normalizer import SkillNormalizer
+from storage import (RAW_FILE, TRANSFORMED_FILE, TRANSFORMED_CSV_FILE, JobsWriter,
+                     iter_jobs, memory_report, parse_timestamps, read_jobs, write_jobs)
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def transform_data(execution_date):
-    """Chuyển đổi dữ liệu việc làm từ file CSV thô thành dạng chuẩn hóa."""
-    logger.info("Bắt đầu chuyển đổi dữ liệu cho ngày %s", execution_date)
+DATE_COLUMNS = ['created_on', 'approved_on', 'expired_on']
+HTML_COLUMNS = ['job_description', 'job_requirement']
+CASE_COLUMNS = ['job_title', 'company_name', 'city_name', 'job_description', 'job_requirement', 'address']
+
+HTML_TAG_PATTERN = r'<[^>]+>'
+
+
+def _map_present(series, func):
+    """Áp dụng func (nhận Series chuỗi) cho các giá trị khác null, giữ nguyên null.
+
+    Cột categorical chỉ áp dụng func trên các category; cột chuỗi (kể cả chuỗi Arrow của
+    read_jobs(compact=True)) giữ nguyên kiểu thay vì đổi sang object.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Các category có thể trùng nhau sau func (vd. 'Ha Noi' và 'ha noi' khi chuyển chữ thường)
+        codes, categories = pd.factorize(func(pd.Series(series.cat.categories.astype(str))))
+        old_codes = series.cat.codes.to_numpy()
+        new_codes = np.where(old_codes >= 0, codes[old_codes], -1)
+        return pd.Series(pd.Categorical.from_codes(new_codes, categories=categories),
+                         index=series.index, name=series.name)
+    present = series.notna()
+    if isinstance(series.dtype, pd.StringDtype):
+        result = series.copy()
+        if present.any():
+            result[present] = func(series[present]).astype(series.dtype)
+        return result
+    result = series.astype(object).copy()
+    if present.any():
+        result[present] = func(series[present].astype(str))
+    return result
+
+
+def _collapse_whitespace(values):
+    """Gộp khoảng trắng liên tiếp thành một dấu cách và bỏ khoảng trắng hai đầu (như ' '.join(s.split()))."""
+    return values.str.split().str.join(' ')
+
+
+def _clean_html(values):
+    """Giải mã HTML entity, loại bỏ HTML tags và chuẩn hóa khoảng trắng."""
+    has_entity = values.str.contains('&', regex=False)
+    if has_entity.any():
+        values = values.copy()
+        values[has_entity] = values[has_entity].map(unescape)
+    return _collapse_whitespace(values.str.replace(HTML_TAG_PATTERN, '', regex=True))
+
+
+def normalize_dates(df):
+    """Chuẩn hóa các cột ngày tháng, mỗi cột chỉ parse một lần."""
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = parse_timestamps(df[col])
+    return df
 
-    input_file = f"/opt/airflow/data/vietnamwork/{execution_date}/vietnamworks_jobs.csv"
-    output_file = f"/opt/airflow/data/vietnamwork/{execution_date}/vietnamworks_jobs_transformed.csv"
 
-    # 1️⃣ Kiểm tra file đầu vào
-    if not os.path.exists(input_file):
-        logger.error("❌ File đầu vào %s không tồn tại.", input_file)
-        raise FileNotFoundError(f"Input file {input_file} does not exist")
-
-    os.makedirs(os.path.dirname(output_file), exist_ok=True)
-    df = pd.read_csv(input_file, encoding="utf-8-sig")
-    logger.info("Đã đọc %d bản ghi từ %s", len(df), input_file)
-
-    # 2️⃣ Xử lý ngày tháng
-    def normalize_date(date_str):
-        """Chuẩn hóa định dạng ngày tháng."""
-        if pd.isna(date_str):
-            return pd.NaT
-        try:
-            dt = pd.to_datetime(date_str)
-            dt = dt.tz_localize(None)
-            return dt
-        except Exception as e:
-            logger.warning("⚠ Lỗi khi xử lý ngày %s: %s", date_str, e)
-            return pd.NaT
-
-    for col in ['created_on', 'approved_on', 'expired_on']:
+def clean_html_columns(df):
+    """Xử lý ký tự HTML trong mô tả công việc."""
+    for col in HTML_COLUMNS:
         if col in df.columns:
-            df[col] = df[col].apply(normalize_date)
-
-    # 3️⃣ Xử lý ký tự HTML trong mô tả công việc
-    def clean_html(text):
-        """Loại bỏ HTML tags và chuẩn hóa khoảng trắng."""
-        if pd.isna(text):
-            return text
-        text = unescape(str(text))
-        text = re.sub(r'<[^>]+>', '', text)
-        return ' '.join(text.split())
-
-    for col in ['job_description', 'job_requirement']:
-        if col in df.columns:
-            df[col] = df[col].apply(clean_html)
-
-    # 4️⃣ Chuẩn hóa city_name và address
-    city_mapping = {
-        'hanoi': 'Ha Noi',
-        'ha noi': 'Ha Noi',
-        'ho chi minh': 'Ho Chi Minh',
-        'hcm': 'Ho Chi Minh',
-        'binh duong': 'Binh Duong',
-        'dong nai': 'Dong Nai',
-        'other': 'Other'
-    }
-
-    def fill_and_normalize(row):
-        """Chuẩn hóa tên thành phố và địa chỉ."""
-        city = row.get('city_name')
-        addr = row.get('address')
-
-        if pd.isna(city):
-            if pd.notna(addr) and addr.lower() in city_mapping:
-                city = city_mapping[addr.lower()]
-            else:
-                city = 'Unknown'
-        else:
-            city = city_mapping.get(city.lower(), city)
+            df[col] = _map_present(df[col], _clean_html)
+    return df
 
-        if pd.isna(addr):
-            addr = city
 
-        return pd.Series([city, addr], index=['city_name', 'address'])
+def fill_and_normalize_city(df):
+    """Chuẩn hóa tên thành phố và điền địa chỉ còn thiếu."""
+    if 'city_name' not in df.columns or 'address' not in df.columns:
+        return df
 
-    if 'city_name' in df.columns and 'address' in df.columns:
-        df[['city_name', 'address']] = df.apply(fill_and_normalize, axis=1)
+    city = df['city_name']
+    addr = df['address']
 
-    # 5️⃣ Chuẩn hóa chữ thường
-    def normalize_case(text):
-        """Chuyển đổi văn bản thành chữ thường và chuẩn hóa khoảng trắng."""
-        if pd.isna(text):
-            return text
-        return ' '.join(str(text).lower().split())
+    # city có giá trị: ánh xạ nếu có trong CITY_MAPPING, ngược lại giữ nguyên
+    city_out = _map_present(city, lambda v: v.str.lower().map(CITY_MAPPING).fillna(v)).astype(object)
 
-    for col in ['job_title', 'company_name', 'city_name', 'job_description', 'job_requirement', 'address']:
-        if col in df.columns:
-            df[col] = df[col].apply(normalize_case)
+    # city trống: suy ra từ address, không được thì 'Unknown'
+    missing = city.isna()
+    if missing.any():
+        city_from_addr = _map_present(addr[missing], lambda v: v.str.lower().map(CITY_MAPPING))
+        city_out = city_out.where(~missing, city_from_addr.astype(object).fillna('Unknown'))
 
-    # 6️⃣ Xử lý cột skill_name (list)
-    if 'skill_name' in df.columns:
-        df['skill_name'] = df['skill_name'].apply(
-            lambda x: ast.literal_eval(x) if pd.notna(x) else []
-        )
+    df['city_name'] = city_out.astype('category') if isinstance(city.dtype, pd.CategoricalDtype) else city_out
+    df['address'] = addr.where(addr.notna(), city_out)
+    return df
+
+
+def normalize_case_columns(df, collapsed=()):
+    """Chuyển văn bản thành chữ thường và chuẩn hóa khoảng trắng.
+
+    Cột trong collapsed đã được gộp khoảng trắng trước đó nên chỉ cần chuyển chữ thường.
+    """
+    for col in CASE_COLUMNS:
+        if col not in df.columns:
+            continue
+        if col in collapsed:
+            df[col] = _map_present(df[col], lambda v: v.str.lower())
+        else:
+            df[col] = _map_present(df[col], lambda v: _collapse_whitespace(v.str.lower()))
+    return df
+
+
+def canonicalize_skills(df, normalizer):
+    """Đưa skill_name về tên chuẩn và bổ sung skill tìm thấy trong mô tả/yêu cầu công việc đã làm sạch."""
+    if 'skill_name' not in df.columns:
+        return df
+    texts = [df[col] for col in HTML_COLUMNS if col in df.columns]
+    df['skill_name'] = normalizer.normalize(df['skill_name'], texts)
+    return df
+
+
+def transform_frame(df, skill_normalizer=None):
+    """Chạy toàn bộ các bước chuẩn hóa trên DataFrame, mỗi bước xử lý theo cả cột.
+
+    skill_normalizer=None: giữ nguyên skill_name như API trả về.
+    """
+    with metrics.span("transform.normalize_dates"):
+        df = normalize_dates(df)
+    with metrics.span("transform.clean_html"):
+        df = clean_html_columns(df)
+    with metrics.span("transform.normalize_city"):
+        df = fill_and_normalize_city(df)
+    with metrics.span("transform.normalize_case"):
+        df = normalize_case_columns(df, collapsed=HTML_COLUMNS)
+    if skill_normalizer is not None:
+        with metrics.span("transform.canonicalize_skills"):
+            df = canonicalize_skills(df, skill_normalizer)
+    return df
+
+
+def transform_file(input_file, output_file, csv_file=None, chunksize=None, normalize_skills=True,
+                   normalizer_workers=None):
+    """Transform một file Parquet thô.
+
+    chunksize=None: đọc cả file một lần. chunksize=N: đọc, chuẩn hóa và ghi nối tiếp từng phần
+    N dòng để bộ nhớ không phụ thuộc kích thước file; kết quả giống hệt khi chạy một lần.
+    normalize_skills=True: chuẩn hóa tên skill và bổ sung skill tìm thấy trong mô tả công việc,
+    với tối đa normalizer_workers process (mặc định bằng số CPU).
+    """
+    # Từ điển skill được biên dịch một lần cho cả file
+    skill_normalizer = SkillNormalizer(max_workers=normalizer_workers) if normalize_skills else None
+    metrics.count("bytes_read", os.path.getsize(input_file))
+    if chunksize is None:
+        with metrics.span("transform.read"):
+            df = read_jobs(input_file, compact=True)
+        logger.info("Đã đọc %d bản ghi từ %s", len(df), input_file)
+        memory_report(df, "transform.input")
+        df = transform_frame(df, skill_normalizer)
+        with metrics.span("transform.write"):
+            write_jobs(df, output_file, csv_file)
+        rows = len(df)
+    else:
+        with JobsWriter(output_file, csv_file) as writer:
+            for i, chunk in enumerate(iter_jobs(input_file, chunksize, compact=True), start=1):
+                if i == 1:
+                    memory_report(chunk, "transform.chunk")
+                transformed = transform_frame(chunk, skill_normalizer)
+                with metrics.span("transform.write"):
+                    writer.write(transformed)
+                logger.info("Đã transform phần %d (%d bản ghi, tổng %d)", i, len(chunk), writer.rows)
+        rows = writer.rows
+    metrics.count("rows_written", rows)
+    metrics.count("bytes_written", os.path.getsize(output_file))
+    return rows
+
+
+def transform_data(execution_date, write_csv=False, chunksize=None, normalize_skills=True, data_dir=DATA_DIR,
+                   normalizer_workers=None):
+    """Chuyển đổi dữ liệu việc làm từ file Parquet thô thành dạng chuẩn hóa."""
+    logger.info("Bắt đầu chuyển đổi dữ liệu cho ngày %s", execution_date)
+
+    input_file = f"{data_dir}/{execution_date}/{RAW_FILE}"
+    output_file = f"{data_dir}/{execution_date}/{TRANSFORMED_FILE}"
+    csv_file = f"{data_dir}/{execution_date}/{TRANSFORMED_CSV_FILE}" if write_csv else None
+
+    # 1️⃣ Kiểm tra file đầu vào
+    if not os.path.exists(input_file):
+        logger.error("❌ File đầu vào %s không tồn tại.", input_file)
+        raise FileNotFoundError(f"Input file {input_file} does not exist")
+
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
 
-    # 7️⃣ Ghi ra file CSV
-    df.to_csv(output_file, index=False, encoding="utf-8-sig")
-    logger.info("🎉 Hoàn tất transform! Đã lưu %d bản ghi vào %s", len(df), output_file)
+    # 2️⃣ Chuẩn hóa ngày tháng, HTML, thành phố/địa chỉ và chữ thường rồi ghi ra Parquet
+    with metrics.stage("transform", os.path.dirname(output_file), execution_date):
+        rows = transform_file(input_file, output_file, csv_file, chunksize=chunksize,
+                              normalize_skills=normalize_skills, normalizer_workers=normalizer_workers)
+    logger.info("🎉 Hoàn tất transform! Đã lưu %d bản ghi vào %s", rows, output_file)
@@ -1,47 +1,212 @@
+import os
+import json
+import sqlite3
+import logging
+from datetime import datetime
 import pandas as pd
+import matplotlib
+matplotlib.use("Agg")
 import seaborn as sns
 import matplotlib.pyplot as plt
+from pipeline_config import DATA_DIR, LOG_FORMAT
+from storage import TRANSFORMED_FILE, job_keys, read_unique_jobs, select_in
 
-# Đọc file CSV
-df = pd.read_csv("E:/docker-projects/airflow-project/data/vietnamwork/vietnamworks_jobs_transformed.csv", encoding="utf-8-sig")
+logger = logging.getLogger(__name__)
 
-# Chuyển đổi cột created_on và expired_on thành datetime
-df['created_on'] = pd.to_datetime(df['created_on'], errors='coerce')
-df['expired_on'] = pd.to_datetime(df['expired_on'], errors='coerce')
+TREND_DB_FILE = "trend_state.sqlite"
+MONTHLY_TRENDS_FILE = "monthly_trends.csv"
+TREND_CHART_FILE = "job_trend.png"
+TREND_COLUMNS = ['job_key', 'created_month', 'expired_month', 'city_name', 'keywords', 'last_partition']
+# Thay cho keyword/thành phố trống trong khóa bảng đếm (SQLite coi các NULL là khác nhau)
+MISSING = ""
 
-# Nhóm dữ liệu theo tháng
-df['created_month'] = df['created_on'].dt.to_period('M')
-df['expired_month'] = df['expired_on'].dt.to_period('M')
 
-# Đếm số lượng công việc theo tháng
-created_trend = df['created_month'].value_counts().sort_index().reset_index()
-created_trend.columns = ['month', 'created_count']
+def _partition_jobs(df, execution_date):
+    """Rút gọn một partition thành mỗi job một dòng với tháng tạo/hết hạn."""
+    jobs = pd.DataFrame({
+        'job_key': job_keys(df),
+        'created_month': df['created_on'].dt.to_period('M').astype(str),
+        'expired_month': df['expired_on'].dt.to_period('M').astype(str),
+        'city_name': df['city_name'].astype(object),
+        'keywords': df['keywords'].map(list),
+        'last_partition': execution_date,
+    })
+    # Period của NaT được chuyển thành chuỗi 'NaT'
+    jobs = jobs.replace({'created_month': {'NaT': None}, 'expired_month': {'NaT': None}})
+    return jobs.dropna(subset=['job_key'])
 
-expired_trend = df['expired_month'].value_counts().sort_index().reset_index()
-expired_trend.columns = ['month', 'expired_count']
 
-# Gộp dữ liệu để vẽ
-trend_df = pd.merge(created_trend, expired_trend, on='month', how='outer').fillna(0)
-trend_df['month'] = trend_df['month'].astype(str)  # Chuyển period thành chuỗi để vẽ
+def _deltas(old_jobs, new_jobs):
+    """Thay đổi của bảng đếm khi thay bản ghi cũ (old_jobs, -1) bằng bản mới (new_jobs, +1).
 
-# Thiết lập style cho Seaborn
-sns.set_style("whitegrid")
+    Trả về (theo tháng × keyword × thành phố, tổng theo tháng), chỉ gồm các dòng có thay đổi.
+    """
+    jobs = pd.concat([old_jobs.assign(sign=-1), new_jobs.assign(sign=1)], ignore_index=True)
+    per_keyword = jobs.explode('keywords')
+    per_keyword['keyword'] = per_keyword['keywords'].fillna(MISSING).astype(str)
+    per_keyword['city_name'] = per_keyword['city_name'].fillna(MISSING).astype(str)
 
-# Vẽ biểu đồ đường
-plt.figure(figsize=(12, 6))
-sns.lineplot(data=trend_df, x='month', y='created_count', label='Công việc mới (Created)', color='blue', marker='o')
-sns.lineplot(data=trend_df, x='month', y='expired_count', label='Công việc hết hạn (Expired)', color='red', marker='o')
+    def _sum(frame, group):
+        sums = [frame.groupby([f'{kind}_month', *group])['sign'].sum().rename(f'{kind}_count')
+                .rename_axis(['month', *group]) for kind in ('created', 'expired')]
+        deltas = pd.concat(sums, axis=1).fillna(0).astype(int)
+        return deltas[deltas.ne(0).any(axis=1)].reset_index()
 
-# Tùy chỉnh biểu đồ
-plt.title('Xu hướng việc làm theo thời gian (Created vs Expired)', fontsize=14, pad=20)
-plt.xlabel('Tháng/Năm', fontsize=12)
-plt.ylabel('Số lượng công việc', fontsize=12)
-plt.xticks(rotation=45)
-plt.legend()
-plt.tight_layout()
+    return _sum(per_keyword, ['keyword', 'city_name']), _sum(jobs, [])
 
-# Lưu biểu đồ
-plt.savefig('job_trend.png', dpi=300, bbox_inches='tight')
 
-# Hiển thị biểu đồ
-plt.show()
\ No newline at end of file
+class TrendStore:
+    """Trạng thái xu hướng (SQLite): mỗi job một dòng từ partition mới nhất và số đếm theo tháng.
+
+    Mỗi partition chỉ tra cứu/ghi các job của nó và cộng/trừ phần đóng góp của chúng vào
+    bảng đếm, nên chi phí theo kích thước partition thay vì toàn bộ lịch sử.
+    """
+
+    def __init__(self, db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, timeout=60)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS trend_jobs (
+                job_key TEXT PRIMARY KEY,
+                created_month TEXT,
+                expired_month TEXT,
+                city_name TEXT,
+                keywords TEXT NOT NULL,
+                last_partition TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS monthly_counts (
+                month TEXT NOT NULL,
+                keyword TEXT NOT NULL,
+                city_name TEXT NOT NULL,
+                created_count INTEGER NOT NULL,
+                expired_count INTEGER NOT NULL,
+                PRIMARY KEY (month, keyword, city_name)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS monthly_totals (
+                month TEXT PRIMARY KEY,
+                created_count INTEGER NOT NULL,
+                expired_count INTEGER NOT NULL
+            ) WITHOUT ROWID;
+        """)
+        self.conn.commit()
+
+    def _lookup(self, job_keys):
+        """Bản ghi đã lưu của các job_key (keywords đã giải mã thành list)."""
+        rows = select_in(self.conn, f"SELECT {', '.join(TREND_COLUMNS)} FROM trend_jobs", "job_key", job_keys)
+        stored = pd.DataFrame(rows, columns=TREND_COLUMNS)
+        stored['keywords'] = stored['keywords'].map(json.loads)
+        return stored
+
+    def apply(self, jobs):
+        """Gộp job vào trạng thái, mỗi job giữ bản ghi từ partition mới nhất; trả về số job đã ghi.
+
+        Chạy lại cùng một partition cho cùng kết quả.
+        """
+        jobs = jobs.sort_values('last_partition', kind='stable').drop_duplicates('job_key', keep='last')
+        stored = self._lookup(jobs['job_key'].tolist())
+        newer = jobs['job_key'].map(stored.set_index('job_key')['last_partition']).fillna('') > jobs['last_partition']
+        jobs = jobs[~newer]
+        counts, totals = _deltas(stored[stored['job_key'].isin(jobs['job_key'])], jobs)
+
+        rows = jobs[TREND_COLUMNS].assign(keywords=jobs['keywords'].map(lambda k: json.dumps(list(k), ensure_ascii=False)))
+        rows = rows.astype(object).where(rows.notna(), None)
+        updates = ', '.join(f"{col} = excluded.{col}" for col in TREND_COLUMNS if col != 'job_key')
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT INTO trend_jobs ({', '.join(TREND_COLUMNS)}) VALUES ({', '.join('?' * len(TREND_COLUMNS))}) "
+                f"ON CONFLICT(job_key) DO UPDATE SET {updates}",
+                rows.itertuples(index=False, name=None)
+            )
+            for table, frame, key in (('monthly_counts', counts, 'month, keyword, city_name'),
+                                      ('monthly_totals', totals, 'month')):
+                self.conn.executemany(
+                    f"INSERT INTO {table} ({', '.join(frame.columns)}) VALUES ({', '.join('?' * len(frame.columns))}) "
+                    f"ON CONFLICT({key}) DO UPDATE SET created_count = created_count + excluded.created_count, "
+                    f"expired_count = expired_count + excluded.expired_count",
+                    frame.astype(object).itertuples(index=False, name=None)
+                )
+                self.conn.execute(f"DELETE FROM {table} WHERE created_count = 0 AND expired_count = 0")
+        logger.info("Trend store: ghi %d job (%d bỏ qua vì đã có bản mới hơn), %d ô đếm thay đổi",
+                    len(jobs), int(newer.sum()), len(counts))
+        return len(jobs)
+
+    def monthly_rollup(self):
+        """Số job tạo mới/hết hạn theo tháng cho từng keyword và thành phố."""
+        rollup = pd.read_sql_query(
+            "SELECT month, keyword, city_name, created_count, expired_count FROM monthly_counts", self.conn
+        )
+        rollup[['keyword', 'city_name']] = rollup[['keyword', 'city_name']].replace(MISSING, None)
+        return rollup.sort_values(['month', 'keyword', 'city_name'], ignore_index=True)
+
+    def monthly_totals(self):
+        """Số job tạo mới/hết hạn theo tháng (mỗi job tính một lần)."""
+        return pd.read_sql_query(
+            "SELECT month, created_count, expired_count FROM monthly_totals ORDER BY month", self.conn
+        )
+
+    def close(self):
+        self.conn.close()
+
+
+def plot_trends(trend_df, output_path):
+    """Vẽ biểu đồ số job tạo mới và hết hạn theo tháng (trend_df: month, created_count, expired_count)."""
+    # Thiết lập style cho Seaborn
+    sns.set_style("whitegrid")
+
+    # Vẽ biểu đồ đường
+    plt.figure(figsize=(12, 6))
+    sns.lineplot(data=trend_df, x='month', y='created_count', label='Công việc mới (Created)', color='blue', marker='o')
+    sns.lineplot(data=trend_df, x='month', y='expired_count', label='Công việc hết hạn (Expired)', color='red', marker='o')
+
+    # Tùy chỉnh biểu đồ
+    plt.title('Xu hướng việc làm theo thời gian (Created vs Expired)', fontsize=14, pad=20)
+    plt.xlabel('Tháng/Năm', fontsize=12)
+    plt.ylabel('Số lượng công việc', fontsize=12)
+    plt.xticks(rotation=45)
+    plt.legend()
+    plt.tight_layout()
+
+    # Lưu biểu đồ
+    plt.savefig(output_path, dpi=300, bbox_inches='tight')
+    plt.close()
+
+
+def update_trends(execution_date, data_dir=DATA_DIR):
+    """Gộp partition execution_date vào rollup xu hướng đã lưu và vẽ lại biểu đồ.
+
+    Chỉ đọc partition mới; job và số đếm theo tháng được giữ trong data_dir/trends/trend_state.sqlite
+    (mỗi job một dòng) nên chạy lại cùng ngày không bị đếm trùng.
+    """
+    input_file = f"{data_dir}/{execution_date}/{TRANSFORMED_FILE}"
+    trends_dir = f"{data_dir}/trends"
+
+    if not os.path.exists(input_file):
+        logger.error("File đầu vào %s không tồn tại.", input_file)
+        raise FileNotFoundError(f"Input file {input_file} does not exist")
+
+    df = read_unique_jobs(input_file, columns=['job_id', 'job_url', 'created_on', 'expired_on', 'city_name', 'keywords'])
+    partition_jobs = _partition_jobs(df, execution_date)
+    logger.info("Đã đọc %d job từ partition %s", len(partition_jobs), execution_date)
+
+    store = TrendStore(f"{trends_dir}/{TREND_DB_FILE}")
+    try:
+        store.apply(partition_jobs)
+        rollup = store.monthly_rollup()
+        totals = store.monthly_totals()
+    finally:
+        store.close()
+
+    rollup_path = f"{trends_dir}/{MONTHLY_TRENDS_FILE}"
+    rollup.to_csv(rollup_path, index=False, encoding="utf-8-sig")
+    logger.info("Đã cập nhật rollup %d dòng vào %s", len(rollup), rollup_path)
+
+    chart_path = f"{trends_dir}/{TREND_CHART_FILE}"
+    plot_trends(totals, chart_path)
+    logger.info("Đã lưu biểu đồ vào %s", chart_path)
+    return rollup
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    update_trends(datetime.now().strftime("%Y-%m-%d"))